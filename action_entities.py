@@ -0,0 +1,99 @@
+"""
+Entity scanner for free-text mitigation actions
+A single compiled alternation walks the action text once and collects every
+typed entity the playbooks need: IPv4 addresses and subnets, protocols,
+ports, request rates and interface names
+"""
+import re
+from typing import List, Optional
+
+# Words introducing a port list, e.g. "port 53" or "ports 53,5353"
+PORT_KEYWORDS = ('port', 'ports')
+
+# Every entity starts with a digit or the first letter of a port keyword, protocol (tcp, udp)
+# or interface (eth, en*, wlan, lo); the lookahead skips all other positions at once
+ENTITY_START = "0-9" + "".join(sorted({keyword[0] for keyword in PORT_KEYWORDS} | set("tuewl")))
+
+# Matched against the lowercased action text
+ENTITY_PATTERN = re.compile(
+    rf'(?=[{ENTITY_START}])\b(?:'
+    r'(?P<ipv4_and_subnet>(?:\d{1,3}\.){3}\d{1,3}(?:/\d{1,2})?\b)'
+    r'|(?P<rate>\d{1,6})\s*(?:/s(?:ec(?:ond)?)?\b|(?:requests?|queries|reqs?)\s*(?:per\s+second|/s)\b)'
+    rf'|(?:{"|".join(PORT_KEYWORDS)})\b\s*(?P<port>\d+(?:\s*,\s*\d+)*)'
+    r'|(?P<protocol>tcp|udp)\b'
+    r'|(?P<interface_name>eth\d+|en[pso]\w*|wlan\d+|lo)\b'
+    r')'
+)
+
+
+class ActionEntities:
+    """
+    Typed entities found in a free-text action, in order of appearance
+    """
+    __slots__ = ("ipv4_and_subnet", "protocols", "ports", "rates", "interfaces")
+
+    def __init__(self):
+        self.ipv4_and_subnet: List[str] = []
+        self.protocols: List[str] = []
+        self.ports: List[int] = []
+        # Requests per second
+        self.rates: List[int] = []
+        self.interfaces: List[str] = []
+
+    @property
+    def protocol(self) -> Optional[str]:
+        return self.protocols[0] if self.protocols else None
+
+    @property
+    def rate(self) -> Optional[int]:
+        return self.rates[0] if self.rates else None
+
+    @property
+    def interface_name(self) -> Optional[str]:
+        return self.interfaces[0] if self.interfaces else None
+
+    def to_dict(self) -> dict:
+        return {name: list(getattr(self, name)) for name in self.__slots__}
+
+
+def scan_action_text(text: str) -> ActionEntities:
+    """
+    Collect every entity of a free-text action in a single pass
+
+    Args:
+        text: The free-text action
+
+    Returns:
+        ActionEntities: The IPs/subnets, protocols, ports, rates and interfaces found, without duplicates
+    """
+    entities = ActionEntities()
+    for kind, value in _scan(text.lower()):
+        if kind == 'ipv4_and_subnet':
+            if value not in entities.ipv4_and_subnet and _valid_ipv4(value):
+                entities.ipv4_and_subnet.append(value)
+        elif kind == 'port':
+            for port in value.split(','):
+                port = int(port)
+                if 0 < port <= 65535 and port not in entities.ports:
+                    entities.ports.append(port)
+        elif kind == 'rate':
+            rate = int(value)
+            if rate > 0 and rate not in entities.rates:
+                entities.rates.append(rate)
+        elif kind == 'protocol':
+            if value not in entities.protocols:
+                entities.protocols.append(value)
+        elif value not in entities.interfaces:
+            entities.interfaces.append(value)
+    return entities
+
+
+def _scan(text: str):
+    return [(match.lastgroup, match.group(match.lastgroup)) for match in ENTITY_PATTERN.finditer(text)]
+
+
+def _valid_ipv4(value: str) -> bool:
+    address, _, prefix = value.partition('/')
+    if prefix and int(prefix) > 32:
+        return False
+    return all(int(octet) <= 255 for octet in address.split('.'))
@@ -0,0 +1,189 @@
+"""
+Action status event stream for RTR
+Changes applied to the action store are published to subscribers (e.g. the
+SSE endpoint) through bounded per-subscriber queues; a subscriber that falls
+behind is dropped instead of slowing down the writers
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from structured_logging import get_logger
+
+logger = get_logger("events")
+
+# Fields forwarded in every event, in addition to the fields that changed
+EVENT_FIELDS = ('status', 'info', 'target_domain')
+
+# Changed fields never forwarded, e.g. the rendered playbook body
+OMITTED_FIELDS = {'ansible_command'}
+
+
+def _as_set(value) -> Set[str]:
+    if value is None or value == "":
+        return set()
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    return {str(item).strip().lower() for item in values}
+
+
+class ActionSubscription:
+    """
+    One stream subscriber: its filters and its bounded event queue
+    """
+
+    def __init__(self, queue_size: int, intent_id: Optional[str] = None,
+                 domain: Optional[str] = None, status: Optional[str] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.intent_id = intent_id
+        self.domain = domain.strip().lower() if domain else None
+        self.status = status.strip().lower() if status else None
+        self.dropped = False
+        self.closed = False
+
+    def matches(self, event: dict) -> bool:
+        """Whether an event passes every filter of the subscriber"""
+        if self.intent_id is not None and event['intent_id'] != self.intent_id:
+            return False
+        if self.domain is not None and self.domain not in _as_set(event.get('target_domain')):
+            return False
+        if self.status is not None and self.status not in _as_set(event.get('status')):
+            return False
+        return True
+
+    async def next_event(self, timeout: float) -> Optional[dict]:
+        """
+        Wait for the next event
+
+        Returns:
+            Optional[dict]: The event, or None if nothing arrived within the timeout
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class ActionEventBroker:
+    """
+    Fans action store changes out to the stream subscribers.
+    publish() is called by the store from any thread and only schedules the
+    delivery on the event loop, so writers never wait for subscribers.
+    """
+
+    def __init__(self, queue_size: Optional[int] = None):
+        """
+        Args:
+            queue_size: Maximum buffered events per subscriber before it is dropped (ACTION_STREAM_QUEUE_SIZE, default 256)
+        """
+        self.queue_size = queue_size or int(os.getenv("ACTION_STREAM_QUEUE_SIZE", "256"))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: List[ActionSubscription] = []
+        self._lock = threading.Lock()
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped_subscribers = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Attach the broker to the event loop serving the subscribers"""
+        self._loop = loop
+
+    def subscribe(self, intent_id: Optional[str] = None, domain: Optional[str] = None,
+                  status: Optional[str] = None) -> ActionSubscription:
+        """
+        Register a subscriber; must be called from the event loop
+
+        Args:
+            intent_id: Only events of this intent
+            domain: Only events of actions targeting this domain
+            status: Only events of actions in this status
+
+        Returns:
+            ActionSubscription: The subscription to read events from
+        """
+        subscription = ActionSubscription(self.queue_size, intent_id, domain, status)
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ActionSubscription):
+        subscription.closed = True
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def publish(self, event_type: str, intent_id: str, fields: dict, action: dict):
+        """
+        Action store listener: schedule the delivery of a change to the subscribers
+
+        Args:
+            event_type: 'added', 'updated' or 'deleted'
+            intent_id: The intent_id of the changed action
+            fields: The fields that changed
+            action: The action after the change
+        """
+        if not self._subscribers or self._loop is None or self._loop.is_closed():
+            return
+        # Build the event now: the action may change again before the loop delivers it
+        event = {'event': event_type, 'intent_id': intent_id, 'timestamp': time.time()}
+        for key in EVENT_FIELDS:
+            event[key] = action.get(key)
+        if event_type == 'updated':
+            event['changed'] = {key: value for key, value in fields.items() if key not in OMITTED_FIELDS}
+        self.published += 1
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError:
+            # The event loop is shutting down
+            pass
+
+    def _deliver(self, event: dict):
+        # Runs on the event loop
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if subscription.closed or not subscription.matches(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription: ActionSubscription):
+        # A subscriber that cannot keep up loses its buffer and is told it was dropped
+        self.unsubscribe(subscription)
+        subscription.dropped = True
+        self.dropped_subscribers += 1
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait({'event': 'dropped', 'info': 'Subscriber too slow, stream closed'})
+        logger.warning("Dropped a slow action stream subscriber (%d events buffered)", self.queue_size)
+
+    def close(self):
+        """End every open stream (e.g. on shutdown); must be called from the event loop"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            self.unsubscribe(subscription)
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+            subscription.queue.put_nowait({'event': 'closed', 'info': 'RTR is shutting down'})
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get subscriber and delivery counters for monitoring"""
+        return {
+            "subscribers": len(self._subscribers),
+            "queue_size": self.queue_size,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_subscribers": self.dropped_subscribers,
+        }
+
+
+def format_sse(event: dict) -> str:
+    """Format an event as a server-sent event frame"""
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
@@ -0,0 +1,663 @@
+"""
+Persistent storage for RTR mitigation actions
+Actions are kept in an in-memory cache for hot reads and persisted to the
+MongoDB "mitigation_actions" collection. Status updates are coalesced and
+written behind in bulk_write batches on a short interval; only the fields
+that changed are written, so uvicorn workers sharing the collection do not
+overwrite each other's changes. Cached actions older than the cache TTL are
+read again from MongoDB to pick up the changes made by other workers. While
+MongoDB is unreachable actions are kept in memory; the flusher reconnects,
+loads the persisted actions it could not load yet and inserts the new ones
+only where no action with their intent_id was stored in the meantime.
+"""
+import ast
+import bisect
+import itertools
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from structured_logging import get_logger
+
+logger = get_logger("store")
+
+
+class DuplicateActionError(Exception):
+    """Raised when an action with the same intent_id is already stored"""
+
+
+def _as_list(value) -> list:
+    if value is None or value == "":
+        return []
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def _action_names(action: dict) -> list:
+    """Structured actions are indexed by action name, free-text ones by their classified action type"""
+    if isinstance(action.get("action"), dict):
+        return _as_list(action["action"].get("name"))
+    return _as_list(action.get("action_type"))
+
+
+def _mitigation_hosts(action: dict) -> list:
+    """Multidomain actions carry a list of hosts, which may have been stored as its str() form"""
+    hosts = action.get("mitigation_host")
+    if isinstance(hosts, str) and hosts.startswith("["):
+        try:
+            hosts = ast.literal_eval(hosts)
+        except (ValueError, SyntaxError):
+            pass
+    return _as_list(hosts)
+
+
+# Secondary indexes: index name -> function returning the values an action is indexed under
+SECONDARY_INDEXES = {
+    "status": lambda action: _as_list(action.get("status")),
+    "threat": lambda action: _as_list(action.get("threat")),
+    "target_domain": lambda action: _as_list(action.get("target_domain")),
+    "mitigation_host": _mitigation_hosts,
+    "action_name": _action_names,
+}
+
+# Action fields whose change requires the secondary indexes to be refreshed
+INDEXED_FIELDS = {"status", "threat", "target_domain", "mitigation_host", "action", "action_type"}
+
+
+# Pending write-behind operations besides a set of changed field names
+INSERT = "insert"  # Write the whole action unless the intent_id is stored, e.g. one added while MongoDB was unreachable
+DELETE = "delete"
+
+
+def merge_pending(older: Union[str, Set[str]], newer: Union[str, Set[str]]) -> Union[str, Set[str]]:
+    """Combine two pending operations of the same action into the one writing both"""
+    if isinstance(older, set) and isinstance(newer, set):
+        return older | newer
+    if older == INSERT and isinstance(newer, set):
+        return INSERT
+    return newer
+
+
+def index_key(value) -> str:
+    """Normalize a value for case-insensitive index lookups"""
+    return str(value).strip().lower()
+
+
+class ActionStore:
+    """
+    Write-behind store of mitigation actions backed by a MongoDB collection.
+    Adds are inserted synchronously so duplicates are rejected by the unique
+    intent_id index; every other change is applied to the cache and flushed
+    to MongoDB by a background thread.
+    """
+
+    def __init__(self, collection, flush_interval: Optional[float] = None, batch_size: Optional[int] = None,
+                 cache_ttl: Optional[float] = None, on_load: Optional[Callable[[List[dict]], None]] = None):
+        """
+        Args:
+            collection: The pymongo collection holding the actions
+            flush_interval: Seconds between write-behind flushes (ACTION_STORE_FLUSH_INTERVAL, default 0.2)
+            batch_size: Maximum operations per bulk_write (ACTION_STORE_BATCH_SIZE, default 500)
+            cache_ttl: Seconds a cached action is served before it is read again from MongoDB,
+                0 to never read it again (ACTION_STORE_CACHE_TTL, default 1)
+            on_load: Called with copies of the actions read by load(), including a load retried
+                by the flusher once MongoDB is reachable again
+        """
+        self.collection = collection
+        self.flush_interval = flush_interval or float(os.getenv("ACTION_STORE_FLUSH_INTERVAL", "0.2"))
+        self.batch_size = batch_size or int(os.getenv("ACTION_STORE_BATCH_SIZE", "500"))
+        self.cache_ttl = cache_ttl if cache_ttl is not None else float(os.getenv("ACTION_STORE_CACHE_TTL", "1"))
+        self.on_load = on_load
+
+        self._cache: Dict[str, dict] = {}
+        # Insertion order of the cached actions: position -> intent_id, and intent_id -> position.
+        # Removed actions leave tombstones in self._order until it is compacted
+        self._order: List[str] = []
+        self._positions: Dict[str, int] = {}
+        # Per position: the insertion sequence number used as page cursor, which survives compaction,
+        # and the highest created_at so far, sorted so time ranges are found by bisection
+        self._seqs: List[int] = []
+        self._created: List[float] = []
+        # Positions of actions cached after newer ones (e.g. read from MongoDB on a cache miss),
+        # whose own created_at is below self._created
+        self._late: List[int] = []
+        self._next_seq = 0
+        # Secondary indexes: index name -> normalized value -> intent_ids
+        self._indexes: Dict[str, Dict[str, Set[str]]] = {name: {} for name in SECONDARY_INDEXES}
+        self._indexed_values: Dict[str, Dict[str, List[str]]] = {}
+        # intent_id -> names of the fields waiting to be written, INSERT or DELETE
+        self._dirty: Dict[str, Union[str, Set[str]]] = {}
+        # intent_id -> monotonic time the cached action was last read from or written to MongoDB
+        self._synced_at: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        # Called as listener(event, intent_id, changed_fields, action) after every change
+        self._listeners: List[Callable[[str, str, dict, dict], None]] = []
+        self.mongo_available = True
+        # Set once the persisted actions have been read, until then the flusher retries load()
+        self.loaded = False
+
+        self.flushes = 0
+        self.operations_written = 0
+        self.updates_coalesced = 0
+        self.flush_errors = 0
+        self.refreshes = 0
+        self.insert_conflicts = 0
+
+    def load(self) -> int:
+        """
+        Warm the cache with the actions already persisted in MongoDB.
+        If MongoDB is unreachable, the flusher retries once it is back
+
+        Returns:
+            int: Number of actions loaded
+        """
+        try:
+            documents = list(self.collection.find({}, {"_id": 0}))
+        except PyMongoError as e:
+            if self.mongo_available:
+                logger.warning("Could not load mitigation actions from MongoDB, will retry: %s", e)
+            self.mongo_available = False
+            return 0
+
+        documents.sort(key=lambda document: document.get("created_at", 0))
+        loaded = []
+        with self._lock:
+            for document in documents:
+                # Actions changed since, e.g. added or deleted while MongoDB was unreachable, are flushed instead
+                if document["intent_id"] not in self._cache and document["intent_id"] not in self._dirty:
+                    self._insert_cached(document["intent_id"], document)
+                    loaded.append(dict(document))
+            self.loaded = True
+            self.mongo_available = True
+        logger.info("Loaded %d mitigation actions from MongoDB", len(loaded))
+        if self.on_load is not None and loaded:
+            self.on_load(loaded)
+        return len(loaded)
+
+    def reconnect(self) -> bool:
+        """
+        Check whether MongoDB is reachable again, loading the persisted actions if they were not loaded yet
+
+        Returns:
+            bool: True if MongoDB is available
+        """
+        if not self.loaded:
+            self.load()
+            return self.mongo_available
+        try:
+            self.collection.find_one({"intent_id": None}, {"_id": 1})
+        except PyMongoError:
+            return False
+        if not self.mongo_available:
+            logger.info("MongoDB is reachable again, writing the pending mitigation actions")
+        self.mongo_available = True
+        return True
+
+    def add(self, intent_id: str, action: dict):
+        """
+        Store a new action
+
+        Args:
+            intent_id: The unique intent_id of the action
+            action: The action document
+
+        Raises:
+            DuplicateActionError: If an action with this intent_id already exists
+        """
+        with self._lock:
+            if intent_id in self._cache:
+                raise DuplicateActionError(f"Action with ID {intent_id} already exists")
+            self._insert_cached(intent_id, action)
+            # An earlier action with this intent_id may not have been deleted from MongoDB yet
+            pending_delete = self._dirty.get(intent_id) == DELETE
+            if pending_delete:
+                del self._dirty[intent_id]
+
+        if self.mongo_available:
+            try:
+                if pending_delete:
+                    self.collection.delete_one({"intent_id": intent_id})
+                # insert_one adds an _id to the document it is given, so hand it a copy
+                self.collection.insert_one(dict(action))
+            except DuplicateKeyError:
+                with self._lock:
+                    self._remove_cached(intent_id)
+                raise DuplicateActionError(f"Action with ID {intent_id} already exists")
+            except PyMongoError as e:
+                self.mongo_available = False
+                logger.warning("MongoDB unavailable, keeping mitigation actions in memory: %s", e)
+
+        with self._lock:
+            if not self.mongo_available:
+                # MongoDB is unreachable: persist the action with the next successful flush,
+                # unless another worker has stored this intent_id by then
+                self._dirty[intent_id] = INSERT
+            self._notify("added", intent_id, action, action)
+
+    def get(self, intent_id: str) -> Optional[dict]:
+        """
+        Get a copy of a stored action, reading through to MongoDB on a cache miss
+        or when the cached copy is older than the cache TTL
+
+        Args:
+            intent_id: The intent_id of the action
+
+        Returns:
+            Optional[dict]: The action, or None if it does not exist
+        """
+        action = self._fresh(intent_id)
+        if action is None:
+            return None
+        with self._lock:
+            return dict(action)
+
+    def _fresh(self, intent_id: str) -> Optional[dict]:
+        # The cached action, read again from MongoDB first if another worker may have changed it
+        action = self._cache.get(intent_id)
+        if action is None:
+            return self._load_one(intent_id)
+        if self.cache_ttl <= 0 or not self.mongo_available:
+            return action
+        if time.monotonic() - self._synced_at.get(intent_id, 0) < self.cache_ttl:
+            return action
+        return self._refresh(intent_id)
+
+    def _refresh(self, intent_id: str) -> Optional[dict]:
+        try:
+            document = self.collection.find_one({"intent_id": intent_id}, {"_id": 0})
+        except PyMongoError:
+            return self._cache.get(intent_id)
+        with self._lock:
+            action = self._cache.get(intent_id)
+            if action is None:
+                return None
+            pending = self._dirty.get(intent_id)
+            self._synced_at[intent_id] = time.monotonic()
+            if document is None:
+                if pending is not None:
+                    # Not written yet, e.g. added while MongoDB was unreachable
+                    return action
+                # Deleted by another worker
+                self._remove_cached(intent_id)
+                return None
+
+            # Changes of this worker that are not flushed yet are newer than the stored ones
+            if pending == INSERT:
+                return action
+            for name in pending or ():
+                if name in action:
+                    document[name] = action[name]
+            changed = {name for name in set(action) | set(document) if action.get(name) != document.get(name)}
+            if changed:
+                action.clear()
+                action.update(document)
+                if INDEXED_FIELDS.intersection(changed):
+                    self._reindex(intent_id, action)
+            self.refreshes += 1
+            return action
+
+    def _load_one(self, intent_id: str) -> Optional[dict]:
+        # Actions created by another RTR worker are only in MongoDB
+        if not self.mongo_available:
+            return None
+        try:
+            document = self.collection.find_one({"intent_id": intent_id}, {"_id": 0})
+        except PyMongoError:
+            return None
+        if document is None:
+            return None
+        with self._lock:
+            if intent_id not in self._cache:
+                self._insert_cached(intent_id, document)
+            return self._cache[intent_id]
+
+    def update(self, intent_id: str, **fields) -> Optional[dict]:
+        """
+        Update fields of a stored action; the change is written to MongoDB on the next flush
+
+        Args:
+            intent_id: The intent_id of the action
+            **fields: Field values to set
+
+        Returns:
+            Optional[dict]: A copy of the updated action, or None if it does not exist
+        """
+        if self._fresh(intent_id) is None:
+            return None
+        return self.update_cached(intent_id, **fields)
+
+    def update_cached(self, intent_id: str, **fields) -> Optional[dict]:
+        """
+        Update fields of a cached action without reading it from MongoDB first, so the call never
+        blocks on MongoDB; for the event loop, on actions read or added just before
+
+        Returns:
+            Optional[dict]: A copy of the updated action, or None if it is not cached
+        """
+        with self._lock:
+            action = self._cache.get(intent_id)
+            if action is None:
+                return None
+            action.update(fields)
+            if INDEXED_FIELDS.intersection(fields):
+                self._reindex(intent_id, action)
+            if intent_id in self._dirty:
+                self.updates_coalesced += 1
+            self._dirty[intent_id] = merge_pending(self._dirty.get(intent_id, set()), set(fields))
+            updated = dict(action)
+            self._notify("updated", intent_id, fields, updated)
+            return updated
+
+    def update_if_status(self, intent_id: str, expected_status: str, **fields) -> Optional[dict]:
+        """
+        Update fields of a stored action only if its status is still the expected one
+
+        Returns:
+            Optional[dict]: A copy of the updated action, or None if it was not updated
+        """
+        self._fresh(intent_id)
+        with self._lock:
+            action = self._cache.get(intent_id)
+            if action is None or action.get("status") != expected_status:
+                return None
+            return self.update_cached(intent_id, **fields)
+
+    def delete(self, intent_id: str) -> bool:
+        """
+        Remove a stored action
+
+        Returns:
+            bool: True if the action existed
+        """
+        with self._lock:
+            action = self._cache.get(intent_id)
+            existed = self._remove_cached(intent_id)
+            self._dirty[intent_id] = DELETE
+            if existed:
+                self._notify("deleted", intent_id, {}, action)
+        return existed
+
+    def add_listener(self, listener: Callable[[str, str, dict, dict], None]):
+        """
+        Register a callback notified of every added, updated or deleted action
+
+        Args:
+            listener: Called as listener(event, intent_id, changed_fields, action) while the store
+                lock is held, so it must not block; event is 'added', 'updated' or 'deleted'
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, event: str, intent_id: str, fields: dict, action: dict):
+        # Callers hold self._lock, so listeners see the changes of an intent in order
+        for listener in self._listeners:
+            try:
+                listener(event, intent_id, fields, action)
+            except Exception as e:
+                logger.warning("Action store listener failed: %s", e, extra={"intent_id": intent_id})
+
+    def _insert_cached(self, intent_id: str, action: dict):
+        # Callers hold self._lock
+        self._cache[intent_id] = action
+        self._synced_at[intent_id] = time.monotonic()
+        self._append_position(intent_id, action)
+        self._seqs.append(self._next_seq)
+        self._next_seq += 1
+        self._reindex(intent_id, action)
+
+    def _append_position(self, intent_id: str, action: dict):
+        # Callers hold self._lock and append the sequence number
+        position = len(self._order)
+        created_at = action.get("created_at", 0)
+        latest = self._created[-1] if self._created else created_at
+        if created_at < latest:
+            self._late.append(position)
+        self._created.append(max(created_at, latest))
+        self._positions[intent_id] = position
+        self._order.append(intent_id)
+
+    def _remove_cached(self, intent_id: str) -> bool:
+        # Callers hold self._lock; the slot in self._order is left as a tombstone
+        if self._cache.pop(intent_id, None) is None:
+            return False
+        self._positions.pop(intent_id, None)
+        self._synced_at.pop(intent_id, None)
+        self._reindex(intent_id, None)
+        if len(self._order) - len(self._positions) > len(self._positions):
+            self._compact()
+        return True
+
+    def _compact(self):
+        # Callers hold self._lock; drop the tombstones once they outnumber the live actions
+        live = [(position, intent_id) for position, intent_id in enumerate(self._order)
+                if self._positions.get(intent_id) == position]
+        seqs = self._seqs
+        self._order, self._seqs, self._created, self._late = [], [], [], []
+        for position, intent_id in live:
+            self._append_position(intent_id, self._cache[intent_id])
+            self._seqs.append(seqs[position])
+
+    def _reindex(self, intent_id: str, action: Optional[dict]):
+        # Callers hold self._lock; a None action removes the intent from every index
+        previous = self._indexed_values.pop(intent_id, {})
+        current = {}
+        if action is not None:
+            for name, extract in SECONDARY_INDEXES.items():
+                current[name] = [index_key(value) for value in extract(action)]
+            self._indexed_values[intent_id] = current
+
+        for name, index in self._indexes.items():
+            old_values = set(previous.get(name, ()))
+            new_values = set(current.get(name, ()))
+            for value in old_values - new_values:
+                members = index.get(value)
+                if members is not None:
+                    members.discard(intent_id)
+                    if not members:
+                        del index[value]
+            for value in new_values - old_values:
+                index.setdefault(value, set()).add(intent_id)
+
+    def query(self, filters: Optional[Dict[str, str]] = None, since: Optional[float] = None,
+              until: Optional[float] = None, cursor: Optional[int] = None,
+              limit: int = 100) -> Tuple[List[dict], Optional[int]]:
+        """
+        Get a page of actions in insertion order, filtered through the secondary indexes
+
+        Args:
+            filters: Index name -> value; only actions matching every filter are returned
+            since: Only actions created at or after this epoch time
+            until: Only actions created at or before this epoch time
+            cursor: The next_cursor of the previous page, an insertion sequence number
+            limit: Maximum number of actions in the page
+
+        Returns:
+            Tuple[List[dict], Optional[int]]: Copies of the matching actions, and the cursor
+            of the next page (None when there are no more matches)
+
+        Raises:
+            KeyError: If a filter names an unknown index
+        """
+        with self._lock:
+            start = bisect.bisect_right(self._seqs, cursor) if cursor is not None else 0
+            # Positions before lo were all created before since, and those from hi on after until,
+            # apart from the late ones which are checked one by one
+            lo = bisect.bisect_left(self._created, since) if since is not None else 0
+            hi = bisect.bisect_right(self._created, until) if until is not None else len(self._order)
+            late = self._late[bisect.bisect_left(self._late, max(start, hi)):]
+            positions = self._candidate_positions(filters or {}, max(start, lo), hi, late)
+            page = []
+            page_cursor = next_cursor = None
+            for position in positions:
+                intent_id = self._order[position]
+                action = self._cache.get(intent_id)
+                if action is None or self._positions.get(intent_id) != position:
+                    continue
+                created_at = action.get("created_at", 0)
+                if (since is not None and created_at < since) or (until is not None and created_at > until):
+                    continue
+                if len(page) == limit:
+                    next_cursor = page_cursor
+                    break
+                page.append(dict(action))
+                page_cursor = self._seqs[position]
+        return page, next_cursor
+
+    def _candidate_positions(self, filters: Dict[str, str], start: int, end: int,
+                             late: List[int]) -> Iterable[int]:
+        # Callers hold self._lock; positions in [start, end) and the late ones after it, in order
+        if not filters:
+            return itertools.chain(range(start, end), late)
+
+        matches = []
+        for name, value in filters.items():
+            matches.append(self._indexes[name].get(index_key(value), set()))
+        matches.sort(key=len)
+        candidates = set(matches[0]).intersection(*matches[1:])
+        positions = sorted(self._positions[intent_id] for intent_id in candidates)
+        window = positions[bisect.bisect_left(positions, start):bisect.bisect_left(positions, end)]
+        return window + [position for position in late if self._order[position] in candidates]
+
+    def values(self) -> List[dict]:
+        """Get copies of all cached actions"""
+        with self._lock:
+            return [dict(action) for action in self._cache.values()]
+
+    def __contains__(self, intent_id: str) -> bool:
+        return intent_id in self._cache or self._load_one(intent_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def flush(self) -> int:
+        """
+        Write all pending changes to MongoDB in bulk_write batches
+
+        Returns:
+            int: Number of operations written
+        """
+        with self._lock:
+            if not self._dirty:
+                return 0
+            pending = self._dirty
+            self._dirty = {}
+            operations = []
+            # Position in operations -> (intent_id, created_at) of the actions inserted if absent
+            inserts: Dict[int, Tuple[str, object]] = {}
+            for intent_id, operation in pending.items():
+                action = self._cache.get(intent_id)
+                if operation == DELETE or action is None:
+                    operations.append(DeleteOne({"intent_id": intent_id}))
+                elif operation == INSERT:
+                    # Never overwrites an action with the same intent_id stored in the meantime
+                    inserts[len(operations)] = (intent_id, action.get("created_at"))
+                    operations.append(UpdateOne({"intent_id": intent_id}, {"$setOnInsert": dict(action)}, upsert=True))
+                else:
+                    # Only the changed fields: other workers may have changed the rest
+                    changes = {name: action[name] for name in operation if name in action}
+                    operations.append(UpdateOne({"intent_id": intent_id}, {"$set": changes}))
+
+        written = 0
+        conflicts = []
+        try:
+            for start in range(0, len(operations), self.batch_size):
+                result = self.collection.bulk_write(operations[start:start + self.batch_size], ordered=False)
+                written += len(operations[start:start + self.batch_size])
+                upserted = {start + index for index in result.upserted_ids}
+                conflicts += [insert for position, insert in inserts.items()
+                              if start <= position < start + self.batch_size and position not in upserted]
+            self.mongo_available = True
+        except PyMongoError as e:
+            self.flush_errors += 1
+            self.mongo_available = False
+            logger.warning("Failed to flush mitigation actions to MongoDB, will retry: %s", e)
+            with self._lock:
+                # Keep newer changes made while the flush was running
+                for intent_id, operation in pending.items():
+                    newer = self._dirty.get(intent_id)
+                    if newer is None and operation == DELETE and intent_id in self._cache:
+                        # Added again since, with an insert of its own
+                        continue
+                    self._dirty[intent_id] = operation if newer is None else merge_pending(operation, newer)
+
+        for intent_id, created_at in conflicts:
+            self._resolve_insert_conflict(intent_id, created_at)
+        self.flushes += 1
+        self.operations_written += written
+        return written
+
+    def _resolve_insert_conflict(self, intent_id: str, created_at):
+        # The insert found an action with the same intent_id in MongoDB
+        try:
+            document = self.collection.find_one({"intent_id": intent_id}, {"_id": 0})
+        except PyMongoError:
+            document = None
+        with self._lock:
+            action = self._cache.get(intent_id)
+            if action is None or action.get("created_at") != created_at:
+                return
+            newer = self._dirty.get(intent_id)
+            if document is None:
+                # Deleted in between, or unreadable: insert it again on the next flush
+                self._dirty[intent_id] = INSERT if newer is None else merge_pending(INSERT, newer)
+                return
+            if document.get("created_at") == created_at:
+                # Inserted by an earlier flush whose result was lost: write every field instead
+                self._dirty[intent_id] = set(action) if newer is None else merge_pending(set(action), newer)
+                return
+
+            # Another worker stored this intent_id while the action was only in memory: the stored one wins
+            self.insert_conflicts += 1
+            logger.warning("Action added while MongoDB was unreachable conflicts with a stored action "
+                           "with the same intent_id, keeping the stored one", extra={"intent_id": intent_id})
+            self._dirty.pop(intent_id, None)
+            action.clear()
+            action.update(document)
+            self._synced_at[intent_id] = time.monotonic()
+            self._reindex(intent_id, action)
+            self._notify("updated", intent_id, document, dict(action))
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            if (not self.mongo_available or not self.loaded) and not self.reconnect():
+                continue
+            self.flush()
+
+    def start(self):
+        """Start the background write-behind thread"""
+        if self._flusher is not None:
+            return
+        self._stop_event.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name="action-store-flusher", daemon=True)
+        self._flusher.start()
+
+    def stop(self):
+        """Stop the background thread and write the remaining changes"""
+        if self._flusher is not None:
+            self._stop_event.set()
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get cache and write-behind statistics for monitoring"""
+        return {
+            "cached_actions": len(self._cache),
+            "tombstones": len(self._order) - len(self._positions),
+            "indexed_values": {name: len(index) for name, index in self._indexes.items()},
+            "pending_writes": len(self._dirty),
+            "mongo_available": self.mongo_available,
+            "loaded": self.loaded,
+            "insert_conflicts": self.insert_conflicts,
+            "flush_interval": self.flush_interval,
+            "flushes": self.flushes,
+            "operations_written": self.operations_written,
+            "updates_coalesced": self.updates_coalesced,
+            "flush_errors": self.flush_errors,
+            "cache_ttl": self.cache_ttl,
+            "refreshes": self.refreshes,
+        }
@@ -0,0 +1,76 @@
+"""
+Micro-benchmark of variable extraction from free-text actions
+Compares the legacy extraction (one re.findall per template variable, an empty
+pattern for unknown variables) with the single-pass entity scanner.
+
+Run from the repository root:
+    python benchmarks/bench_entity_scan.py [iterations]
+"""
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from action_entities import scan_action_text
+from variable_resolver import VariableMap
+
+# The per-variable patterns used before the entity scanner
+expressions = ['port', 'ports']
+LEGACY_PATTERNS = {
+    'ipv4_and_subnet': r'\b(?:\d{1,3}\.){3}\d{1,3}(?:/\d{1,2})?\b',
+    'protocol': r'\b(tcp|udp)\b',
+    'requests_per_sec': r'\b(\d{1,3}\/s)\b',
+    'port': rf'\b(?:{"|".join(expressions)})\b\s*(\d+(?:,\d+)*)',
+    'interface_name': r'\b(eth\d+|en[pso]\w*|wlan\d+|lo)\b'
+}
+
+SAMPLE_ACTIONS = [
+    "Set the number of request to the dns server to a 5/s for port 55, protocol udp",
+    "rate limit DNS server at ip 10.10.2.1 at port 123, for 20 requests per second",
+    "Block potentially spoofed packets with destination 192.68.0.0/24 in interface wlan0",
+    "Block udp traffic from 10.0.0.1, 10.0.0.2 and 10.0.1.0/24 on ports 53,5353 on eth1",
+]
+
+# Variables of the dns_rate_limiting and dns_firewall_spoofing_detection playbooks, plus 'rate'
+VARIABLES = ['requests_per_sec', 'protocol', 'port', 'rate', 'ipv4_and_subnet', 'interface_name']
+
+
+def legacy_extract(text):
+    values = {}
+    for variable in VARIABLES:
+        value = re.findall(LEGACY_PATTERNS.get(variable, r''), text)
+        values[variable] = value[0] if value else 'default'
+    return values
+
+
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "RTR_configurations", "playbook_variables.json")) as f:
+    RESOLVER = VariableMap(json.load(f)).compile("benchmark.yaml", VARIABLES)
+
+
+def current_extract(text):
+    return RESOLVER.resolve(None, lambda: scan_action_text(text))
+
+
+def run(func, iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(SAMPLE_ACTIONS[i % len(SAMPLE_ACTIONS)])
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    for text in SAMPLE_ACTIONS:
+        print(f"{text}\n  legacy:  {legacy_extract(text)}\n  current: {current_extract(text)}")
+
+    results = {}
+    for label, func in (("legacy", legacy_extract), ("current", current_extract)):
+        elapsed = run(func, iterations)
+        results[label] = elapsed / iterations * 1e6
+        print(f"{label:<8} {iterations} intents in {elapsed:.3f}s -> {results[label]:.1f} us/intent")
+
+    print(f"speedup  {results['legacy'] / results['current']:.1f}x")
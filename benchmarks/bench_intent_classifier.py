@@ -0,0 +1,103 @@
+"""
+Micro-benchmark and accuracy check of free-text action classification
+Compares the legacy classifier (five regex findall passes, winner by raw
+match count) with the precompiled weighted keyword classifier, one action
+at a time and as a batch, over a corpus of free-text actions labelled with
+their expected action type.
+
+Run from the repository root:
+    python benchmarks/bench_intent_classifier.py [iterations] [corpus.jsonl]
+"""
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from config_loader import get_intent_classifier
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_corpus.jsonl")
+
+# The patterns playbook_creator rebuilt for every free-text action before the classifier
+LEGACY_PATTERNS = [
+    ('dns_rate_limiting.yaml', r'\b(reduce|decrease|requests|number|rate|limit|dns|server|service|\d{1,3}\/s)\b', 'DNS_RATE_LIMIT'),
+    ('dns_service_disable.yaml', r'\b(disable|shut down|dns|server|service)\b', 'DNS_SERV_DISABLE'),
+    ('dns_service_handover', r'\b(hand over|dns|server|service)\b', 'DNS_HANDOVER'),
+    ('dns_firewall_spoofing_detection.yaml', r'\b(spoof|spoofed|destination|spoofing|packets|firewall|interface|block|stop|ip|ip range)\b', 'DNS_FIREWALL_SPOOF'),
+    ('anycast_blackhole', r'\b(redirect|direct|dns|server|service|traffic|igress|blackhole)\b', 'ANYCAST_BLACKHOLE')
+]
+
+
+def legacy_classify(text):
+    """Legacy string_ansible_transformation: one findall per playbook, first highest count wins"""
+    best_match = ("UNKNOWN_ACTION_TYPE", None)
+    best_match_count = 0
+    for playbook_file, pattern, action_type in LEGACY_PATTERNS:
+        match_count = len(re.findall(pattern, text, re.IGNORECASE))
+        if match_count > best_match_count:
+            best_match_count = match_count
+            best_match = (action_type, playbook_file)
+    return best_match[0]
+
+
+def current_classify(text):
+    return get_intent_classifier().classify(text).action_type
+
+
+def batch_classify(texts):
+    return [result.action_type for result in get_intent_classifier().classify_batch(texts)]
+
+
+def load_corpus(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run(func, corpus, iterations):
+    """Time the classification of the whole corpus, returning (elapsed seconds, accuracy)"""
+    correct = sum(func(item["action"]) == item["expected"] for item in corpus)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for item in corpus:
+            func(item["action"])
+    return time.perf_counter() - start, correct / len(corpus)
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    corpus = load_corpus(sys.argv[2] if len(sys.argv) > 2 else DEFAULT_CORPUS)
+
+    # Silence the configuration loader output
+    with contextlib.redirect_stdout(io.StringIO()):
+        get_intent_classifier()
+
+    results = {}
+    for label, func in (("legacy", legacy_classify), ("current", current_classify)):
+        elapsed, accuracy = run(func, corpus, iterations)
+        results[label] = elapsed / (iterations * len(corpus)) * 1e6
+        print(f"{label:<8} {iterations * len(corpus)} actions in {elapsed:.3f}s -> "
+              f"{results[label]:.1f} us/action, accuracy {accuracy:.0%} on {len(corpus)} labelled actions")
+
+    # Replays classify whole traces at once. Distinct texts (a trailing number, which carries no keyword,
+    # keeps them apart) must each be scanned; repeated texts are scanned once per batch
+    expected = [current_classify(item["action"]) for item in corpus] * iterations
+    traces = (
+        ("distinct", [f"{item['action']} {i}" for i in range(iterations) for item in corpus]),
+        ("repeated", [item["action"] for item in corpus] * iterations),
+    )
+    for label, texts in traces:
+        start = time.perf_counter()
+        labels = batch_classify(texts)
+        elapsed = time.perf_counter() - start
+        if label == "repeated":
+            assert labels == expected
+        results[label] = elapsed / len(texts) * 1e6
+        print(f"batch/{label:<9} {len(texts)} actions in {elapsed:.3f}s -> {results[label]:.1f} us/action")
+
+    print(f"speedup  {results['legacy'] / results['current']:.1f}x single, "
+          f"{results['legacy'] / results['distinct']:.1f}x batch of distinct actions, "
+          f"{results['legacy'] / results['repeated']:.1f}x batch of repeated actions")
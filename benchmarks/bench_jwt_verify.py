@@ -0,0 +1,55 @@
+"""
+Benchmark of the authentication overhead per request
+Calls get_current_user() with the same token from several threads, as the IBI
+does when it reuses one token for its whole lifetime, with the verified-token
+cache disabled (a full jwt.decode per request) and enabled.
+
+Run from the repository root:
+    python benchmarks/bench_jwt_verify.py [requests] [threads]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import jwttoken
+from jwttoken import create_access_token, verified_tokens
+from oauth import get_current_user
+
+
+def run(token, requests_count, threads):
+    """Authenticate requests_count requests spread over threads, returning the elapsed seconds"""
+    per_thread = requests_count // threads
+
+    def client():
+        for _ in range(per_thread):
+            get_current_user(token)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for future in [pool.submit(client) for _ in range(threads)]:
+            future.result()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    requests_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    if not jwttoken.SECRET_KEY or not jwttoken.ALGORITHM:
+        jwttoken.rotate_secret_key("benchmark-secret", "HS256")
+    token = create_access_token({"sub": "ibi"})
+
+    results = {}
+    for label, max_entries in (("uncached", 0), ("cached", verified_tokens.max_entries or 1024)):
+        verified_tokens.clear()
+        verified_tokens.max_entries = max_entries
+        elapsed = run(token, requests_count, threads)
+        results[label] = elapsed / requests_count * 1e6
+        print(f"{label:<9} {requests_count} requests on {threads} threads in {elapsed:.3f}s "
+              f"-> {results[label]:.1f} us/request")
+
+    print(f"speedup   {results['uncached'] / results['cached']:.1f}x")
+    print(f"token cache {verified_tokens.get_stats()}")
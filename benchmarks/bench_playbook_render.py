@@ -0,0 +1,78 @@
+"""
+Micro-benchmark of the per-intent playbook render cost
+Compares the legacy pipeline, timed on the pinned previous code
+(legacy_regex_control.py: the playbook re-read and re-compiled, rendered in
+playbook_creator and again by fill_in_ansible_playbook), with the compiled
+pipeline without the render cache (compiled once, rendered once per intent)
+and the current one, where repeated mitigations are served from the render cache.
+
+Run from the repository root:
+    python benchmarks/bench_playbook_render.py [iterations]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, ".."))
+sys.path.insert(0, BENCHMARK_DIR)
+
+import legacy_regex_control
+from mitigation_action_class import mitigation_action_model
+from mitigation_regex_control import playbook_creator
+from template_registry import get_template_registry
+
+SAMPLE_ACTIONS = [
+    {"intent_id": "bench-dict", "action": {"name": "dns_rate_limit", "fields": {"rate": 20, "duration": 60}}},
+    {"intent_id": "bench-str", "action": "Set the number of request to the dns server to a 5/s for port 55, protocol udp"},
+]
+
+
+def legacy_intent(payload):
+    """Per-intent work of the legacy pipeline, as the previous /actions handler ran it"""
+    # The constructor renders the playbook, and the handler rendered it again
+    creator = legacy_regex_control.playbook_creator(mitigation_action_model(**payload))
+    creator.fill_in_ansible_playbook()
+
+
+def uncached_intent(payload):
+    """Per-intent work of the compiled pipeline with the render cache emptied before each intent"""
+    get_template_registry().renders.clear()
+    current_intent(payload)
+
+
+def current_intent(payload):
+    """Per-intent work of the current pipeline: one lazy render against the compiled template"""
+    creator = playbook_creator(mitigation_action_model(**payload))
+    for _ in range(2):
+        # The API and simple_uploader both read the stored render
+        creator.rendered_playbook
+
+
+def run(func, iterations):
+    """Time the given per-intent function, returning the total elapsed seconds"""
+    # Silence the playbook_creator console output while measuring
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(SAMPLE_ACTIONS[0])
+        start = time.perf_counter()
+        for i in range(iterations):
+            func(SAMPLE_ACTIONS[i % len(SAMPLE_ACTIONS)])
+        return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    # The legacy code reads ansible_playbooks/ relative to the working directory
+    os.chdir(os.path.join(BENCHMARK_DIR, ".."))
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    results = {}
+    for label, func in (("legacy", legacy_intent), ("uncached", uncached_intent), ("current", current_intent)):
+        elapsed = run(func, iterations)
+        results[label] = elapsed / iterations * 1e6
+        print(f"{label:<8} {iterations} intents in {elapsed:.3f}s -> {results[label]:.1f} us/intent")
+
+    print(f"speedup  {results['legacy'] / results['current']:.1f}x "
+          f"({results['uncached'] / results['current']:.1f}x from the render cache)")
+    print(f"render cache {get_template_registry().renders.get_stats()}")
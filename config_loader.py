@@ -4,9 +4,49 @@ Provides utilities to load and reload configuration files dynamically
 """
 import json
 import os
-from typing import Dict, Optional
+import time
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, List, Optional
 from pathlib import Path
 import threading
+from template_registry import PlaybookTemplate, get_template_registry
+from intent_classifier import IntentClassifier
+from variable_resolver import VariableMap, PlaybookResolver
+from jinja2 import TemplateNotFound
+
+
+class ConfigError(Exception):
+    """Raised when a configuration file cannot be loaded"""
+
+
+class ConfigSnapshot:
+    """
+    An immutable, fully loaded configuration: action mappings, the intent classifier,
+    the playbook variable table and the compiled templates of every mapped playbook.
+    A snapshot is built off the request path and replaces the live one in a single
+    assignment, so a request never sees a half-loaded configuration.
+    """
+    __slots__ = ("version", "mitigation_ansible_map", "rollback_map", "intent_classifier", "variable_map",
+                 "templates", "broken_mappings", "fingerprint", "warmup_seconds", "loaded_at")
+
+    def __init__(self, version: int, mitigation_ansible_map: Dict[str, str], rollback_map: Dict[str, str],
+                 intent_classifier: IntentClassifier, variable_map: VariableMap, templates: Dict[str, PlaybookTemplate],
+                 broken_mappings: Dict[str, dict], fingerprint: Dict[str, float], warmup_seconds: float):
+        self.version = version
+        self.mitigation_ansible_map = MappingProxyType(dict(mitigation_ansible_map))
+        # Action name -> playbook undoing the action when its duration expires
+        self.rollback_map = MappingProxyType(dict(rollback_map))
+        self.intent_classifier = intent_classifier
+        self.variable_map = variable_map
+        self.templates = MappingProxyType(dict(templates))
+        # Playbook -> the action names and intent classes mapped to it, and why it cannot be used
+        self.broken_mappings = MappingProxyType(dict(broken_mappings))
+        # Modification time of every watched file the snapshot was built from
+        self.fingerprint = fingerprint
+        # Time spent compiling the mapped playbook templates
+        self.warmup_seconds = warmup_seconds
+        self.loaded_at = time.time()
 
 
 class ConfigLoader:
@@ -30,34 +70,180 @@ class ConfigLoader:
             
         self._initialized = True
         self.config_dir = Path(__file__).parent / "RTR_configurations"
-        self._mitigation_ansible_map: Dict[str, str] = {}
-        self._load_all_configs()
+        self.playbook_dir = get_template_registry().playbook_dir
+        # Serializes snapshot builds (API reloads and the file watcher)
+        self._reload_lock = threading.Lock()
+        self.failed_reloads = 0
+        self.last_error: Optional[str] = None
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._install(self._build_snapshot())
     
-    def _load_all_configs(self):
-        """Load all configuration files"""
-        self._load_mitigation_ansible_map()
+    @property
+    def version(self) -> int:
+        """Version of the live configuration, incremented by every successful reload"""
+        return self._snapshot.version
     
-    def _load_mitigation_ansible_map(self):
-        """Load the mitigation action to Ansible playbook mapping"""
-        config_path = self.config_dir / "mitigation_ansible_map.json"
+    def get_snapshot(self) -> ConfigSnapshot:
+        """Get the live configuration snapshot; read it once per request for a consistent view"""
+        return self._snapshot
+    
+    def get_fingerprint(self) -> Dict[str, float]:
+        """
+        Get the modification time of every watched file: RTR_configurations/*.json and ansible_playbooks/*
+        
+        Returns:
+            Dict[str, float]: File path -> modification time
+        """
+        fingerprint = {}
+        for directory, pattern in ((self.config_dir, "*.json"), (self.playbook_dir, "*")):
+            for path in directory.glob(pattern):
+                try:
+                    fingerprint[str(path)] = path.stat().st_mtime
+                except OSError:
+                    continue
+        return fingerprint
+    
+    def _load_json(self, filename: str, fallback: str) -> dict:
+        """
+        Read one configuration file
+        
+        Args:
+            filename: File name in RTR_configurations/
+            fallback: What happens without the file, printed when the first load falls back to an empty configuration
+            
+        Returns:
+            dict: The parsed configuration
+            
+        Raises:
+            ConfigError: If the file cannot be read or parsed and a previous snapshot can stay live
+        """
+        config_path = self.config_dir / filename
         
         try:
             with open(config_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self._mitigation_ansible_map = data.get("action_name_to_playbook", {})
-            print(f"✅ Loaded mitigation_ansible_map.json with {len(self._mitigation_ansible_map)} action mappings")
+                return json.load(f)
         except FileNotFoundError:
-            print(f"⚠️ Configuration file not found: {config_path}")
-            print(f"   Using empty configuration")
-            self._mitigation_ansible_map = {}
+            message = f"Configuration file not found: {config_path}"
+            print(f"⚠️ {message}")
         except json.JSONDecodeError as e:
-            print(f"❌ Error parsing JSON in {config_path}: {e}")
-            print(f"   Using empty configuration")
-            self._mitigation_ansible_map = {}
+            message = f"Error parsing JSON in {config_path}: {e}"
+            print(f"❌ {message}")
         except Exception as e:
-            print(f"❌ Unexpected error loading {config_path}: {e}")
+            message = f"Unexpected error loading {config_path}: {e}"
+            print(f"❌ {message}")
+        
+        if self._snapshot is not None:
+            raise ConfigError(message)
+        print(f"   {fallback}")
+        return {}
+    
+    def _build_snapshot(self) -> ConfigSnapshot:
+        """
+        Load every configuration file and compile the templates of the mapped playbooks into a new snapshot
+        
+        Returns:
+            ConfigSnapshot: The new snapshot, not yet live
+            
+        Raises:
+            ConfigError: If a file is invalid and the live snapshot must be kept
+        """
+        # Taken first, so a file changed while loading triggers another reload
+        fingerprint = self.get_fingerprint()
+        
+        mitigation_ansible_config = self._load_json("mitigation_ansible_map.json", "Using empty configuration")
+        mitigation_ansible_map = mitigation_ansible_config.get("action_name_to_playbook", {})
+        rollback_map = mitigation_ansible_config.get("action_name_to_rollback_playbook", {})
+        print(f"✅ Loaded mitigation_ansible_map.json with {len(mitigation_ansible_map)} action mappings "
+              f"and {len(rollback_map)} rollback mappings")
+        
+        try:
+            intent_classifier = IntentClassifier(
+                self._load_json("intent_classifier.json", "Free-text actions will not be classified"))
+            variable_map = VariableMap(
+                self._load_json("playbook_variables.json", "Playbook variables will use UNKNOWN_VALUE"))
+        except ValueError as e:
+            if self._snapshot is not None:
+                raise ConfigError(str(e))
+            print(f"❌ Invalid configuration: {e}")
             print(f"   Using empty configuration")
-            self._mitigation_ansible_map = {}
+            intent_classifier, variable_map = IntentClassifier({}), VariableMap({})
+        print(f"✅ Loaded intent_classifier.json with {len(intent_classifier.classes)} intent classes")
+        print(f"✅ Loaded playbook_variables.json with {len(variable_map.resolvers)} variables")
+        
+        # Warm-up: resolve every mapping and compile each referenced template before the snapshot goes live,
+        # so compile cost is paid here instead of by the first intent, and broken mappings are known up front
+        started = time.perf_counter()
+        references: Dict[str, List[str]] = {}
+        for action_name, path in mitigation_ansible_map.items():
+            references.setdefault(os.path.basename(path), []).append(action_name)
+        for action_type, playbook in intent_classifier.classes:
+            references.setdefault(playbook, []).append(action_type)
+        for action_name, path in rollback_map.items():
+            references.setdefault(os.path.basename(path), []).append(f"{action_name} (rollback)")
+        
+        templates, broken_mappings = {}, {}
+        registry = get_template_registry()
+        for playbook, action_names in references.items():
+            try:
+                templates[playbook] = registry.compile(playbook)
+            except TemplateNotFound:
+                broken_mappings[playbook] = {"actions": action_names, "error": "Playbook template not found"}
+                continue
+            except Exception as e:
+                if self._snapshot is not None:
+                    raise ConfigError(f"Error compiling playbook {playbook}: {e}")
+                broken_mappings[playbook] = {"actions": action_names, "error": f"Error compiling playbook: {e}"}
+                continue
+            variable_map.compile(playbook, templates[playbook].variables)
+        warmup_seconds = time.perf_counter() - started
+        # Every mapped playbook is compiled, so the snapshot's variable map never changes once it is live
+        variable_map.freeze()
+        
+        for playbook, variables in variable_map.get_unmapped_variables().items():
+            print(f"⚠️ Playbook {playbook} uses variables missing from playbook_variables.json: {', '.join(variables)}")
+        for playbook, broken in broken_mappings.items():
+            print(f"❌ Broken mapping {', '.join(broken['actions'])} -> {playbook}: {broken['error']}")
+        print(f"🔥 Compiled {len(templates)} playbook templates in {warmup_seconds * 1000:.1f} ms")
+        
+        version = self._snapshot.version + 1 if self._snapshot is not None else 1
+        return ConfigSnapshot(version, mitigation_ansible_map, rollback_map, intent_classifier, variable_map,
+                              templates, broken_mappings, fingerprint, warmup_seconds)
+    
+    def _install(self, snapshot: ConfigSnapshot) -> int:
+        """Make a snapshot live, returning the number of compiled templates it replaced"""
+        self._snapshot = snapshot
+        return get_template_registry().install(snapshot.templates)
+    
+    def get_mapped_playbooks(self) -> List[str]:
+        """Get the file names of every playbook an action name or intent class maps to"""
+        snapshot = self._snapshot
+        playbooks = [os.path.basename(path) for path in snapshot.mitigation_ansible_map.values()]
+        playbooks += [playbook for _, playbook in snapshot.intent_classifier.classes]
+        playbooks += [os.path.basename(path) for path in snapshot.rollback_map.values()]
+        return list(dict.fromkeys(playbooks))
+    
+    def get_playbook_resolver(self, playbook: str) -> PlaybookResolver:
+        """
+        Get the compiled variable resolvers of a playbook
+        
+        Args:
+            playbook: Playbook file name relative to ansible_playbooks/
+            
+        Returns:
+            PlaybookResolver: The resolvers of the playbook's variables
+            
+        Raises:
+            jinja2.TemplateNotFound: If the live snapshot holds no compiled template for the playbook
+        """
+        snapshot = self._snapshot
+        template = snapshot.templates.get(playbook)
+        if template is None:
+            raise TemplateNotFound(playbook)
+        return snapshot.variable_map.compile(playbook, template.variables)
+    
+    def get_intent_classifier(self) -> IntentClassifier:
+        """Get the compiled free-text intent classifier"""
+        return self._snapshot.intent_classifier
     
     def get_playbook_path(self, action_name: str) -> str:
         """
@@ -73,45 +259,178 @@ class ConfigLoader:
             ValueError: If the action name is not found in the configuration
         """
         action_name_upper = action_name.upper()
+        mitigation_ansible_map = self._snapshot.mitigation_ansible_map
         
-        if action_name_upper not in self._mitigation_ansible_map:
-            available_actions = ', '.join(sorted(self._mitigation_ansible_map.keys()))
+        if action_name_upper not in mitigation_ansible_map:
+            available_actions = ', '.join(sorted(mitigation_ansible_map.keys()))
             raise ValueError(
                 f"No playbook mapping found for action '{action_name}'. "
                 f"Available actions (case insensitive): {available_actions}"
             )
         
-        return self._mitigation_ansible_map[action_name_upper]
+        return mitigation_ansible_map[action_name_upper]
+    
+    def get_rollback_playbook_path(self, action_name: str) -> Optional[str]:
+        """
+        Get the Ansible playbook undoing an action when its duration expires
+        
+        Args:
+            action_name: The name of the mitigation action or the classified action type (case-insensitive)
+            
+        Returns:
+            Optional[str]: The path to the rollback playbook, or None if the action cannot be rolled back
+        """
+        return self._snapshot.rollback_map.get(action_name.upper())
     
     def get_all_action_mappings(self) -> Dict[str, str]:
         """Get a copy of all action to playbook mappings"""
-        return self._mitigation_ansible_map.copy()
+        return dict(self._snapshot.mitigation_ansible_map)
     
     def reload_configs(self) -> Dict[str, str]:
         """
-        Reload all configuration files
+        Reload all configuration files into a new snapshot and make it live
         
         Returns:
             Dict with status information about the reload
+            
+        Raises:
+            ConfigError: If a file is invalid; the previous configuration stays live
         """
         print("🔄 Reloading RTR configurations...")
         
-        old_count = len(self._mitigation_ansible_map)
-        self._load_all_configs()
-        new_count = len(self._mitigation_ansible_map)
+        with self._reload_lock:
+            previous = self._snapshot
+            try:
+                snapshot = self._build_snapshot()
+            except ConfigError as e:
+                self.failed_reloads += 1
+                self.last_error = str(e)
+                print(f"❌ Reload failed, keeping configuration version {previous.version}: {e}")
+                raise
+            
+            # Compiled playbook templates are replaced, and playbooks rendered again, on next use
+            cleared_renders = get_template_registry().renders.clear()
+            cleared_templates = self._install(snapshot)
+            self.last_error = None
         
         status = {
             "status": "success",
             "message": "Configurations reloaded successfully",
+            "version": snapshot.version,
             "mitigation_ansible_map": {
-                "previous_count": old_count,
-                "current_count": new_count,
-                "actions": list(self._mitigation_ansible_map.keys())
+                "previous_count": len(previous.mitigation_ansible_map),
+                "current_count": len(snapshot.mitigation_ansible_map),
+                "actions": list(snapshot.mitigation_ansible_map.keys()),
+                "rollback_actions": list(snapshot.rollback_map.keys())
+            },
+            "template_cache": {
+                "cleared_templates": cleared_templates,
+                "cleared_renders": cleared_renders,
+                "compiled_templates": sorted(snapshot.templates.keys()),
+                "broken_mappings": self.get_broken_mappings()
+            },
+            "playbook_variables": {
+                "mapped_variables": len(snapshot.variable_map.resolvers),
+                "unmapped_variables": snapshot.variable_map.get_unmapped_variables()
+            },
+            "intent_classifier": {
+                "intent_classes": [action_type for action_type, _ in snapshot.intent_classifier.classes],
+                "indexed_terms": snapshot.intent_classifier.term_count
             }
         }
         
-        print(f"✅ Configurations reloaded: {new_count} action mappings loaded")
+        print(f"✅ Configurations reloaded: {len(snapshot.mitigation_ansible_map)} action mappings loaded "
+              f"(version {snapshot.version})")
         return status
+    
+    def get_broken_mappings(self) -> List[Dict[str, object]]:
+        """
+        Get the mappings of the live configuration whose playbook cannot be used
+        
+        Returns:
+            List[Dict[str, object]]: One entry per playbook with the action names mapped to it and the error
+        """
+        return [
+            {"playbook": playbook, "actions": list(broken["actions"]), "error": broken["error"]}
+            for playbook, broken in self._snapshot.broken_mappings.items()
+        ]
+    
+    def get_stats(self) -> Dict[str, object]:
+        """Get the live configuration version and reload statistics for monitoring"""
+        snapshot = self._snapshot
+        return {
+            "version": snapshot.version,
+            "loaded_at": datetime.fromtimestamp(snapshot.loaded_at).isoformat(),
+            "action_mappings": len(snapshot.mitigation_ansible_map),
+            "rollback_mappings": len(snapshot.rollback_map),
+            "compiled_templates": sorted(snapshot.templates.keys()),
+            "broken_mappings": self.get_broken_mappings(),
+            "warmup_ms": round(snapshot.warmup_seconds * 1000, 1),
+            "watched_files": len(snapshot.fingerprint),
+            "failed_reloads": self.failed_reloads,
+            "last_error": self.last_error,
+        }
+
+
+class ConfigWatcher:
+    """
+    Background thread polling the modification times of RTR_configurations/*.json
+    and ansible_playbooks/, reloading the configuration when any of them changes
+    """
+    
+    def __init__(self, loader: "ConfigLoader", interval: float = None):
+        """
+        Args:
+            loader: The configuration loader to reload
+            interval: Seconds between polls (CONFIG_WATCH_INTERVAL, default 2; 0 disables watching)
+        """
+        self.loader = loader
+        self.interval = interval if interval is not None else float(os.getenv("CONFIG_WATCH_INTERVAL", "2"))
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Fingerprint of the last failed reload, so a broken file is not reloaded on every poll
+        self._failed_fingerprint: Optional[Dict[str, float]] = None
+    
+    def check(self) -> bool:
+        """
+        Reload the configuration if a watched file changed since the live snapshot was built
+        
+        Returns:
+            bool: True if a new snapshot went live
+        """
+        fingerprint = self.loader.get_fingerprint()
+        if fingerprint == self.loader.get_snapshot().fingerprint or fingerprint == self._failed_fingerprint:
+            return False
+        try:
+            self.loader.reload_configs()
+        except ConfigError:
+            self._failed_fingerprint = fingerprint
+            return False
+        self._failed_fingerprint = None
+        return True
+    
+    def _watch_loop(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"❌ Configuration watcher error: {e}")
+    
+    def start(self):
+        """Start the background polling thread"""
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch_loop, name="config-watcher", daemon=True)
+        self._thread.start()
+        print(f"👀 Watching RTR configurations and playbooks every {self.interval}s")
+    
+    def stop(self):
+        """Stop the background polling thread"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
 
 
 # Global singleton instance
@@ -142,6 +461,29 @@ def reload_configurations() -> Dict[str, str]:
     return loader.reload_configs()
 
 
+def get_intent_classifier() -> IntentClassifier:
+    """
+    Get the free-text intent classifier compiled from the current configuration
+    
+    Returns:
+        IntentClassifier: The classifier, rebuilt on every configuration reload
+    """
+    return get_config_loader().get_intent_classifier()
+
+
+def get_playbook_resolver(playbook: str) -> PlaybookResolver:
+    """
+    Get the compiled variable resolvers of a playbook
+    
+    Args:
+        playbook: Playbook file name relative to ansible_playbooks/
+        
+    Returns:
+        PlaybookResolver: The resolvers of the playbook's variables
+    """
+    return get_config_loader().get_playbook_resolver(playbook)
+
+
 def get_playbook_for_action(action_name: str) -> str:
     """
     Get the playbook path for a given action name
@@ -159,6 +501,19 @@ def get_playbook_for_action(action_name: str) -> str:
     return loader.get_playbook_path(action_name)
 
 
+def get_rollback_playbook_for_action(action_name: str) -> Optional[str]:
+    """
+    Get the playbook path undoing an action when its duration expires
+    
+    Args:
+        action_name: The name of the mitigation action
+        
+    Returns:
+        Optional[str]: The path to the rollback playbook, or None if the action cannot be rolled back
+    """
+    return get_config_loader().get_rollback_playbook_path(action_name)
+
+
 if __name__ == "__main__":
     # Test the configuration loader
     print("Testing ConfigLoader...")
@@ -0,0 +1,198 @@
+"""
+Background DOC registration for RTR
+ePEM must know the DOC (Distributed Orchestration Component) address before it
+can forward RTR requests. Registration runs as a background task retried with
+exponential backoff and jitter, so startup never waits on ePEM, and is
+repeated whenever ePEM starts rejecting RTR requests.
+"""
+import asyncio
+import os
+import random
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from epem_client import get_domain_endpoints, get_epem_client
+from structured_logging import get_logger
+
+logger = get_logger("doc_registration")
+
+# Dispatch outcomes suggesting ePEM lost the DOC address (e.g. after an ePEM restart)
+REREGISTER_STATUSES = ("epem_rejected", "epem_not_found", "epem_server_error", "epem_connection_error")
+
+
+class DocRegistrationError(Exception):
+    """Raised when ePEM does not accept the DOC endpoint"""
+
+
+def register_doc_endpoint() -> str:
+    """
+    Send the DOC IP, port and path of the current domain to ePEM
+
+    Returns:
+        str: The ePEM response
+
+    Raises:
+        DocRegistrationError: If ePEM cannot be reached or does not answer 200
+    """
+    # Get the ePEM and DOC endpoints of the current domain
+    epem_endpoint, doc_endpoint = get_domain_endpoints()
+
+    # Parse the DOC endpoint to extract IP and port
+    parsed_url = urlparse(doc_endpoint)
+    doc_ip = parsed_url.hostname
+    doc_port = parsed_url.port or (443 if parsed_url.scheme == 'https' else 80)
+    doc_path = parsed_url.path or '/api/mitigate'
+
+    # Ensure doc_path starts with /
+    if not doc_path.startswith('/'):
+        doc_path = '/' + doc_path
+
+    logger.info("Configuring ePEM at %s with the DOC endpoint", epem_endpoint,
+                extra={"doc_ip": doc_ip, "doc_port": doc_port, "doc_path": doc_path})
+
+    # Send the configuration to ePEM over the shared connection pool
+    epem_client = get_epem_client(epem_endpoint)
+    params = {
+        'doc_ip': doc_ip,
+        'doc_port': doc_port,
+        'path': doc_path
+    }
+
+    try:
+        response = epem_client.post(
+            "/v2/horse/set_doc_ip_port",
+            params=params,
+            timeout=(epem_client.connect_timeout, 5)
+        )
+    except requests.exceptions.Timeout:
+        raise DocRegistrationError("Timeout when trying to configure ePEM")
+    except requests.exceptions.ConnectionError:
+        raise DocRegistrationError("Connection error when trying to configure ePEM - ePEM may not be running yet")
+
+    if response.status_code != 200:
+        raise DocRegistrationError(f"ePEM configuration returned status {response.status_code}: {response.text}")
+    return response.text
+
+
+class DocRegistrar:
+    """
+    Background task registering the DOC endpoint at ePEM until it succeeds.
+    The delay before retry n is drawn uniformly from [0, min(max_delay, base_delay * 2^n)]
+    ("full jitter"), so RTR replicas restarted together do not retry in lockstep.
+    """
+
+    def __init__(self, base_delay: Optional[float] = None, max_delay: Optional[float] = None, register=None):
+        """
+        Args:
+            base_delay: Seconds of the first backoff step (DOC_REGISTRATION_BACKOFF, default 1)
+            max_delay: Upper bound of the backoff (DOC_REGISTRATION_BACKOFF_MAX, default 60)
+            register: Callable performing one registration attempt, register_doc_endpoint by default
+        """
+        self.base_delay = base_delay or float(os.getenv("DOC_REGISTRATION_BACKOFF", "1"))
+        self.max_delay = max_delay or float(os.getenv("DOC_REGISTRATION_BACKOFF_MAX", "60"))
+        self.register = register or register_doc_endpoint
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+        self.state = "pending"
+        self.registered = False
+        self.attempts = 0
+        self.failures = 0
+        self.registrations = 0
+        self.reregistrations = 0
+        self.last_error: Optional[str] = None
+        self.last_trigger: Optional[str] = None
+        self.registered_at: Optional[float] = None
+        self.next_attempt_at: Optional[float] = None
+
+    def backoff(self, retry: int) -> float:
+        """Get the jittered delay before the given retry (0 for the first)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** retry)))
+
+    async def start(self):
+        """Start registering in the background; must be called from the running event loop"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._wake.set()
+        self._task = asyncio.create_task(self._run(), name="doc-registration")
+
+    async def stop(self):
+        """Stop the background task"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        self.state = "stopped"
+
+    def request_registration(self, reason: str):
+        """
+        Register again as soon as possible; safe to call from any thread
+
+        Args:
+            reason: Why registration is repeated, reported in the status
+        """
+        if self._loop is None or self._wake is None or not self.registered:
+            # Not started yet, or a registration is already pending
+            return
+        self.registered = False
+        self.state = "pending"
+        self.last_trigger = reason
+        self.reregistrations += 1
+        logger.info("Registering the DOC endpoint at ePEM again: %s", reason)
+        self._loop.call_soon_threadsafe(self._wake.set)
+
+    def on_dispatch_result(self, action_status: str, info: str):
+        """Repeat the registration when ePEM rejects an RTR request"""
+        if action_status in REREGISTER_STATUSES:
+            self.request_registration(f"ePEM answered {action_status}: {info}")
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            retry = 0
+            while not self.registered:
+                self.state = "registering"
+                self.attempts += 1
+                try:
+                    response = await asyncio.get_running_loop().run_in_executor(None, self.register)
+                except Exception as e:
+                    self.failures += 1
+                    self.last_error = str(e)
+                    delay = self.backoff(retry)
+                    retry += 1
+                    self.state = "retrying"
+                    self.next_attempt_at = time.time() + delay
+                    logger.warning("DOC registration failed (%s), retrying in %.1fs", e, delay)
+                    await asyncio.sleep(delay)
+                    continue
+                self.registered = True
+                self.registrations += 1
+                self.state = "registered"
+                self.last_error = None
+                self.registered_at = time.time()
+                self.next_attempt_at = None
+                logger.info("ePEM configured successfully with the DOC endpoint", extra={"response": response})
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get the registration state for health and monitoring"""
+        return {
+            "state": self.state,
+            "registered": self.registered,
+            "registered_at": datetime.fromtimestamp(self.registered_at).isoformat() if self.registered_at else None,
+            "attempts": self.attempts,
+            "failures": self.failures,
+            "registrations": self.registrations,
+            "reregistrations": self.reregistrations,
+            "last_error": self.last_error,
+            "last_trigger": self.last_trigger,
+            "next_attempt_at": datetime.fromtimestamp(self.next_attempt_at).isoformat() if self.next_attempt_at else None,
+        }
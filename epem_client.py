@@ -0,0 +1,157 @@
+"""
+Pooled HTTP client for ePEM
+Keeps one keep-alive requests.Session per ePEM endpoint, so intents reuse
+open TCP connections instead of paying a new handshake per request
+"""
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from structured_logging import get_logger
+
+logger = get_logger("epem_client")
+
+
+def get_domain_endpoints() -> Tuple[str, str]:
+    """
+    Get the ePEM and DOC endpoints of the current domain
+
+    Returns:
+        Tuple[str, str]: (epem_endpoint, doc_endpoint) selected by CURRENT_DOMAIN, defaulting to CNIT
+    """
+    current_domain = os.getenv('CURRENT_DOMAIN', 'CNIT').upper()
+    if current_domain == 'UPC':
+        return os.getenv('EPEM_UPC', 'http://10.19.2.20:5002'), os.getenv('DOC_UPC', 'http://10.19.2.19:8001')
+    if current_domain == 'UMU':
+        return os.getenv('EPEM_UMU', 'http://10.0.0.1:5002'), os.getenv('DOC_UMU', 'http://10.0.0.2:8001')
+    if current_domain != 'CNIT':
+        logger.warning("Unknown domain '%s', defaulting to CNIT", current_domain)
+    return os.getenv('EPEM_CNIT', 'http://192.168.130.233:5002'), os.getenv('DOC_CNIT', 'http://192.168.130.62:8001')
+
+
+class EpemClient:
+    """
+    Keep-alive HTTP client bound to a single ePEM endpoint.
+    requests.Session is safe to share between the dispatch worker threads;
+    the adapter pool is sized so every worker can hold its own connection.
+    """
+
+    def __init__(self, base_url: str, pool_size: Optional[int] = None,
+                 connect_timeout: Optional[float] = None, read_timeout: Optional[float] = None):
+        """
+        Args:
+            base_url: The ePEM endpoint, e.g. http://192.168.130.233:5002
+            pool_size: Maximum kept-alive connections (EPEM_POOL_MAXSIZE, default EPEM_DISPATCH_WORKERS or 8)
+            connect_timeout: TCP connect timeout in seconds (EPEM_CONNECT_TIMEOUT, default 3)
+            read_timeout: Response read timeout in seconds (EPEM_READ_TIMEOUT, default 10)
+        """
+        self.base_url = base_url.rstrip('/')
+        self.pool_size = pool_size or int(os.getenv("EPEM_POOL_MAXSIZE", os.getenv("EPEM_DISPATCH_WORKERS", "8")))
+        self.connect_timeout = connect_timeout or float(os.getenv("EPEM_CONNECT_TIMEOUT", "3"))
+        self.read_timeout = read_timeout or float(os.getenv("EPEM_READ_TIMEOUT", "10"))
+
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+        self._stats_lock = threading.Lock()
+        self.requests_sent = 0
+        self.errors = 0
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """The (connect, read) timeout pair used by default for every request"""
+        return self.connect_timeout, self.read_timeout
+
+    def post(self, path: str, timeout: Optional[Tuple[float, float]] = None, **kwargs) -> requests.Response:
+        """
+        Send a POST request to the ePEM endpoint over a pooled connection
+
+        Args:
+            path: Request path, e.g. /v2/horse/rtr_request
+            timeout: Optional (connect, read) timeout overriding the client defaults
+            **kwargs: Passed through to requests.Session.post (json, params, headers, ...)
+
+        Returns:
+            requests.Response: The ePEM response
+        """
+        with self._stats_lock:
+            self.requests_sent += 1
+        try:
+            return self.session.post(self.base_url + path, timeout=timeout or self.timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._stats_lock:
+                self.errors += 1
+            raise
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get connection reuse statistics of the underlying connection pools"""
+        connections_opened = 0
+        pooled_requests = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections_opened += pool.num_connections
+            pooled_requests += pool.num_requests
+
+        return {
+            "endpoint": self.base_url,
+            "pool_size": self.pool_size,
+            "connect_timeout": self.connect_timeout,
+            "read_timeout": self.read_timeout,
+            "requests_sent": self.requests_sent,
+            "errors": self.errors,
+            "connections_opened": connections_opened,
+            "connections_reused": max(pooled_requests - connections_opened, 0),
+            "reuse_ratio": round(1 - connections_opened / pooled_requests, 4) if pooled_requests else 0.0,
+        }
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+# One shared client per ePEM endpoint
+_clients: Dict[str, EpemClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_epem_client(endpoint: Optional[str] = None) -> EpemClient:
+    """
+    Get the shared pooled client of an ePEM endpoint
+
+    Args:
+        endpoint: The ePEM endpoint; defaults to the ePEM of the current domain
+
+    Returns:
+        EpemClient: The shared client, created on first use
+    """
+    if endpoint is None:
+        endpoint, _ = get_domain_endpoints()
+    client = _clients.get(endpoint)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(endpoint)
+            if client is None:
+                client = EpemClient(endpoint)
+                _clients[endpoint] = client
+    return client
+
+
+def get_all_client_stats() -> Dict[str, Dict[str, object]]:
+    """Get the connection reuse statistics of every ePEM client"""
+    return {endpoint: client.get_stats() for endpoint, client in list(_clients.items())}
+
+
+def close_all_clients():
+    """Close the connection pools of every ePEM client"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,212 @@
+"""
+Asynchronous ePEM dispatch queue for RTR
+Rendered playbooks are queued in a bounded in-process queue and forwarded
+to ePEM by a pool of async workers, so API handlers never block on ePEM
+"""
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from structured_logging import get_logger, intent_id_var
+from tracing import get_tracer
+
+logger = get_logger("dispatcher")
+
+
+class DispatchQueueFull(Exception):
+    """Raised when the dispatch queue cannot accept more jobs"""
+
+
+class DispatchJob:
+    """
+    A rendered playbook waiting to be forwarded to ePEM, with every intent it enforces
+    """
+    __slots__ = ("intent_id", "intent_ids", "playbook", "enqueued_at")
+
+    def __init__(self, intent_id: str, playbook, coalesced_intent_ids=()):
+        self.intent_id = intent_id
+        self.intent_ids = (intent_id,) + tuple(coalesced_intent_ids)
+        self.playbook = playbook
+        self.enqueued_at = time.monotonic()
+
+
+class EpemDispatcher:
+    """
+    Bounded queue feeding N async workers that post playbooks to ePEM.
+    The blocking upload runs in a dedicated thread pool sized to the number
+    of workers, so a slow ePEM never ties up the FastAPI request threadpool.
+    """
+
+    def __init__(self, status_callback: Callable[[str, str, str], None],
+                 queue_size: Optional[int] = None, workers: Optional[int] = None,
+                 on_dispatched: Optional[Callable[[DispatchJob, bool], None]] = None):
+        """
+        Args:
+            status_callback: Called as status_callback(intent_id, status, info) when a job completes,
+                from a dispatch thread
+            queue_size: Maximum number of queued jobs (EPEM_DISPATCH_QUEUE_SIZE, default 1000)
+            workers: Number of concurrent workers (EPEM_DISPATCH_WORKERS, default 8)
+            on_dispatched: Called once per job as on_dispatched(job, success) after its statuses were reported,
+                from a dispatch thread
+        """
+        self.status_callback = status_callback
+        self.on_dispatched = on_dispatched
+        self.queue_size = queue_size or int(os.getenv("EPEM_DISPATCH_QUEUE_SIZE", "1000"))
+        self.worker_count = workers or int(os.getenv("EPEM_DISPATCH_WORKERS", "8"))
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._accepting = False
+
+        self.in_flight = 0
+        self.enqueued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.total_queue_wait = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._accepting
+
+    async def start(self):
+        """Start the worker pool; must be called from the running event loop"""
+        if self._accepting:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self.worker_count, thread_name_prefix="epem-dispatch")
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"epem-dispatch-{i}")
+            for i in range(self.worker_count)
+        ]
+        self._accepting = True
+        logger.info("ePEM dispatcher started with %d workers (queue size %d)", self.worker_count, self.queue_size)
+
+    def has_capacity(self) -> bool:
+        """Whether a job submitted now would be accepted"""
+        return self._accepting and not self._queue.full()
+
+    def submit(self, intent_id: str, playbook, coalesced_intent_ids=()) -> int:
+        """
+        Queue a rendered playbook for dispatch to ePEM
+
+        Args:
+            intent_id: The intent the playbook belongs to
+            playbook: A playbook_creator whose playbook has been rendered
+            coalesced_intent_ids: Other intents enforced by the same playbook; they receive the same status
+
+        Returns:
+            int: The queue depth after the job was added
+
+        Raises:
+            DispatchQueueFull: If the queue is full or the dispatcher is draining
+        """
+        if not self._accepting:
+            self.rejected += 1
+            raise DispatchQueueFull("ePEM dispatcher is not accepting new actions")
+        try:
+            self._queue.put_nowait(DispatchJob(intent_id, playbook, coalesced_intent_ids))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise DispatchQueueFull(f"ePEM dispatch queue is full ({self.queue_size} actions pending)")
+
+        self.enqueued += 1
+        depth = self._queue.qsize()
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        return depth
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            self.in_flight += 1
+            queue_wait = time.monotonic() - job.enqueued_at
+            self.total_queue_wait += queue_wait
+            intent_token = intent_id_var.set(job.intent_id)
+            try:
+                # Continue the trace the intent was received in
+                with get_tracer().span("dispatch", parent=getattr(job.playbook, "trace_parent", None),
+                                       intent_id=job.intent_id, intent_ids=list(job.intent_ids),
+                                       queue_wait_ms=round(queue_wait * 1000, 3)):
+                    # run_in_executor does not carry context variables over: run the job in a copy of ours
+                    success = await loop.run_in_executor(self._executor, contextvars.copy_context().run,
+                                                         self._dispatch, job)
+                if success:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error("Error reporting the dispatch of intent: %s", e)
+            finally:
+                intent_id_var.reset(intent_token)
+                self.in_flight -= 1
+                self._queue.task_done()
+
+    def _dispatch(self, job: DispatchJob) -> bool:
+        """
+        Post a job to ePEM and report its outcome. Runs in the dispatch thread pool, so the callbacks
+        may read the action store and render playbooks without blocking the event loop
+        """
+        try:
+            success = job.playbook.simple_uploader()
+            for intent_id in job.intent_ids:
+                self.status_callback(intent_id, job.playbook.mitigation_action.status,
+                                     job.playbook.mitigation_action.info)
+            if self.on_dispatched is not None:
+                self.on_dispatched(job, success)
+            return success
+        except Exception as e:
+            logger.error("Error dispatching intent: %s", e)
+            for intent_id in job.intent_ids:
+                self.status_callback(intent_id, "error", f"Error in ePEM dispatch: {str(e)}")
+            return False
+
+    async def stop(self, drain_timeout: Optional[float] = None):
+        """
+        Stop accepting jobs, wait for queued jobs to be dispatched and stop the workers
+
+        Args:
+            drain_timeout: Seconds to wait for the queue to drain (EPEM_DISPATCH_DRAIN_TIMEOUT, default 10)
+        """
+        if drain_timeout is None:
+            drain_timeout = float(os.getenv("EPEM_DISPATCH_DRAIN_TIMEOUT", "10"))
+        self._accepting = False
+
+        pending = self._queue.qsize() + self.in_flight
+        if pending:
+            logger.info("Draining ePEM dispatch queue (%d actions pending)", pending)
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("ePEM dispatch queue not drained after %ss, %d actions left undispatched",
+                           drain_timeout, self._queue.qsize() + self.in_flight)
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        logger.info("ePEM dispatcher stopped")
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get queue depth and throughput counters for monitoring"""
+        dispatched = self.completed + self.failed
+        return {
+            "accepting": self._accepting,
+            "workers": self.worker_count,
+            "queue_depth": self._queue.qsize(),
+            "queue_size": self.queue_size,
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": self.in_flight,
+            "enqueued": self.enqueued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_queue_wait_seconds": round(self.total_queue_wait / dispatched, 4) if dispatched else 0.0,
+        }
@@ -0,0 +1,208 @@
+"""
+Expiry scheduler for RTR mitigation actions
+Actions enforced for a limited duration are tracked in a min-heap of expiry
+times. A single async task sleeps until the earliest expiry and hands every
+expired action to a callback, which dispatches the playbook undoing it.
+An expiry whose callback fails is pushed back with an exponential backoff.
+The expiry time is stored on the action itself, so the heap is rebuilt from
+the action store after a restart.
+"""
+import asyncio
+import heapq
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from structured_logging import get_logger, intent_id_var
+
+logger = get_logger("expiry")
+
+
+class ExpiryScheduler:
+    """
+    Min-heap of (expires_at, intent_id). Rescheduling or cancelling an action only
+    updates its deadline in a dict; stale heap entries are skipped when popped, and
+    the heap is compacted when they outnumber the live ones.
+    """
+
+    def __init__(self, on_expire: Callable[[str], Awaitable[None]], retry_delay: Optional[float] = None,
+                 max_retry_delay: Optional[float] = None):
+        """
+        Args:
+            on_expire: Coroutine function called with the intent_id of every expired action
+            retry_delay: Seconds before a failed expiry is retried, doubled on every further failure
+                (EXPIRY_RETRY_DELAY, default 5)
+            max_retry_delay: Upper bound of the retry delay (EXPIRY_MAX_RETRY_DELAY, default 300)
+        """
+        self.on_expire = on_expire
+        self.retry_delay = retry_delay or float(os.getenv("EXPIRY_RETRY_DELAY", "5"))
+        self.max_retry_delay = max_retry_delay or float(os.getenv("EXPIRY_MAX_RETRY_DELAY", "300"))
+        self._heap: List[Tuple[float, str]] = []
+        # intent_id -> expiry time (Unix timestamp) of the pending actions
+        self._deadlines: Dict[str, float] = {}
+        # intent_id -> consecutive failed expiries, for the retry backoff
+        self._failures: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.scheduled = 0
+        self.cancelled = 0
+        self.expired = 0
+        self.failed = 0
+        self.retried = 0
+
+    def schedule(self, intent_id: str, expires_at: float):
+        """
+        Expire an action at the given time, replacing any previous expiry; safe to call from any thread
+
+        Args:
+            intent_id: The action to expire
+            expires_at: Unix timestamp at which the action expires
+        """
+        with self._lock:
+            earliest = self._heap[0][0] if self._heap else None
+            self._deadlines[intent_id] = expires_at
+            heapq.heappush(self._heap, (expires_at, intent_id))
+            self.scheduled += 1
+        if earliest is None or expires_at < earliest:
+            self._wake_up()
+
+    def cancel(self, intent_id: str) -> bool:
+        """
+        Stop tracking the expiry of an action
+
+        Returns:
+            bool: True if the action had a pending expiry
+        """
+        with self._lock:
+            self._failures.pop(intent_id, None)
+            if self._deadlines.pop(intent_id, None) is None:
+                return False
+            self.cancelled += 1
+            if len(self._heap) > 2 * len(self._deadlines) + 64:
+                self._heap = [(expires_at, intent_id) for intent_id, expires_at in self._deadlines.items()]
+                heapq.heapify(self._heap)
+            return True
+
+    def restore(self, actions: Iterable[dict]) -> int:
+        """
+        Rebuild the pending expiries from stored actions, e.g. after a restart
+
+        Args:
+            actions: Stored actions; those with expiry_status "scheduled" and an expires_at are tracked
+
+        Returns:
+            int: Number of expiries restored
+        """
+        restored = 0
+        for action in actions:
+            if action.get("expiry_status") == "scheduled" and action.get("expires_at"):
+                self.schedule(action["intent_id"], float(action["expires_at"]))
+                restored += 1
+        return restored
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """
+        Remove and return the actions expired at the given time
+
+        Args:
+            now: Unix timestamp, the current time by default
+
+        Returns:
+            List[str]: The intent_ids of the expired actions, earliest first
+        """
+        now = time.time() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expires_at, intent_id = heapq.heappop(self._heap)
+                if self._deadlines.get(intent_id) == expires_at:
+                    del self._deadlines[intent_id]
+                    due.append(intent_id)
+        return due
+
+    def retry(self, intent_id: str) -> float:
+        """
+        Push back an expiry whose callback failed, unless it was rescheduled meanwhile
+
+        Returns:
+            float: Seconds until the retry
+        """
+        with self._lock:
+            failures = self._failures.get(intent_id, 0) + 1
+            self._failures[intent_id] = failures
+            delay = min(self.retry_delay * 2 ** (failures - 1), self.max_retry_delay)
+            if intent_id in self._deadlines:
+                return self._deadlines[intent_id] - time.time()
+            expires_at = time.time() + delay
+            self._deadlines[intent_id] = expires_at
+            heapq.heappush(self._heap, (expires_at, intent_id))
+            self.retried += 1
+        return delay
+
+    def next_expiry(self) -> Optional[float]:
+        """Get the earliest pending expiry time, or None"""
+        with self._lock:
+            while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def _wake_up(self):
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def start(self):
+        """Start the expiry task; must be called from the running event loop"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="expiry-scheduler")
+
+    async def stop(self):
+        """Stop the expiry task; pending expiries stay stored on the actions"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        while True:
+            next_expiry = self.next_expiry()
+            timeout = None if next_expiry is None else max(0.0, next_expiry - time.time())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            for intent_id in self.pop_due():
+                self.expired += 1
+                token = intent_id_var.set(intent_id)
+                try:
+                    await self.on_expire(intent_id)
+                    with self._lock:
+                        self._failures.pop(intent_id, None)
+                except Exception as e:
+                    self.failed += 1
+                    delay = self.retry(intent_id)
+                    logger.error("Error expiring intent, retrying in %.0fs: %s", delay, e)
+                finally:
+                    intent_id_var.reset(token)
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get the pending expiry count and counters for monitoring"""
+        next_expiry = self.next_expiry()
+        return {
+            "pending": len(self._deadlines),
+            "next_expiry": datetime.fromtimestamp(next_expiry).isoformat() if next_expiry else None,
+            "scheduled": self.scheduled,
+            "cancelled": self.cancelled,
+            "expired": self.expired,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
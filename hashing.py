@@ -1,7 +1,110 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
 from passlib.context import CryptContext
+
+from structured_logging import get_logger
+
+logger = get_logger("auth")
+
 pwd_cxt = CryptContext(schemes =["bcrypt"],deprecated="auto")
 class Hash():
    def bcrypt(password:str): #This method hashes the provided password using the bcrypt algorithm through the CryptContext object (pwd_cxt) and returns the hashed password.
       return pwd_cxt.hash(password)
    def verify(hashed,normal): #This method verifies whether the plain text password matches the hashed password.
-      return pwd_cxt.verify(normal,hashed)
\ No newline at end of file
+      return pwd_cxt.verify(normal,hashed)
+
+
+def _hash_password(password: str) -> str:
+    return Hash.bcrypt(password)
+
+
+def _verify_password(hashed: str, normal: str) -> bool:
+    return Hash.verify(hashed, normal)
+
+
+def _warm_up() -> bool:
+    # Imports passlib's bcrypt backend in the worker before the first real request
+    return pwd_cxt.verify("warm-up", pwd_cxt.hash("warm-up"))
+
+
+class LoginCapacityExceeded(Exception):
+    """Raised when every password operation slot is taken"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a dedicated, size-limited process pool,
+    so login and registration bursts never occupy the threads serving mitigation
+    actions. A semaphore caps the password operations running or waiting for the
+    pool; an operation finding every slot taken is rejected right away.
+    """
+
+    def __init__(self, workers: Optional[int] = None, concurrency: Optional[int] = None):
+        """
+        Args:
+            workers: Number of hashing processes (AUTH_HASH_WORKERS, default 2)
+            concurrency: Password operations admitted at once, running or queued (LOGIN_CONCURRENCY, default 4 per worker)
+        """
+        self.workers = workers or int(os.getenv("AUTH_HASH_WORKERS", "2"))
+        self.concurrency = concurrency or int(os.getenv("LOGIN_CONCURRENCY", str(self.workers * 4)))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def start(self):
+        """Start the hashing processes; must be called from the running event loop"""
+        if self._executor is not None:
+            return
+        # Spawned rather than forked: the API process runs several threads
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _warm_up) for _ in range(self.workers)))
+        logger.info("Password hashing pool started with %d processes (concurrency %d)", self.workers, self.concurrency)
+
+    async def stop(self):
+        """Stop the hashing processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, func, *args):
+        if self._executor is None:
+            await self.start()
+        # Acquiring a semaphore that is not locked never suspends, so the slot cannot be taken in between
+        if self._semaphore.locked():
+            self.rejected += 1
+            raise LoginCapacityExceeded(f"Too many concurrent logins ({self.concurrency} in progress)")
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+            finally:
+                self.in_flight -= 1
+                self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with bcrypt in the process pool"""
+        return await self._run(_hash_password, password)
+
+    async def verify(self, hashed: str, normal: str) -> bool:
+        """Check a password against its bcrypt hash in the process pool"""
+        return await self._run(_verify_password, hashed, normal)
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get pool usage counters for monitoring"""
+        return {
+            "workers": self.workers,
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,225 @@
+"""
+Free-text intent classifier for RTR
+Maps a natural-language mitigation action to an action type and playbook.
+The text is tokenized once and every playbook is scored in a single pass
+over a keyword -> (class, weight) inverted index built from the
+RTR_configurations/intent_classifier.json configuration. Batches of
+actions are scored at once as a token-count matrix against the weights.
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Fallback token: words, optionally hyphenated
+WORD_PATTERN = r"[a-z]+(?:-[a-z]+)*"
+
+
+class IntentClassification:
+    """
+    Result of classifying a free-text action
+    """
+    __slots__ = ("action_type", "playbook", "score", "confidence", "matched_terms")
+
+    def __init__(self, action_type: str, playbook: str, score: float, confidence: float,
+                 matched_terms: List[str]):
+        self.action_type = action_type
+        self.playbook = playbook
+        self.score = score
+        self.confidence = confidence
+        self.matched_terms = matched_terms
+
+    @property
+    def matched(self) -> bool:
+        return self.playbook is not None
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "action_type": self.action_type,
+            "playbook": self.playbook,
+            "score": self.score,
+            "confidence": self.confidence,
+            "matched_terms": self.matched_terms,
+        }
+
+
+class IntentClassifier:
+    """
+    Weighted keyword classifier compiled once from its configuration.
+    A class scores the sum of the weights of its keywords and phrases found
+    in the text; the confidence is the share of the best class in the total
+    score. Ties go to the class listed first in the configuration.
+    """
+
+    def __init__(self, config: dict):
+        """
+        Args:
+            config: The intent classifier configuration (intent_classes, token_patterns, min_score)
+
+        Raises:
+            ValueError: If a class is missing its action_type or playbook, or a token pattern is invalid
+        """
+        self.classes: List[Tuple[str, str]] = []
+        # term -> [(class position, weight)]; phrases are indexed by their space-joined tokens
+        self._index: Dict[str, List[Tuple[int, float]]] = {}
+        # First token of every phrase, so n-grams are only built where a phrase can start
+        self._phrase_starts = set()
+        self._max_phrase_length = 1
+        self.min_score = float(config.get("min_score", 0.5))
+
+        token_patterns = config.get("token_patterns", {})
+        self._token_names: Dict[str, str] = {}
+        alternatives = []
+        for position, (token, pattern) in enumerate(token_patterns.items()):
+            group = f"t{position}"
+            self._token_names[group] = token
+            alternatives.append(f"(?P<{group}>{pattern})")
+        alternatives.append(WORD_PATTERN)
+        try:
+            self._tokenizer = re.compile("|".join(alternatives))
+        except re.error as e:
+            raise ValueError(f"Invalid token pattern in intent classifier configuration: {e}")
+
+        for position, intent_class in enumerate(config.get("intent_classes", [])):
+            action_type = intent_class.get("action_type")
+            playbook = intent_class.get("playbook")
+            if not action_type or not playbook:
+                raise ValueError(f"Intent class #{position} needs both an action_type and a playbook")
+            self.classes.append((action_type, playbook))
+
+            terms = dict(intent_class.get("keywords", {}))
+            terms.update(intent_class.get("phrases", {}))
+            for term, weight in terms.items():
+                tokens = self.tokenize(term) if term not in token_patterns else [term]
+                if not tokens:
+                    continue
+                if len(tokens) > 1:
+                    self._phrase_starts.add(tokens[0])
+                    self._max_phrase_length = max(self._max_phrase_length, len(tokens))
+                self._index.setdefault(" ".join(tokens), []).append((position, float(weight)))
+
+        # Dense form of the index for batch scoring: term column -> weight per class
+        self._columns: Dict[str, int] = {term: column for column, term in enumerate(self._index)}
+        self._weights = np.zeros((len(self._index), len(self.classes)))
+        for term, postings in self._index.items():
+            for position, weight in postings:
+                self._weights[self._columns[term], position] += weight
+
+    @property
+    def term_count(self) -> int:
+        return len(self._index)
+
+    def tokenize(self, text: str) -> List[str]:
+        """Split text into lowercase words, with configured token patterns (e.g. 5/s) replaced by their token name"""
+        token_names = self._token_names
+        return [token_names[match.lastgroup] if match.lastgroup else match.group()
+                for match in self._tokenizer.finditer(text.lower())]
+
+    def match_terms(self, text: str) -> List[str]:
+        """Get the indexed keywords and phrases found in a text, in order of appearance"""
+        matched_terms = []
+        index = self._index
+        tokens = self.tokenize(text)
+        for start, token in enumerate(tokens):
+            if token in index:
+                matched_terms.append(token)
+            if token in self._phrase_starts:
+                for end in range(start + 2, min(start + self._max_phrase_length, len(tokens)) + 1):
+                    phrase = " ".join(tokens[start:end])
+                    if phrase in index:
+                        matched_terms.append(phrase)
+        return matched_terms
+
+    def score(self, text: str) -> Tuple[List[float], List[str]]:
+        """
+        Score every class against a text in one pass over its tokens
+
+        Returns:
+            Tuple[List[float], List[str]]: The score of each class, in configuration order, and the matched terms
+        """
+        scores = [0.0] * len(self.classes)
+        matched_terms = self.match_terms(text)
+        for term in matched_terms:
+            for position, weight in self._index[term]:
+                scores[position] += weight
+        return scores, matched_terms
+
+    def classify(self, text: str) -> IntentClassification:
+        """
+        Classify a free-text mitigation action
+
+        Args:
+            text: The free-text action
+
+        Returns:
+            IntentClassification: The best class, or one with action_type UNKNOWN_ACTION_TYPE and no
+            playbook if no class reaches min_score
+        """
+        scores, matched_terms = self.score(text)
+        return self._decide(scores, matched_terms)
+
+    def classify_batch(self, texts: List[str]) -> List[IntentClassification]:
+        """
+        Classify many free-text actions at once, e.g. when replaying attack traces
+
+        Each distinct text is scanned once; the scores of all of them come from a
+        single (texts x terms) count matrix multiplied by the (terms x classes)
+        weights. The results are identical to classify() on each text.
+
+        Args:
+            texts: The free-text actions
+
+        Returns:
+            List[IntentClassification]: One classification per text, in the same order
+        """
+        distinct: Dict[str, int] = {}
+        for text in texts:
+            distinct.setdefault(text, len(distinct))
+
+        rows, columns, terms_per_text = [], [], []
+        for row, text in enumerate(distinct):
+            matched_terms = self.match_terms(text)
+            terms_per_text.append(matched_terms)
+            rows.extend([row] * len(matched_terms))
+            columns.extend(self._columns[term] for term in matched_terms)
+
+        term_count = len(self._columns)
+        flat_cells = np.array(rows, dtype=np.intp) * term_count + np.array(columns, dtype=np.intp)
+        counts = np.bincount(flat_cells, minlength=len(distinct) * term_count).reshape(len(distinct), term_count)
+        scores = counts @ self._weights
+
+        # The decision is shared with classify() so both paths round and break ties identically;
+        # texts with the same scores (common in replayed traces) share it
+        decisions: Dict[tuple, Tuple[Optional[int], float, float]] = {}
+        results = []
+        for row_scores, matched_terms in zip(map(tuple, scores.tolist()), terms_per_text):
+            decision = decisions.get(row_scores)
+            if decision is None:
+                decision = decisions[row_scores] = self._pick(row_scores)
+            results.append(self._result(decision, matched_terms))
+        return [results[distinct[text]] for text in texts]
+
+    def _decide(self, scores: List[float], matched_terms: List[str]) -> IntentClassification:
+        return self._result(self._pick(scores), matched_terms)
+
+    def _pick(self, scores) -> Tuple[Optional[int], float, float]:
+        """Get the position of the winning class (None below min_score), its score and the confidence"""
+        best = None
+        best_score = 0.0
+        for position, class_score in enumerate(scores):
+            # Rounded so float noise cannot break ties; strictly greater: ties keep the class listed first
+            class_score = round(class_score, 6)
+            if class_score > best_score:
+                best, best_score = position, class_score
+        total = round(sum(scores), 6)
+        confidence = round(best_score / total, 4) if total else 0.0
+        if best_score < self.min_score:
+            best = None
+        return best, best_score, confidence
+
+    def _result(self, decision: Tuple[Optional[int], float, float], matched_terms: List[str]) -> IntentClassification:
+        best, best_score, confidence = decision
+        if best is None:
+            return IntentClassification("UNKNOWN_ACTION_TYPE", None, best_score, confidence, matched_terms)
+        action_type, playbook = self.classes[best]
+        return IntentClassification(action_type, playbook, best_score, confidence, matched_terms)
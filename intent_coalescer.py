@@ -0,0 +1,305 @@
+"""
+Intent coalescing for RTR
+Within a short window, compatible mitigation actions aimed at the same
+mitigation_host are merged into a single playbook before dispatch to ePEM,
+and the resulting status is fanned back to every contributing intent_id.
+The merged playbook is classified and rendered in the threadpool, only the
+store updates and the dispatch submit run on the event loop.
+"""
+import asyncio
+import json
+import os
+import re
+from typing import Dict, List, Optional, Set
+
+from starlette.concurrency import run_in_threadpool
+
+from epem_dispatcher import DispatchQueueFull
+from mitigation_regex_control import playbook_creator
+from variable_resolver import to_stored_values
+from structured_logging import get_logger
+
+logger = get_logger("coalescer")
+
+# Action names whose fields can be merged (INTENT_COALESCE_ACTIONS, comma separated)
+DEFAULT_COALESCE_ACTIONS = (
+    "BLOCK_IP_ADDRESSES,BLOCK_POD_ADDRESS,BLOCK_POD_ADDRESSES,"
+    "DNS_RATE_LIMIT,DNS_RATE_LIMITING,API_RATE_LIMIT,API_RATE_LIMITING"
+)
+
+# How each mergeable field is combined across coalesced actions
+UNION_FIELDS = ('blocked_ips', 'source_ip_filter', 'dns_servers')
+MAX_FIELDS = ('duration', 'timeout')
+MIN_FIELDS = ('rate', 'limit')
+
+# Seconds per time unit, for rates ("20/s", "5r/m", "100 per minute") and durations ("60", "5m")
+TIME_UNITS = {
+    '': 1, 's': 1, 'sec': 1, 'second': 1, 'seconds': 1,
+    'm': 60, 'min': 60, 'minute': 60, 'minutes': 60,
+    'h': 3600, 'hour': 3600, 'hours': 3600,
+}
+_RATE = re.compile(r'^(\d+(?:\.\d+)?)\s*(?:r|req|reqs|requests?)?\s*(?:(?:/|per)\s*([a-z]+))?$')
+_DURATION = re.compile(r'^(\d+(?:\.\d+)?)\s*([a-z]*)$')
+
+
+def parse_rate(value) -> Optional[float]:
+    """
+    Normalize a rate limit to requests per second
+
+    Args:
+        value: A number (per second) or a string such as "20/s", "5r/s", "10 req/min" or "100 per minute"
+
+    Returns:
+        Optional[float]: The rate per second, or None if the value is not a rate
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _RATE.match(str(value).strip().lower())
+    if match is None or (match.group(2) or '') not in TIME_UNITS:
+        return None
+    return float(match.group(1)) / TIME_UNITS[match.group(2) or '']
+
+
+def parse_duration(value) -> Optional[float]:
+    """
+    Normalize a duration to seconds
+
+    Args:
+        value: A number of seconds or a string such as "60", "60s" or "5m"
+
+    Returns:
+        Optional[float]: The duration in seconds, or None if the value is not a duration
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _DURATION.match(str(value).strip().lower())
+    if match is None or match.group(2) not in TIME_UNITS:
+        return None
+    return float(match.group(1)) * TIME_UNITS[match.group(2)]
+
+
+def mergeable_fields(fields: dict) -> bool:
+    """Whether every rate and duration of an action's fields can be compared with those of other actions"""
+    return (all(parse_duration(fields[key]) is not None for key in MAX_FIELDS if fields.get(key) is not None)
+            and all(parse_rate(fields[key]) is not None for key in MIN_FIELDS if fields.get(key) is not None))
+
+
+def merge_action_fields(fields_list: List[dict]) -> dict:
+    """
+    Merge the fields of compatible actions: union the IP lists,
+    take the longest duration and keep the strictest rate.
+    Rates and durations are compared as numbers; the winning value is kept as it was given
+
+    Args:
+        fields_list: The 'fields' dicts of the actions to merge, in arrival order
+
+    Returns:
+        dict: The merged fields
+
+    Raises:
+        ValueError: If a rate or duration cannot be parsed (see mergeable_fields)
+    """
+    merged = dict(fields_list[0])
+    for fields in fields_list[1:]:
+        for key, value in fields.items():
+            if key not in merged or merged[key] is None:
+                merged[key] = value
+            elif value is None:
+                continue
+            elif key in UNION_FIELDS:
+                current = merged[key] if isinstance(merged[key], list) else [merged[key]]
+                extra = value if isinstance(value, list) else [value]
+                merged[key] = current + [item for item in extra if item not in current]
+            elif key in MAX_FIELDS:
+                merged[key] = max(merged[key], value, key=lambda item: _parsed(parse_duration, key, item))
+            elif key in MIN_FIELDS:
+                merged[key] = min(merged[key], value, key=lambda item: _parsed(parse_rate, key, item))
+    return merged
+
+
+def _parsed(parse, key: str, value) -> float:
+    number = parse(value)
+    if number is None:
+        raise ValueError(f"Cannot compare {key} '{value}' across coalesced actions")
+    return number
+
+
+class CoalesceGroup:
+    """
+    Playbooks of compatible actions collected during one coalescing window
+    """
+    __slots__ = ("playbooks", "timer")
+
+    def __init__(self):
+        self.playbooks: List[playbook_creator] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class IntentCoalescer:
+    """
+    Optional stage between playbook_creator and the ePEM dispatcher.
+    Compatible actions are grouped per (action name, mitigation_host); when
+    the window of a group closes a single merged playbook is dispatched.
+    """
+
+    def __init__(self, dispatcher, store, window: Optional[float] = None, actions: Optional[str] = None):
+        """
+        Args:
+            dispatcher: The EpemDispatcher receiving the merged playbooks
+            store: The ActionStore holding the coalesced actions
+            window: Coalescing window in seconds, 0 disables coalescing (INTENT_COALESCE_WINDOW, default 0)
+            actions: Comma separated mergeable action names (INTENT_COALESCE_ACTIONS)
+        """
+        self.dispatcher = dispatcher
+        self.store = store
+        self.window = window if window is not None else float(os.getenv("INTENT_COALESCE_WINDOW", "0"))
+        actions = actions or os.getenv("INTENT_COALESCE_ACTIONS", DEFAULT_COALESCE_ACTIONS)
+        self.actions = {name.strip().upper() for name in actions.split(",") if name.strip()}
+        self._groups: Dict[tuple, CoalesceGroup] = {}
+        # Flushed groups whose merged playbook is being rendered in the threadpool
+        self._merging: Set[asyncio.Task] = set()
+
+        self.intents_received = 0
+        self.playbooks_emitted = 0
+        self.intents_merged = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def _group_key(self, playbook: playbook_creator) -> Optional[tuple]:
+        """Key of the group a playbook can be merged into, or None if it cannot be coalesced"""
+        mitigation_action = playbook.mitigation_action
+        action = mitigation_action.action
+        if mitigation_action.command != "add" or not isinstance(action, dict):
+            return None
+        if playbook.action_type not in self.actions:
+            return None
+
+        # Fields that are not merged must match exactly for actions to be compatible
+        fields = action.get('fields') or {}
+        if not mergeable_fields(fields):
+            # A rate or duration that cannot be compared: dispatched on its own
+            return None
+        fixed_fields = {key: value for key, value in fields.items()
+                        if key not in UNION_FIELDS + MAX_FIELDS + MIN_FIELDS}
+        return (
+            playbook.action_type,
+            playbook.chosen_playbook,
+            json.dumps(mitigation_action.mitigation_host, default=str),
+            json.dumps(mitigation_action.target_domain, default=str),
+            json.dumps(fixed_fields, sort_keys=True, default=str),
+        )
+
+    def submit(self, playbook: playbook_creator) -> bool:
+        """
+        Hold a rendered playbook for coalescing, if coalescing applies to it
+
+        Args:
+            playbook: A playbook_creator whose action is stored with status 'queued'
+
+        Returns:
+            bool: True if the playbook is held for coalescing, False if it must be dispatched directly
+
+        Raises:
+            DispatchQueueFull: If the dispatcher cannot accept more work
+        """
+        if not self.enabled:
+            return False
+        key = self._group_key(playbook)
+        if key is None:
+            return False
+        if not self.dispatcher.has_capacity():
+            raise DispatchQueueFull(f"ePEM dispatch queue is full ({self.dispatcher.queue_size} actions pending)")
+
+        group = self._groups.get(key)
+        if group is None:
+            group = CoalesceGroup()
+            group.timer = asyncio.get_running_loop().call_later(self.window, self._flush_group, key)
+            self._groups[key] = group
+        group.playbooks.append(playbook)
+        self.intents_received += 1
+        return True
+
+    def _merge(self, playbooks: List[playbook_creator]) -> playbook_creator:
+        """Build and render one playbook enforcing all the given compatible actions; runs in the threadpool"""
+        primary = playbooks[0].mitigation_action
+        merged_action = primary.model_copy(deep=True)
+        merged_action.action['fields'] = merge_action_fields(
+            [playbook.mitigation_action.action.get('fields') or {} for playbook in playbooks]
+        )
+        merged_action.duration = max(playbook.mitigation_action.duration for playbook in playbooks)
+        merged = playbook_creator(merged_action)
+        # The merged playbook is dispatched in the trace of the first intent of the group
+        merged.trace_parent = playbooks[0].trace_parent
+        # Rendered here, so reading rendered_playbook on the event loop does not block it
+        merged.rendered_playbook
+        return merged
+
+    def _flush_group(self, key: tuple):
+        # Runs on the event loop when the window of the group closes
+        group = self._groups.pop(key, None)
+        if group is None or not group.playbooks:
+            return
+        task = asyncio.get_running_loop().create_task(self._dispatch_group(group))
+        self._merging.add(task)
+        task.add_done_callback(self._merging.discard)
+
+    async def _dispatch_group(self, group: CoalesceGroup):
+        primary_id = group.playbooks[0].mitigation_action.intent_id
+        member_ids = [playbook.mitigation_action.intent_id for playbook in group.playbooks[1:]]
+        try:
+            if member_ids:
+                merged = await run_in_threadpool(self._merge, group.playbooks)
+                self.store.update_cached(
+                    primary_id,
+                    ansible_command=merged.rendered_playbook,
+                    playbook_variables=to_stored_values(merged.variables),
+                    coalesced_intent_ids=member_ids
+                )
+                for member_id in member_ids:
+                    self.store.update_cached(
+                        member_id,
+                        ansible_command=merged.rendered_playbook,
+                        coalesced_into=primary_id,
+                        info=f"Coalesced into intent {primary_id}, queued for dispatch to ePEM"
+                    )
+                self.intents_merged += len(member_ids)
+            else:
+                merged = group.playbooks[0]
+            self.dispatcher.submit(primary_id, merged, coalesced_intent_ids=member_ids)
+            self.playbooks_emitted += 1
+        except DispatchQueueFull as e:
+            for intent_id in [primary_id] + member_ids:
+                self.store.update_cached(intent_id, status="epem_queue_full", info=str(e))
+        except Exception as e:
+            logger.error("Error coalescing intent: %s", e, extra={"intent_id": primary_id})
+            for intent_id in [primary_id] + member_ids:
+                self.store.update_cached(intent_id, status="error", info=f"Error coalescing action: {str(e)}")
+
+    async def flush_all(self):
+        """Dispatch every open group immediately (e.g. on shutdown), waiting for their merged playbooks"""
+        for key in list(self._groups.keys()):
+            group = self._groups.get(key)
+            if group is not None and group.timer is not None:
+                group.timer.cancel()
+            self._flush_group(key)
+        if self._merging:
+            await asyncio.gather(*self._merging)
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get coalescing counters for monitoring"""
+        return {
+            "enabled": self.enabled,
+            "window_seconds": self.window,
+            "open_groups": len(self._groups),
+            "held_intents": sum(len(group.playbooks) for group in self._groups.values()),
+            "merging_groups": len(self._merging),
+            "intents_received": self.intents_received,
+            "intents_merged": self.intents_merged,
+            "playbooks_emitted": self.playbooks_emitted,
+        }
@@ -2,7 +2,12 @@ from dotenv import load_dotenv, find_dotenv
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from mitigation_action_class import TokenData
+from collections import OrderedDict
+from typing import Dict, Optional
+import hashlib
 import os
+import threading
+import time
 
 # from main import TokenData
 load_dotenv(find_dotenv())
@@ -16,12 +21,116 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of verified tokens, keyed by the SHA-256 of the token.
+    An entry holds the decoded TokenData and expires with the token's exp claim.
+    The cache only serves tokens verified with the current secret and algorithm;
+    it is emptied as soon as either changes.
+    """
+
+    def __init__(self, max_entries: int = None):
+        """
+        Args:
+            max_entries: Maximum number of cached tokens (JWT_CACHE_SIZE, default 1024; 0 disables the cache)
+        """
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("JWT_CACHE_SIZE", "1024"))
+        # token hash -> (TokenData, exp as a Unix timestamp)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_material = (SECRET_KEY, ALGORITHM)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def token_hash(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token_hash: str) -> Optional[TokenData]:
+        """Get the TokenData of a verified, unexpired token, or None"""
+        with self._lock:
+            if self._key_material != (SECRET_KEY, ALGORITHM):
+                self._clear()
+            entry = self._entries.get(token_hash)
+            if entry is not None:
+                if entry[1] > time.time():
+                    self._entries.move_to_end(token_hash)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[token_hash]
+            self.misses += 1
+            return None
+
+    def put(self, token_hash: str, token_data: TokenData, expires_at, key_material: tuple):
+        """Cache a token verified with key_material until its exp claim; tokens without exp are not cached"""
+        if self.max_entries <= 0 or expires_at is None:
+            return
+        with self._lock:
+            if key_material != self._key_material:
+                # The secret was rotated while the token was being verified
+                return
+            self._entries[token_hash] = (token_data, float(expires_at))
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _clear(self):
+        self.invalidations += len(self._entries)
+        self._entries = OrderedDict()
+        self._key_material = (SECRET_KEY, ALGORITHM)
+
+    def clear(self):
+        """Drop every cached token"""
+        with self._lock:
+            self._clear()
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get cache statistics for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Tokens already verified, so a token reused across many requests is decoded once
+verified_tokens = VerifiedTokenCache()
+
+
+def rotate_secret_key(secret_key: str, algorithm: Optional[str] = None):
+    """
+    Sign and verify tokens with a new secret; tokens verified with the previous one are no longer trusted
+
+    Args:
+        secret_key: The new secret
+        algorithm: The new algorithm, unchanged if not given
+    """
+    global SECRET_KEY, ALGORITHM
+    SECRET_KEY = secret_key
+    if algorithm is not None:
+        ALGORITHM = algorithm
+    verified_tokens.clear()
+
+
 def verify_token(token:str,credentials_exception):
- try:
-     payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-     username: str = payload.get("sub")
-     if username is None:
-         raise credentials_exception
-     token_data = TokenData(username=username)
- except JWTError:
-     raise credentials_exception
\ No newline at end of file
+    token_hash = verified_tokens.token_hash(token)
+    token_data = verified_tokens.get(token_hash)
+    if token_data is not None:
+        return token_data
+    secret_key, algorithm = SECRET_KEY, ALGORITHM
+    try:
+        payload = jwt.decode(token, secret_key, algorithms=[algorithm])
+        username: str = payload.get("sub")
+        if username is None:
+            raise credentials_exception
+        token_data = TokenData(username=username)
+    except JWTError:
+        raise credentials_exception
+    verified_tokens.put(token_hash, token_data, payload.get("exp"), (secret_key, algorithm))
+    return token_data
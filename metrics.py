@@ -0,0 +1,124 @@
+"""
+Prometheus metrics for RTR
+Stage latencies and ePEM response codes are recorded as intents go through
+RTR. Store sizes, queue depths and cache hit ratios are read from the
+components' get_stats() only when /metrics is scraped, so they add no cost
+per request. prometheus_client metrics are thread-safe: the event loop, the
+request threadpool and the dispatch threads update them concurrently.
+"""
+import os
+from typing import Callable, Dict
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# From half a millisecond (a cached render) to ten minutes (an ePEM status callback)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+STAGE_SECONDS = Histogram(
+    "rtr_stage_duration_seconds",
+    "Time spent in each stage of an intent's life",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+# Children bound once, so recording a stage is a single observe()
+VALIDATION_SECONDS = STAGE_SECONDS.labels("validation")
+CLASSIFICATION_SECONDS = STAGE_SECONDS.labels("classification")
+RENDER_SECONDS = STAGE_SECONDS.labels("render")
+EPEM_POST_SECONDS = STAGE_SECONDS.labels("epem_post")
+CALLBACK_SECONDS = STAGE_SECONDS.labels("callback_turnaround")
+
+EPEM_RESPONSES = Counter(
+    "rtr_epem_responses",
+    "Answers to the intents posted to ePEM, by HTTP status code or connection error",
+    ["status_code"],
+)
+
+HTTP_REQUESTS = Counter(
+    "rtr_http_requests",
+    "HTTP requests served by the RTR API",
+    ["method", "route", "status_code"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "rtr_http_request_duration_seconds",
+    "Time spent serving HTTP requests",
+    ["method", "route"],
+    buckets=STAGE_BUCKETS[:15],
+)
+
+
+class StatsCollector:
+    """
+    Exposes the get_stats() of RTR components as gauges and counters, read at scrape time
+    """
+
+    def __init__(self, store: Callable[[], dict], dispatcher: Callable[[], dict], expiry: Callable[[], dict],
+                 caches: Dict[str, Callable[[], dict]]):
+        """
+        Args:
+            store: Returns the ActionStore statistics
+            dispatcher: Returns the EpemDispatcher statistics
+            expiry: Returns the ExpiryScheduler statistics
+            caches: Cache name -> returns statistics holding hits, misses and hit_ratio
+        """
+        self.store = store
+        self.dispatcher = dispatcher
+        self.expiry = expiry
+        self.caches = caches
+
+    def collect(self):
+        store = self.store()
+        yield GaugeMetricFamily("rtr_store_actions", "Mitigation actions held in the in-memory store",
+                                value=store["cached_actions"])
+        yield GaugeMetricFamily("rtr_store_pending_writes", "Actions waiting for the MongoDB write-behind flush",
+                                value=store["pending_writes"])
+
+        dispatcher = self.dispatcher()
+        yield GaugeMetricFamily("rtr_dispatch_queue_depth", "Intents queued for dispatch to ePEM",
+                                value=dispatcher["queue_depth"])
+        yield GaugeMetricFamily("rtr_dispatch_in_flight", "Intents being posted to ePEM",
+                                value=dispatcher["in_flight"])
+        yield GaugeMetricFamily("rtr_expiry_pending", "Enforced actions waiting for their expiry",
+                                value=self.expiry()["pending"])
+
+        hits = CounterMetricFamily("rtr_cache_hits", "Cache lookups served from the cache", labels=["cache"])
+        misses = CounterMetricFamily("rtr_cache_misses", "Cache lookups missing the cache", labels=["cache"])
+        ratios = GaugeMetricFamily("rtr_cache_hit_ratio", "Share of cache lookups served from the cache",
+                                   labels=["cache"])
+        for cache, get_stats in self.caches.items():
+            stats = get_stats()
+            hits.add_metric([cache], stats["hits"])
+            misses.add_metric([cache], stats["misses"])
+            ratios.add_metric([cache], stats["hit_ratio"])
+        yield hits
+        yield misses
+        yield ratios
+
+
+# Collectors of this process, also served when metrics are aggregated across processes
+_stats_collectors = []
+
+
+def register_stats_collector(collector: StatsCollector):
+    """Expose the component statistics on /metrics"""
+    REGISTRY.register(collector)
+    _stats_collectors.append(collector)
+
+
+def render_metrics():
+    """
+    Get the metrics in the Prometheus text format
+
+    Returns:
+        tuple: (body, content type)
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Several worker processes: aggregate the counters and histograms they write to the shared directory
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _stats_collectors:
+            registry.register(collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
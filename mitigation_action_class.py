@@ -1,7 +1,13 @@
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, ValidationInfo, model_validator
 from typing import Optional, Literal, Dict, Any, List, Union
 import os
 
+from metrics import VALIDATION_SECONDS
+from tracing import with_traceparent
+
+# Validation context of the actions RTR builds itself, which are left out of the validation stage metric
+INTERNAL_CONTEXT = {"internal": True}
+
 
 # Enhanced mitigation_action_model
 class mitigation_action_model(BaseModel):
@@ -26,6 +32,15 @@ class mitigation_action_model(BaseModel):
     ansible_command: str = Field(default="", example="- hosts: [172.16.2.1]\n  tasks:\n...", description="The generated Ansible playbook command")
     callback_url: str = Field(default="", example="http://localhost:8000/update_action_status", description="URL for status update callbacks")
 
+    @model_validator(mode='wrap')
+    @classmethod
+    def time_validation(cls, values, handler, info: ValidationInfo):
+        """Record the time spent validating and normalizing an action received by the API"""
+        if info.context and info.context.get("internal"):
+            return handler(values)
+        with VALIDATION_SECONDS.time():
+            return handler(values)
+
     @model_validator(mode='before')
     def normalize_blocked_pod_and_fields(cls, values):
         """Normalize incoming action payloads:
@@ -121,7 +136,8 @@ class mitigation_action_model(BaseModel):
         if not callback_url:
             rtr_host = os.getenv('RTR_HOST', 'localhost')
             rtr_port = os.getenv('RTR_PORT', '8000')
-            self.callback_url = f"http://{rtr_host}:{rtr_port}/update_action_status"
+            # The traceparent of the request lets the status callback join the intent's trace
+            self.callback_url = with_traceparent(f"http://{rtr_host}:{rtr_port}/update_action_status")
         
         
         return self
@@ -169,6 +185,12 @@ class mitigation_action_model(BaseModel):
         }
 
 
+class LogLevelRequest(BaseModel):
+    level: str = Field(..., example="DEBUG", description="DEBUG, INFO, WARNING, ERROR or CRITICAL")
+    logger: Optional[str] = Field(default=None, example="dispatcher",
+                                  description="A single RTR logger (e.g. playbooks, dispatcher, store); all of them if omitted")
+
+
 # UpdateActionStatusRequest now uses intent_id instead of action_id
 class UpdateActionStatusRequest(BaseModel):
     intent_id: str = Field(..., example="ABC124")  # Replaced action_id with intent_id
@@ -1,52 +1,85 @@
+import json
+import logging
 import re
 import requests
 from mitigation_action_class import mitigation_action_model
 import os
-from jinja2 import Environment, FileSystemLoader
-from config_loader import get_playbook_for_action
+from jinja2 import TemplateNotFound
+from config_loader import (get_playbook_for_action, get_rollback_playbook_for_action, get_intent_classifier,
+                           get_playbook_resolver)
+from template_registry import get_template_registry, render_key
+from variable_resolver import to_stored_values
+from metrics import CLASSIFICATION_SECONDS, RENDER_SECONDS, EPEM_POST_SECONDS, EPEM_RESPONSES
+from structured_logging import get_logger, intent_context
+from tracing import current_span_var, get_tracer, inject_traceparent
+from epem_client import get_domain_endpoints, get_epem_client
+from action_entities import scan_action_text
 
-# Define regex patterns
-expressions = ['port', 'ports']
-regex_patterns = {
-    'ipv4_and_subnet': r'\b(?:\d{1,3}\.){3}\d{1,3}(?:/\d{1,2})?\b',
-    'protocol': r'\b(tcp|udp)\b',
-    'requests_per_sec': r'\b(\d{1,3}\/s)\b',
-    'port': rf'\b(?:{"|".join(expressions)})\b\s*(\d+(?:,\d+)*)',
-    'interface_name': r'\b(eth\d+|en[pso]\w*|wlan\d+|lo)\b'
-}
+logger = get_logger("playbooks")
+
+
+def classify_free_text_actions(texts):
+    """
+    Classify many free-text actions at once and extract their playbook variables,
+    e.g. when replaying attack traces or backfilling
+
+    Args:
+        texts: The free-text actions
+
+    Returns:
+        list: One (action_type, playbook, variables) tuple per text, in the same order, as a
+        playbook_creator would resolve them for an action with default hosts and domain.
+        Unmatched texts get ("UNKNOWN_ACTION_TYPE", "UNKNOWN_ACTION_TYPE", {}), and texts
+        mapped to a missing playbook get None variables
+    """
+    results = []
+    for text, classification in zip(texts, get_intent_classifier().classify_batch(texts)):
+        if not classification.matched:
+            results.append(("UNKNOWN_ACTION_TYPE", "UNKNOWN_ACTION_TYPE", {}))
+            continue
+        try:
+            resolver = get_playbook_resolver(classification.playbook)
+        except TemplateNotFound:
+            results.append((classification.action_type, classification.playbook, None))
+            continue
+        # Without a mitigation action, hosts and domains take their defaults
+        variables = resolver.resolve(None, lambda: scan_action_text(text))
+        results.append((classification.action_type, classification.playbook, variables))
+    return results
 
 
 class playbook_creator:
-    def __init__(self, action_from_IBI):
-        self.current_patterns = [
-            ('dns_rate_limiting.yaml', r'\b(reduce|decrease|requests|number|rate|limit|dns|server|service|\d{1,3}\/s)\b', 'DNS_RATE_LIMIT'),
-            ('dns_service_disable.yaml', r'\b(disable|shut down|dns|server|service)\b', 'DNS_SERV_DISABLE'),
-            ('dns_service_handover', r'\b(hand over|dns|server|service)\b', 'DNS_HANDOVER'),
-            ('dns_firewall_spoofing_detection.yaml', r'\b(spoof|spoofed|destination|spoofing|packets|firewall|interface|block|stop|ip|ip range)\b', 'DNS_FIREWALL_SPOOF'),
-            ('anycast_blackhole', r'\b(redirect|direct|dns|server|service|traffic|igress|blackhole)\b', 'ANYCAST_BLACKHOLE')
-        ]
+    def __init__(self, action_from_IBI, rollback=False):
+        """
+        Args:
+            action_from_IBI: The mitigation action
+            rollback: Choose the playbook undoing the action instead of the one enforcing it
+        """
         self.mitigation_action = action_from_IBI
-        self.action_type, self.chosen_playbook = self.match_mitigation_action_with_playbook()
+        # The span the action was received in; its dispatch to ePEM joins the same trace
+        self.trace_parent = current_span_var.get()
+        # Set for free-text actions: the classifier's score and confidence for the chosen playbook
+        self.classification = None
+        with CLASSIFICATION_SECONDS.time(), get_tracer().span("classification",
+                                                              intent_id=action_from_IBI.intent_id) as span:
+            self.action_type, self.chosen_playbook = self.match_mitigation_action_with_playbook()
+            span.set_attribute("action_type", self.action_type)
+            span.set_attribute("playbook", self.chosen_playbook)
+        if rollback and self.chosen_playbook != "UNKNOWN_ACTION_TYPE":
+            rollback_path = get_rollback_playbook_for_action(self.action_type)
+            self.chosen_playbook = os.path.basename(rollback_path) if rollback_path else "UNKNOWN_ACTION_TYPE"
         
-        # Fill in the Ansible playbook with actual values if the playbook was found
-        if self.chosen_playbook != "UNKNOWN_ACTION_TYPE":
-            # Try to fill in the playbook with actual values
-            self.fill_in_ansible_playbook()
+        # The Ansible playbook is rendered lazily, once, the first time it is needed
+        self._rendered_playbook = None
+        self._text_entities = None
+        # The resolved variables the playbook was rendered with, once rendered
+        self.variables = None
         
         # Get the EPEM endpoint based on the current domain
-        current_domain = os.getenv('CURRENT_DOMAIN', 'CNIT').upper()
-        if current_domain == 'CNIT':
-            self.epem_endpoint = os.getenv('EPEM_CNIT', 'http://192.168.130.233:5002')
-        elif current_domain == 'UPC':
-            self.epem_endpoint = os.getenv('EPEM_UPC', 'http://10.19.2.20:5002')
-        elif current_domain == 'UMU':
-            self.epem_endpoint = os.getenv('EPEM_UMU', 'http://10.0.0.1:5002')
-        else:
-            # Default to CNIT if CURRENT_DOMAIN is not set
-            self.epem_endpoint = os.getenv('EPEM_CNIT', 'http://192.168.130.233:5002')
+        self.epem_endpoint, _ = get_domain_endpoints()
             
-        print(f"EPEM endpoint: {self.epem_endpoint}")
-        print(f"Chosen playbook: {self.chosen_playbook}")
+        logger.info("Chose playbook %s", self.chosen_playbook,
+                    extra={"playbook": self.chosen_playbook, "epem_endpoint": self.epem_endpoint})
 
     
     def dict_ansible_transformation(self):
@@ -63,40 +96,33 @@ class playbook_creator:
             playbook_path = get_playbook_for_action(action_name)
             # Extract just the filename from the path for backward compatibility
             playbook_filename = os.path.basename(playbook_path)
-            print(f"✅ Mapped action '{action_name}' to playbook '{playbook_filename}'")
+            logger.debug("Mapped action '%s' to playbook '%s'", action_name, playbook_filename)
             return action_name, playbook_filename
         except ValueError as e:
             # No mapping found - store the detailed error message
             error_msg = str(e)
-            print(error_msg)  # Keep for server logs
+            logger.warning(error_msg)
             # Store the error message in the mitigation action for API response
             self.mitigation_action.info = error_msg
             return action_name, "UNKNOWN_ACTION_TYPE"
 
     def string_ansible_transformation(self):
         """
-        Handle string-based action transformation using regex patterns.
+        Handle string-based action transformation using the intent classifier.
         Returns tuple of (action_type, playbook_filename)
         """
         high_level_mitigation_action = self.mitigation_action.action
         
-        # Use regex patterns to match the string action to a playbook
-        best_match = None
-        best_match_count = 0
-        
-        for playbook_file, pattern, action_type in self.current_patterns:
-            matches = re.findall(pattern, high_level_mitigation_action, re.IGNORECASE)
-            match_count = len(matches)
-            
-            if match_count > best_match_count:
-                best_match_count = match_count
-                best_match = (action_type, playbook_file)
+        # Score every playbook in one pass with the weighted keyword classifier
+        self.classification = get_intent_classifier().classify(high_level_mitigation_action)
         
-        if best_match:
-            return best_match
+        if self.classification.matched:
+            logger.debug("Classified free-text action as '%s'", self.classification.action_type,
+                         extra={"score": self.classification.score, "confidence": self.classification.confidence})
+            return self.classification.action_type, self.classification.playbook
         else:
             error_msg = f"No matching playbook found for string action: '{high_level_mitigation_action}'"
-            print(error_msg)
+            logger.warning(error_msg)
             self.mitigation_action.info = error_msg
             return "UNKNOWN_ACTION_TYPE", "UNKNOWN_ACTION_TYPE"
 
@@ -109,91 +135,39 @@ class playbook_creator:
             return self.dict_ansible_transformation()
 
     def extract_variables_from_yaml(self, yaml_file):
-        variables = []
-        jinja2_pattern = r'\{\{(.+?)\}\}'
-        print(f"Current dir {os.getcwd()}")
-        with open(yaml_file, 'r') as f:
-            yaml_content = f.read()
-            for line in yaml_content.split('\n'):
-                matches = re.findall(jinja2_pattern, line)
-                for match in matches:
-                    variables.append(match.strip())
-
-        return variables
+        # Variable manifests are extracted once per playbook and cached by the template registry
+        return list(get_template_registry().get_variables(os.path.basename(yaml_file)))
+
+    @property
+    def text_entities(self):
+        """The entities of a free-text action, scanned in a single pass on first access"""
+        if self._text_entities is None:
+            self._text_entities = scan_action_text(self.mitigation_action.action)
+        return self._text_entities
+
+    @property
+    def rendered_playbook(self):
+        """The rendered Ansible playbook, rendered on first access and reused afterwards"""
+        if self._rendered_playbook is None:
+            self._rendered_playbook = self._render_ansible_playbook()
+        return self._rendered_playbook
 
-    
     def fill_in_ansible_playbook(self):
-        # Extracts the variables from the yaml file, that need to be replaced with actual values
-        variables = self.extract_variables_from_yaml(os.path.join("ansible_playbooks", self.chosen_playbook))
-        playbook_variables_dict = {}
-
-        # Loops through the variables and replaces them with actual values.
-        # Provide compact, sensible defaults for any missing variables.
-        defaults = {
-            'mitigation_host': getattr(self.mitigation_action, 'mitigation_host', '0.0.0.0') or '0.0.0.0',
-            'target_domain': getattr(self.mitigation_action, 'target_domain', 'unknown') or 'unknown',
-            'rate': '1',
-            'requests_per_sec': '1/second',
-            'duration': '0',
-            'protocol': 'tcp',
-            'ipv4_and_subnet': '0.0.0.0/32',
-            'interface_name': 'eth0',
-            'port': '53'
-        }
+        # Kept for backward compatibility: returns the stored render instead of rendering again
+        return self.rendered_playbook
 
-        def _get_field(name):
-            if isinstance(self.mitigation_action.action, dict):
-                return self.mitigation_action.action.get('fields', {}).get(name)
-            return None
-
-        for variable in variables:
-            # Direct substitutions with priority: explicit attribute -> action.fields -> regex/string -> default
-            if variable == 'mitigation_host':
-                playbook_variables_dict['mitigation_host'] = getattr(self.mitigation_action, 'mitigation_host', None) or defaults['mitigation_host']
-                continue
-
-            if variable == 'target_domain':
-                playbook_variables_dict['target_domain'] = (
-                    getattr(self.mitigation_action, 'target_domain', None)
-                    or _get_field('target_domain')
-                    or defaults['target_domain']
-                )
-                continue
+    def _render_ansible_playbook(self):
+        # Using the compiled jinja2 template, the variables are replaced with the actual values;
+        # identical (playbook, variables) pairs reuse the cached render
+        with RENDER_SECONDS.time(), get_tracer().span("render", intent_id=self.mitigation_action.intent_id,
+                                                      playbook=self.chosen_playbook):
+            self.variables = self.resolve_playbook_variables()
+            rendered = get_template_registry().render(self.chosen_playbook, self.variables)
+        return self.use_rendered_playbook(rendered)
 
-            if isinstance(self.mitigation_action.action, str):
-                # Try regex extraction first, then fall back to default
-                variable_value = re.findall(regex_patterns.get(variable, r''), self.mitigation_action.action)
-                playbook_variables_dict[variable] = variable_value[0] if variable_value else defaults.get(variable, 'UNKNOWN_VALUE')
-            else:
-                # Dictionary-based processing - extract from fields with defaults
-                if variable == 'rate':
-                    v = _get_field('rate') or _get_field('limit')
-                    playbook_variables_dict[variable] = str(v) if v is not None else defaults['rate']
-                elif variable == 'requests_per_sec':
-                    v = _get_field('rate') or _get_field('limit')
-                    playbook_variables_dict[variable] = f"{v}/second" if v is not None else defaults['requests_per_sec']
-                elif variable == 'duration':
-                    v = _get_field('duration')
-                    playbook_variables_dict[variable] = str(v) if v is not None else defaults['duration']
-                elif variable == 'protocol':
-                    v = _get_field('protocol')
-                    playbook_variables_dict[variable] = v if v is not None else defaults['protocol']
-                elif variable == 'ipv4_and_subnet':
-                    v = _get_field('ip_range')
-                    playbook_variables_dict[variable] = v if v is not None else defaults['ipv4_and_subnet']
-                elif variable == 'interface_name':
-                    v = _get_field('interface')
-                    playbook_variables_dict[variable] = v if v is not None else defaults['interface_name']
-                elif variable == 'port':
-                    v = _get_field('port')
-                    playbook_variables_dict[variable] = str(v) if v is not None else defaults['port']
-                else:
-                    playbook_variables_dict[variable] = defaults.get(variable, 'UNKNOWN_VALUE')
-
-        # Using the jinja2 library, the variables are replaced with the actual values
-        env = Environment(loader=FileSystemLoader('ansible_playbooks'))
-        template = env.get_template(self.chosen_playbook)
-        rendered_template = template.render(playbook_variables_dict)
+    def use_rendered_playbook(self, rendered_template):
+        """Store an already rendered playbook as this creator's render"""
+        self._rendered_playbook = rendered_template
 
         # Store the rendered template in the mitigation action's ansible_command field
         if hasattr(self.mitigation_action, 'ansible_command'):
@@ -202,10 +176,24 @@ class playbook_creator:
             # For backward compatibility if the field doesn't exist
             setattr(self.mitigation_action, 'ansible_command', rendered_template)
 
-        print(rendered_template)
+        # Playbook bodies are large: only written when debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Rendered playbook %s", self.chosen_playbook, extra={"ansible_command": rendered_template})
         return rendered_template
 
-    def simple_uploader(self, playbook_text):
+    def resolve_playbook_variables(self):
+        """Resolve the value of every variable of the chosen playbook for this mitigation action"""
+        # The resolvers of the playbook's variables are compiled from playbook_variables.json at load time
+        resolver = get_playbook_resolver(self.chosen_playbook)
+        if isinstance(self.mitigation_action.action, str):
+            return resolver.resolve(self.mitigation_action, lambda: self.text_entities)
+        return resolver.resolve(self.mitigation_action)
+
+    def simple_uploader(self, playbook_text=None):
+        # Reuse the stored render unless a playbook text is explicitly given
+        if playbook_text is None:
+            playbook_text = self.rendered_playbook
+
         # Build the JSON payload according to the expected schema
         payload = {
             "command": self.mitigation_action.command,
@@ -231,103 +219,218 @@ class playbook_creator:
         
         # Log multidomain actions if applicable
         if isinstance(target_domain, list) and len(target_domain) > 1:
-            print(f"Multidomain mitigation action detected for domains: {target_domain}")
-            for domain in target_domain:
-                print(f" - Domain involved: {domain}")
+            logger.info("Multidomain mitigation action for domains %s", ", ".join(target_domain))
         
-        # Send only to ePEM endpoint
-        api_url = self.epem_endpoint + "/v2/horse/rtr_request"
+        # Send only to ePEM endpoint, over the shared keep-alive connection pool
+        epem_client = get_epem_client(self.epem_endpoint)
+        api_path = "/v2/horse/rtr_request"
         endpoint_name = "ePEM"
         
-        print(f"Sending request to {endpoint_name} endpoint: {api_url}")
-        print(f"Payload: {payload}")
+        logger.info("Sending request to %s endpoint %s%s", endpoint_name, epem_client.base_url, api_path)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s payload", endpoint_name, extra={"payload": payload})
         
         try:
-            # Send the request to the API with JSON payload and timeout
-            response = requests.post(
-                api_url,
-                headers=headers,
-                json=payload,
-                timeout=10  # 10 second timeout for connection
-            )
+            # Send the request to the API with JSON payload and per-phase (connect, read) timeouts;
+            # the traceparent header lets ePEM and DOC join the intent's trace
+            with EPEM_POST_SECONDS.time(), get_tracer().span("epem_post", intent_id=self.mitigation_action.intent_id,
+                                                             endpoint=epem_client.base_url + api_path) as span:
+                response = epem_client.post(
+                    api_path,
+                    headers=inject_traceparent(headers),
+                    json=payload
+                )
+                span.set_attribute("http.status_code", response.status_code)
+                if response.status_code >= 400:
+                    span.set_error(f"ePEM answered {response.status_code}")
+            EPEM_RESPONSES.labels(str(response.status_code)).inc()
 
             # Handle different response status codes
             if response.status_code == 200:
-                print(f"✅ Upload completed successfully to {endpoint_name}!")
-                print(response.text)
+                logger.info("Upload completed successfully to %s", endpoint_name,
+                            extra={"status_code": response.status_code, "response": response.text})
                 self.mitigation_action.status = "sent_to_epem"
                 self.mitigation_action.info = f"Successfully sent to {endpoint_name} → Action forwarded to DOC for enforcement"
                 return True
                 
             elif response.status_code == 201:
-                print(f"✅ Action created successfully at {endpoint_name}!")
-                print(response.text)
+                logger.info("Action created successfully at %s", endpoint_name,
+                            extra={"status_code": response.status_code, "response": response.text})
                 self.mitigation_action.status = "sent_to_epem"
                 self.mitigation_action.info = f"Action created at {endpoint_name} → Processing for DOC enforcement"
                 return True
                 
             elif response.status_code == 202:
-                print(f"✅ Action accepted by {endpoint_name} for processing!")
-                print(response.text)
+                logger.info("Action accepted by %s for processing", endpoint_name,
+                            extra={"status_code": response.status_code, "response": response.text})
                 self.mitigation_action.status = "sent_to_epem"
                 self.mitigation_action.info = f"Action accepted by {endpoint_name} → Queued for DOC enforcement"
                 return True
                 
             elif response.status_code == 400:
-                print(f"❌ Bad request to {endpoint_name} - invalid payload: {response.status_code}")
-                print(f"Response: {response.text}")
+                logger.error("Bad request to %s - invalid payload", endpoint_name,
+                             extra={"status_code": response.status_code, "response": response.text})
                 self.mitigation_action.status = "epem_rejected"
                 self.mitigation_action.info = f"{endpoint_name} rejected request (400 Bad Request): {response.text}"
                 return False
                 
             elif response.status_code == 401:
-                print(f"❌ Unauthorized request to {endpoint_name}: {response.status_code}")
-                print(f"Response: {response.text}")
+                logger.error("Unauthorized request to %s", endpoint_name,
+                             extra={"status_code": response.status_code, "response": response.text})
                 self.mitigation_action.status = "epem_unauthorized"
                 self.mitigation_action.info = f"{endpoint_name} rejected request (401 Unauthorized): {response.text}"
                 return False
                 
             elif response.status_code == 404:
-                print(f"❌ {endpoint_name} endpoint not found: {response.status_code}")
-                print(f"Response: {response.text}")
+                logger.error("%s endpoint not found", endpoint_name,
+                             extra={"status_code": response.status_code, "response": response.text})
                 self.mitigation_action.status = "epem_not_found"
                 self.mitigation_action.info = f"{endpoint_name} endpoint not found (404): {response.text}"
                 return False
                 
             elif response.status_code >= 500:
-                print(f"❌ {endpoint_name} server error: {response.status_code}")
-                print(f"Response: {response.text}")
+                logger.error("%s server error", endpoint_name,
+                             extra={"status_code": response.status_code, "response": response.text})
                 self.mitigation_action.status = "epem_server_error"
                 self.mitigation_action.info = f"{endpoint_name} server error ({response.status_code}): {response.text}"
                 return False
                 
             else:
-                print(f"⚠️ Unexpected response status code from {endpoint_name}: {response.status_code}")
-                print(f"Response: {response.text}")
+                logger.warning("Unexpected response status code from %s", endpoint_name,
+                               extra={"status_code": response.status_code, "response": response.text})
                 self.mitigation_action.status = "epem_unexpected_response"
                 self.mitigation_action.info = f"{endpoint_name} unexpected response ({response.status_code}): {response.text}"
                 return False
 
         except requests.exceptions.Timeout:
-            print(f"❌ Timeout when connecting to {endpoint_name}")
+            EPEM_RESPONSES.labels("timeout").inc()
+            logger.error("Timeout when connecting to %s", endpoint_name)
             self.mitigation_action.status = "epem_timeout"
-            self.mitigation_action.info = f"{endpoint_name} request timed out after 10 seconds"
+            self.mitigation_action.info = (
+                f"{endpoint_name} request timed out (connect {epem_client.connect_timeout}s, "
+                f"read {epem_client.read_timeout}s)"
+            )
             return False
             
         except requests.exceptions.ConnectionError:
-            print(f"❌ Connection error when connecting to {endpoint_name}")
+            EPEM_RESPONSES.labels("connection_error").inc()
+            logger.error("Connection error when connecting to %s", endpoint_name)
             self.mitigation_action.status = "epem_connection_error"
             self.mitigation_action.info = f"Failed to connect to {endpoint_name} - connection error"
             return False
             
         except Exception as e:
-            print(f"❌ An error occurred when connecting to {endpoint_name}: {str(e)}")
+            EPEM_RESPONSES.labels("error").inc()
+            logger.error("An error occurred when connecting to %s: %s", endpoint_name, e)
             self.mitigation_action.status = "epem_error"
             self.mitigation_action.info = f"Error sending to {endpoint_name}: {str(e)}"
             return False
 
 
 
+def render_playbooks(creators):
+    """
+    Render the playbooks of several playbook_creators, rendering each distinct
+    (playbook, resolved variables) pair only once and sharing the result
+
+    Args:
+        creators: playbook_creator instances with a known chosen_playbook
+
+    Returns:
+        tuple: (number of distinct renders, list holding for each creator the
+        exception raised while rendering it, or None on success)
+    """
+    renders = {}
+    errors = []
+    registry = get_template_registry()
+    tracer = get_tracer()
+    for creator in creators:
+        try:
+            with intent_context(creator.mitigation_action.intent_id):
+                with RENDER_SECONDS.time(), tracer.span("render", intent_id=creator.mitigation_action.intent_id,
+                                                        playbook=creator.chosen_playbook):
+                    variables = creator.resolve_playbook_variables()
+                    key = render_key(creator.chosen_playbook, variables)
+                    if key not in renders:
+                        renders[key] = registry.render(creator.chosen_playbook, variables)
+                creator.variables = variables
+                creator.use_rendered_playbook(renders[key])
+            errors.append(None)
+        except Exception as e:
+            errors.append(e)
+    return len(renders), errors
+
+
+def combine_playbooks(rendered_playbooks):
+    """Join rendered playbooks into a single playbook running all their plays in order"""
+    plays = [re.sub(r'\A\s*---[ \t]*\n', '', rendered).strip('\n') for rendered in rendered_playbooks]
+    return "---\n" + "\n\n".join(plays)
+
+
+def render_rollback(action_type, stored_variables):
+    """
+    Render the playbook undoing an action from the variables it was enforced with
+
+    Args:
+        action_type: The action name the enforcing playbook was chosen for
+        stored_variables: The resolved variables stored with the action
+
+    Returns:
+        str: The rendered rollback playbook, or None if the action has no rollback playbook
+    """
+    rollback_path = get_rollback_playbook_for_action(action_type)
+    if rollback_path is None:
+        return None
+    rollback_playbook = os.path.basename(rollback_path)
+    variables = get_playbook_resolver(rollback_playbook).restore(stored_variables)
+    return get_template_registry().render(rollback_playbook, variables)
+
+
+def render_update(creator, stored_variables):
+    """
+    Render only what has to change on the target when an enforced action is updated.
+    When only set-valued variables changed (e.g. blocked_ips), the removed items are undone with
+    the rollback playbook and the added ones enforced with the playbook; otherwise the whole
+    action is undone and enforced again with the new variables.
+
+    Args:
+        creator: playbook_creator of the updated action, with the same chosen_playbook as the enforced one
+        stored_variables: The resolved variables the enforced action was rendered with
+
+    Returns:
+        tuple: (the rendered delta playbook, stored on the creator, or None if nothing changed; the VariableDelta)
+
+    Raises:
+        ValueError: If items must be removed but the action has no rollback playbook
+    """
+    resolver = get_playbook_resolver(creator.chosen_playbook)
+    creator.variables = creator.resolve_playbook_variables()
+    delta = resolver.diff(resolver.restore(stored_variables), creator.variables)
+    if not delta.changed:
+        return None, delta
+
+    registry = get_template_registry()
+    renders = []
+    if delta.incremental:
+        if delta.removed:
+            removed = resolver.with_items(creator.variables, delta.changed, delta.removed)
+            rollback = render_rollback(creator.action_type, to_stored_values(removed))
+            if rollback is None:
+                raise ValueError(f"Action '{creator.action_type}' has no rollback playbook, "
+                                 f"{', '.join(delta.removed)} cannot be removed")
+            renders.append(rollback)
+        if delta.added:
+            added = resolver.with_items(creator.variables, delta.changed, delta.added)
+            renders.append(registry.render(creator.chosen_playbook, added))
+    else:
+        # Without a rollback playbook the new variables are enforced over the old ones
+        rollback = render_rollback(creator.action_type, stored_variables)
+        if rollback is not None:
+            renders.append(rollback)
+        renders.append(registry.render(creator.chosen_playbook, creator.variables))
+    return creator.use_rendered_playbook(combine_playbooks(renders)), delta
+
+
 if __name__ == "__main__":
     mitigation_action = mitigation_action_model(
         command='add',
@@ -345,5 +448,4 @@ if __name__ == "__main__":
         # ansible_command defaults to ""
     )
     playbook = playbook_creator(mitigation_action)
-    playbook_txt = playbook.fill_in_ansible_playbook()
-    playbook.simple_uploader(playbook_text=playbook_txt)
+    playbook.simple_uploader()
@@ -0,0 +1,159 @@
+"""
+Structured logging for RTR
+Every record is written as one JSON line carrying the intent_id it belongs
+to. Loggers only put records on an in-memory queue; a single background
+thread formats them and writes them to stdout, so request handlers and
+dispatch workers never block on the container log driver.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# The intent the current request, task or dispatch job works on; copied into every record
+intent_id_var: contextvars.ContextVar = contextvars.ContextVar("intent_id", default=None)
+
+# Parent of every RTR logger; its level is the one changed at run time
+ROOT_LOGGER = "rtr"
+
+# Attributes every LogRecord has; anything else was passed through extra= and is logged as a field
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+class IntentContextFilter(logging.Filter):
+    """Stamp records with the current intent_id; runs in the logging thread, before the record is queued"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "intent_id", None) is None:
+            record.intent_id = intent_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as a single JSON object"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "intent_id": getattr(record, "intent_id", None),
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and name not in entry:
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _PreparedQueueHandler(QueueHandler):
+    """Queue the record as is: extra fields and exc_info are formatted by the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class _ListenerJsonFormatter(JsonFormatter):
+    def format(self, record: logging.LogRecord) -> str:
+        formatted = super().format(record)
+        if record.exc_text:
+            entry = json.loads(formatted)
+            entry["exception"] = record.exc_text
+            formatted = json.dumps(entry, default=str, ensure_ascii=False)
+        return formatted
+
+
+def setup_logging(level: Optional[str] = None):
+    """
+    Route the RTR loggers through a non-blocking queue to a JSON stdout writer; safe to call more than once
+
+    Args:
+        level: Initial level (LOG_LEVEL, default INFO)
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        log_queue = queue.SimpleQueue()
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(_ListenerJsonFormatter())
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=False)
+
+        queue_handler = _PreparedQueueHandler(log_queue)
+        queue_handler.addFilter(IntentContextFilter())
+        logger = logging.getLogger(ROOT_LOGGER)
+        logger.handlers = [queue_handler]
+        # uvicorn configures the root logger; RTR records are written once, by the listener
+        logger.propagate = False
+        logger.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Write the queued records and stop the writer thread"""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Get the logger of an RTR module, e.g. get_logger("dispatcher") -> rtr.dispatcher"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def get_log_level(name: Optional[str] = None) -> str:
+    """Get the effective level of the RTR loggers, or of one of them"""
+    logger = get_logger(name) if name else logging.getLogger(ROOT_LOGGER)
+    return logging.getLevelName(logger.getEffectiveLevel())
+
+
+def set_log_level(level: str, name: Optional[str] = None) -> str:
+    """
+    Change the level of the RTR loggers, or of one of them, at run time
+
+    Args:
+        level: DEBUG, INFO, WARNING, ERROR or CRITICAL
+        name: A module logger such as "dispatcher"; all RTR loggers if not given
+
+    Returns:
+        str: The new effective level
+
+    Raises:
+        ValueError: If the level is unknown
+    """
+    level = level.upper()
+    if level not in ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"):
+        raise ValueError(f"Unknown log level '{level}', expected DEBUG, INFO, WARNING, ERROR or CRITICAL")
+    logger = get_logger(name) if name else logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(level)
+    return get_log_level(name)
+
+
+@contextmanager
+def intent_context(intent_id: Optional[str]):
+    """Attach the given intent_id to every record logged inside the block"""
+    token = intent_id_var.set(intent_id)
+    try:
+        yield
+    finally:
+        intent_id_var.reset(token)
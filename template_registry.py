@@ -0,0 +1,323 @@
+"""
+Template registry for RTR Ansible playbooks
+Holds the playbook templates compiled with the live configuration snapshot,
+each together with the list of variables it expects. Renders only use the
+installed templates; playbook changes on disk reach them through the next
+snapshot. Rendered playbooks are memoized by playbook and resolved variables,
+since the same mitigation is often requested by many intents.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from jinja2 import Environment, FileSystemLoader, TemplateNotFound
+
+
+# Matches every {{ variable }} placeholder in a playbook template
+JINJA2_VARIABLE_PATTERN = re.compile(r'\{\{(.+?)\}\}')
+
+
+class PlaybookTemplate:
+    """
+    A compiled playbook template and its variable manifest
+    """
+    __slots__ = ("name", "path", "mtime", "template", "variables")
+
+    def __init__(self, name: str, path: Path, mtime: float, template, variables: List[str]):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+        self.template = template
+        self.variables = variables
+
+    def render(self, variables: Dict[str, str]) -> str:
+        """Render the compiled template with the given variable values"""
+        return self.template.render(variables)
+
+
+def render_key(playbook_name: str, variables: Dict[str, object]) -> Tuple[str, str]:
+    """
+    Get the render cache key of a playbook and its resolved variables
+
+    Args:
+        playbook_name: Playbook file name relative to ansible_playbooks/
+        variables: The resolved variable values
+
+    Returns:
+        Tuple[str, str]: The playbook name and a SHA-256 digest of the canonical JSON form of the variables
+    """
+    canonical = json.dumps(variables, sort_keys=True, separators=(",", ":"), default=str)
+    return playbook_name, hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """
+    Bounded LRU cache of rendered playbooks with a time-to-live.
+    An entry is only reused with the compiled template it was rendered from,
+    so a playbook changed on disk is never served from a stale render.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None):
+        """
+        Args:
+            max_entries: Maximum number of cached renders (RENDER_CACHE_SIZE, default 1024; 0 disables the cache)
+            ttl: Seconds a render stays valid (RENDER_CACHE_TTL, default 300; 0 means no expiry)
+        """
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("RENDER_CACHE_SIZE", "1024"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("RENDER_CACHE_TTL", "300"))
+        # key -> (compiled template, rendered text, expiry time or None, size in bytes)
+        self._entries: "OrderedDict[Tuple[str, str], tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Tuple[str, str], template) -> Optional[str]:
+        """Get a cached render of the given compiled template, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                cached_template, rendered, expires_at, _ = entry
+                if expires_at is not None and expires_at <= time.monotonic():
+                    self._remove(key)
+                    self.expirations += 1
+                elif cached_template is template:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return rendered
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple[str, str], template, rendered: str):
+        """Cache a render, evicting the least recently used entries beyond max_entries"""
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            size = sys.getsizeof(rendered)
+            self._entries[key] = (template, rendered, expires_at, size)
+            self.memory_bytes += size
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: Tuple[str, str]):
+        self.memory_bytes -= self._entries.pop(key)[3]
+
+    def clear(self) -> int:
+        """
+        Drop all cached renders
+
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            removed = len(self._entries)
+            self._entries = OrderedDict()
+            self.memory_bytes = 0
+        return removed
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get cache statistics for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "memory_bytes": self.memory_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class TemplateRegistry:
+    """
+    Singleton process-wide set of compiled playbook templates.
+    The templates are replaced all at once by install() when a configuration
+    snapshot goes live; they are never recompiled on the request path.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.playbook_dir = Path(__file__).parent / "ansible_playbooks"
+        self._environment = Environment(loader=FileSystemLoader(str(self.playbook_dir)))
+        self._templates: Dict[str, PlaybookTemplate] = {}
+        self._entries_lock = threading.Lock()
+        self.renders = RenderCache()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def extract_variables(template_source: str) -> List[str]:
+        """
+        Extract the names of all {{ variable }} placeholders from a template
+
+        Args:
+            template_source: The raw playbook template text
+
+        Returns:
+            List[str]: Variable names in order of first appearance, without duplicates
+        """
+        variables = []
+        for match in JINJA2_VARIABLE_PATTERN.findall(template_source):
+            name = match.strip()
+            if name not in variables:
+                variables.append(name)
+        return variables
+
+    def get(self, playbook_name: str) -> PlaybookTemplate:
+        """
+        Get the compiled template of a playbook installed with the live configuration snapshot
+
+        Args:
+            playbook_name: Playbook file name relative to ansible_playbooks/
+
+        Returns:
+            PlaybookTemplate: The compiled template and its variable manifest
+
+        Raises:
+            jinja2.TemplateNotFound: If the live snapshot holds no compiled template for the playbook
+        """
+        entry = self._templates.get(playbook_name)
+        if entry is None:
+            self.misses += 1
+            raise TemplateNotFound(playbook_name)
+        self.hits += 1
+        return entry
+
+    def compile(self, playbook_name: str, mtime: Optional[float] = None) -> PlaybookTemplate:
+        """
+        Compile a playbook template without caching it, e.g. to build a configuration snapshot
+
+        Args:
+            playbook_name: Playbook file name relative to ansible_playbooks/
+            mtime: Modification time of the file, read from disk if not given
+
+        Returns:
+            PlaybookTemplate: The compiled template and its variable manifest
+
+        Raises:
+            jinja2.TemplateNotFound: If the playbook file does not exist
+        """
+        if mtime is None:
+            try:
+                mtime = os.stat(self.playbook_dir / playbook_name).st_mtime
+            except OSError:
+                mtime = None
+        source, filename, _ = self._environment.loader.get_source(self._environment, playbook_name)
+        return PlaybookTemplate(
+            name=playbook_name,
+            path=Path(filename),
+            mtime=mtime,
+            template=self._environment.from_string(source),
+            variables=self.extract_variables(source),
+        )
+
+    def install(self, templates: Dict[str, PlaybookTemplate]) -> int:
+        """
+        Replace all compiled templates at once with already compiled ones, dropping the rendered playbooks
+
+        Args:
+            templates: Playbook file name -> compiled template
+
+        Returns:
+            int: Number of compiled templates replaced
+        """
+        with self._entries_lock:
+            removed = len(self._templates)
+            self._templates = dict(templates)
+            self.invalidations += removed
+        self.renders.clear()
+        return removed
+
+    def render(self, playbook_name: str, variables: Dict[str, object]) -> str:
+        """
+        Render a playbook, reusing a previous render of the same playbook and variables
+
+        Args:
+            playbook_name: Playbook file name relative to ansible_playbooks/
+            variables: The resolved variable values
+
+        Returns:
+            str: The rendered playbook
+
+        Raises:
+            jinja2.TemplateNotFound: If the live snapshot holds no compiled template for the playbook
+        """
+        template = self.get(playbook_name)
+        key = render_key(playbook_name, variables)
+        rendered = self.renders.get(key, template)
+        if rendered is None:
+            rendered = template.render(variables)
+            self.renders.put(key, template, rendered)
+        return rendered
+
+    def get_variables(self, playbook_name: str) -> List[str]:
+        """Get the variable manifest of a playbook"""
+        return self.get(playbook_name).variables
+
+    def clear(self) -> int:
+        """
+        Drop all rendered playbooks; the compiled templates stay until the next snapshot is installed
+
+        Returns:
+            int: Number of rendered playbooks removed
+        """
+        return self.renders.clear()
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get cache statistics for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "cached_templates": sorted(self._templates.keys()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "render_cache": self.renders.get_stats(),
+        }
+
+
+# Global singleton instance
+_template_registry_instance: Optional[TemplateRegistry] = None
+
+
+def get_template_registry() -> TemplateRegistry:
+    """
+    Get the global TemplateRegistry singleton instance
+
+    Returns:
+        TemplateRegistry: The singleton template registry
+    """
+    global _template_registry_instance
+    if _template_registry_instance is None:
+        _template_registry_instance = TemplateRegistry()
+    return _template_registry_instance
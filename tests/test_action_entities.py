@@ -0,0 +1,29 @@
+from action_entities import scan_action_text
+from mitigation_action_class import mitigation_action_model
+from mitigation_regex_control import playbook_creator
+
+def test_scan_collects_every_entity_in_one_pass():
+    entities = scan_action_text(
+        "Rate limit UDP traffic from 10.0.0.1 and 10.0.1.0/24 to 10.0.0.1 on ports 53, 5353 "
+        "at 20 requests per second on eth1 and wlan0"
+    )
+    assert entities.ipv4_and_subnet == ["10.0.0.1", "10.0.1.0/24"]
+    assert entities.protocols == ["udp"]
+    assert entities.ports == [53, 5353]
+    assert entities.rates == [20]
+    assert entities.interfaces == ["eth1", "wlan0"]
+
+def test_scan_ignores_invalid_values():
+    entities = scan_action_text("block 300.1.1.1 and 10.0.0.0/40 on port 70000")
+    assert entities.ipv4_and_subnet == []
+    assert entities.ports == []
+
+def test_playbook_variables_come_from_the_entities():
+    creator = playbook_creator(mitigation_action_model(
+        intent_id="entities",
+        action="Set the number of request to the dns server to a 5/s for port 55, protocol udp"
+    ))
+    variables = creator.resolve_playbook_variables()
+    assert variables["requests_per_sec"] == "5/second"
+    assert variables["port"] == "55"
+    assert variables["protocol"] == "udp"
@@ -0,0 +1,40 @@
+import asyncio
+
+from action_events import ActionEventBroker
+
+def test_subscribers_receive_matching_changes():
+    async def scenario():
+        broker = ActionEventBroker(queue_size=8)
+        broker.bind(asyncio.get_running_loop())
+        everything = broker.subscribe()
+        upc_completed = broker.subscribe(domain="upc", status="completed")
+
+        broker.publish("added", "i1", {}, {"status": "processing", "target_domain": "UPC"})
+        broker.publish("updated", "i1", {"status": "completed", "ansible_command": "..."},
+                       {"status": "completed", "target_domain": "UPC"})
+        broker.publish("updated", "i2", {"status": "completed"}, {"status": "completed", "target_domain": "CNIT"})
+        await asyncio.sleep(0)
+
+        assert everything.queue.qsize() == 3
+        event = await upc_completed.next_event(timeout=1)
+        assert (event["event"], event["intent_id"], event["changed"]) == ("updated", "i1", {"status": "completed"})
+        assert upc_completed.queue.empty()
+
+    asyncio.run(scenario())
+
+def test_slow_subscriber_is_dropped():
+    async def scenario():
+        broker = ActionEventBroker(queue_size=2)
+        broker.bind(asyncio.get_running_loop())
+        slow = broker.subscribe()
+
+        for number in range(3):
+            broker.publish("updated", f"i{number}", {"status": "queued"}, {"status": "queued"})
+        await asyncio.sleep(0)
+
+        assert slow.dropped
+        event = await slow.next_event(timeout=1)
+        assert event["event"] == "dropped"
+        assert broker.get_stats()["subscribers"] == 0
+
+    asyncio.run(scenario())
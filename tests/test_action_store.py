@@ -0,0 +1,192 @@
+import copy
+from types import SimpleNamespace
+
+import pytest
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import DuplicateKeyError, ServerSelectionTimeoutError
+
+from action_store import ActionStore, DuplicateActionError
+
+
+class FakeCollection:
+    """The subset of a pymongo collection used by ActionStore, with a unique intent_id index"""
+
+    def __init__(self):
+        self.documents = {}
+        self.down = False
+        self.bulk_writes = []
+
+    def _check(self):
+        if self.down:
+            raise ServerSelectionTimeoutError("mongodb:27017: connection refused")
+
+    def insert_one(self, document):
+        self._check()
+        if document["intent_id"] in self.documents:
+            raise DuplicateKeyError("E11000 duplicate key error")
+        self.documents[document["intent_id"]] = copy.deepcopy(document)
+
+    def find(self, query, projection=None):
+        self._check()
+        return [copy.deepcopy(document) for document in self.documents.values()]
+
+    def find_one(self, query, projection=None):
+        self._check()
+        document = self.documents.get(query["intent_id"])
+        return copy.deepcopy(document) if document is not None else None
+
+    def delete_one(self, query):
+        self._check()
+        self.documents.pop(query["intent_id"], None)
+
+    def bulk_write(self, operations, ordered=True):
+        self._check()
+        self.bulk_writes.append(operations)
+        upserted_ids = {}
+        for index, operation in enumerate(operations):
+            intent_id = operation._filter["intent_id"]
+            if isinstance(operation, DeleteOne):
+                self.documents.pop(intent_id, None)
+            elif intent_id in self.documents:
+                self.documents[intent_id].update(copy.deepcopy(operation._doc.get("$set", {})))
+            elif operation._upsert:
+                self.documents[intent_id] = copy.deepcopy(operation._doc["$setOnInsert"])
+                upserted_ids[index] = intent_id
+        return SimpleNamespace(upserted_ids=upserted_ids)
+
+
+def action(intent_id, **fields):
+    return dict({"intent_id": intent_id, "status": "processing", "info": "", "created_at": 1000}, **fields)
+
+
+def test_duplicate_adds_are_rejected():
+    collection = FakeCollection()
+    store = ActionStore(collection, cache_ttl=0)
+    store.add("a1", action("a1"))
+    with pytest.raises(DuplicateActionError):
+        store.add("a1", action("a1"))
+
+    # An intent added by another worker is rejected by the unique index, and not left in the cache
+    collection.documents["a2"] = action("a2")
+    with pytest.raises(DuplicateActionError):
+        store.add("a2", action("a2"))
+    assert len(store) == 1
+
+
+def test_updates_are_coalesced_into_one_write_of_the_changed_fields():
+    collection = FakeCollection()
+    store = ActionStore(collection, cache_ttl=0)
+    store.add("a1", action("a1"))
+    store.update("a1", status="queued", info="queued")
+    store.update("a1", status="sent_to_epem")
+
+    assert store.flush() == 1
+    [[operation]] = collection.bulk_writes
+    assert operation._doc == {"$set": {"status": "sent_to_epem", "info": "queued"}}
+    assert store.get_stats()["updates_coalesced"] == 1
+    assert collection.documents["a1"]["status"] == "sent_to_epem"
+    assert store.flush() == 0
+
+
+def test_workers_do_not_overwrite_each_other():
+    collection = FakeCollection()
+    worker_a = ActionStore(collection, cache_ttl=0.0001)
+    worker_b = ActionStore(collection, cache_ttl=0.0001)
+    worker_a.add("a1", action("a1"))
+
+    # The status callback lands on worker B
+    worker_b.update("a1", status="completed", info="enforced")
+    worker_b.flush()
+    # Worker A then writes an unrelated field
+    worker_a._synced_at["a1"] = 0
+    worker_a.update("a1", expiry_status="scheduled")
+    worker_a.flush()
+
+    assert collection.documents["a1"]["status"] == "completed"
+    assert collection.documents["a1"]["expiry_status"] == "scheduled"
+    # Worker A reads B's status once its cached copy is older than the TTL
+    worker_a._synced_at["a1"] = 0
+    assert worker_a.get("a1")["status"] == "completed"
+    assert [found["intent_id"] for found in worker_a.query({"status": "completed"})[0]] == ["a1"]
+
+
+def test_unflushed_changes_survive_a_refresh():
+    collection = FakeCollection()
+    store = ActionStore(collection, cache_ttl=0.0001)
+    store.add("a1", action("a1"))
+    store.update("a1", status="queued")
+    collection.documents["a1"]["info"] = "changed by another worker"
+    store._synced_at["a1"] = 0
+
+    refreshed = store.get("a1")
+    assert refreshed["status"] == "queued"
+    assert refreshed["info"] == "changed by another worker"
+
+
+def test_actions_are_kept_in_memory_while_mongodb_is_unavailable():
+    collection = FakeCollection()
+    collection.down = True
+    store = ActionStore(collection, cache_ttl=0.0001)
+    assert store.load() == 0
+    store.add("a1", action("a1"))
+    store.update("a1", status="queued")
+    assert store.get("a1")["status"] == "queued"
+    assert store.get("missing") is None
+
+    assert store.flush() == 0
+    assert store.get_stats()["pending_writes"] == 1
+
+    # The whole action is written once MongoDB is back
+    collection.down = False
+    assert store.flush() == 1
+    assert collection.documents["a1"]["status"] == "queued"
+    assert store.get_stats()["mongo_available"]
+
+
+def test_an_intent_can_be_added_again_after_its_delete():
+    collection = FakeCollection()
+    store = ActionStore(collection, cache_ttl=0)
+    store.add("a1", action("a1"))
+    # e.g. dropped because the dispatch queue was full, then retried by the client
+    store.delete("a1")
+    store.add("a1", action("a1", info="retry"))
+    store.flush()
+    assert collection.documents["a1"]["info"] == "retry"
+
+
+def test_load_is_retried_once_mongodb_is_back():
+    collection = FakeCollection()
+    collection.documents["a1"] = action("a1", expiry_status="scheduled", expires_at=2000)
+    collection.down = True
+    loaded = []
+    store = ActionStore(collection, cache_ttl=0, on_load=loaded.extend)
+    assert store.load() == 0
+    assert not store.reconnect()
+    assert store.get("a1") is None
+
+    collection.down = False
+    assert store.reconnect()
+    assert store.get("a1")["status"] == "processing"
+    assert [found["intent_id"] for found in store.query()[0]] == ["a1"]
+    # Loaded actions are handed over, e.g. to restore their expiries
+    assert [found["intent_id"] for found in loaded] == ["a1"]
+
+
+def test_actions_added_offline_never_overwrite_a_stored_intent():
+    collection = FakeCollection()
+    collection.documents["a1"] = action("a1", info="stored by another worker")
+    collection.down = True
+    store = ActionStore(collection, cache_ttl=0)
+    store.load()
+    store.add("a1", action("a1", info="added offline", created_at=1001))
+    store.add("a2", action("a2"))
+
+    collection.down = False
+    assert store.reconnect()
+    assert store.flush() == 2
+    assert collection.documents["a1"]["info"] == "stored by another worker"
+    assert collection.documents["a2"]["status"] == "processing"
+    # The stored action replaces the one added offline
+    assert store.get("a1")["info"] == "stored by another worker"
+    assert store.get_stats()["insert_conflicts"] == 1
+    assert store.flush() == 0
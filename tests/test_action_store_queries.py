@@ -0,0 +1,97 @@
+from action_store import ActionStore
+
+def build_store():
+    # Without MongoDB the store keeps the actions in memory only
+    store = ActionStore(collection=None)
+    store.mongo_available = False
+    for number in range(10):
+        store.add(f"q{number}", {
+            "intent_id": f"q{number}",
+            "status": "queued",
+            "threat": "ddos" if number % 2 == 0 else "dns_spoofing",
+            "target_domain": ["UPC", "CNIT"] if number == 9 else "CNIT",
+            "action": {"name": "block_ip_addresses" if number < 5 else "dns_rate_limit"},
+            "created_at": 1000 + number
+        })
+    return store
+
+def test_query_pages_in_insertion_order():
+    store = build_store()
+
+    first_page, cursor = store.query(limit=4)
+    assert [action["intent_id"] for action in first_page] == ["q0", "q1", "q2", "q3"]
+
+    second_page, cursor = store.query(cursor=cursor, limit=4)
+    last_page, cursor = store.query(cursor=cursor, limit=4)
+    assert [action["intent_id"] for action in second_page + last_page] == [f"q{number}" for number in range(4, 10)]
+    assert cursor is None
+
+def test_query_filters_use_secondary_indexes():
+    store = build_store()
+    store.update("q2", status="completed")
+    store.update("q4", status="completed")
+
+    completed, _ = store.query({"status": "completed"})
+    assert [action["intent_id"] for action in completed] == ["q2", "q4"]
+
+    # Filters are combined and case-insensitive
+    matches, _ = store.query({"threat": "DDOS", "action_name": "BLOCK_IP_ADDRESSES", "status": "queued"})
+    assert [action["intent_id"] for action in matches] == ["q0"]
+
+    # List-valued domains are indexed under each domain
+    upc, _ = store.query({"target_domain": "upc"})
+    assert [action["intent_id"] for action in upc] == ["q9"]
+
+    # Deleted actions leave the indexes
+    store.delete("q2")
+    completed, _ = store.query({"status": "completed"})
+    assert [action["intent_id"] for action in completed] == ["q4"]
+
+def test_query_time_range():
+    store = build_store()
+    actions, _ = store.query(since=1003, until=1005)
+    assert [action["intent_id"] for action in actions] == ["q3", "q4", "q5"]
+
+def test_query_by_mitigation_host():
+    store = build_store()
+    store.update("q1", mitigation_host="10.0.0.1")
+    # Multidomain actions store their hosts as a list, or as the str() of one
+    store.update("q3", mitigation_host=["10.0.0.1", "10.0.0.2"])
+    store.update("q5", mitigation_host="['10.0.0.2', '10.0.0.3']")
+
+    host_actions, _ = store.query({"mitigation_host": "10.0.0.1"})
+    assert [action["intent_id"] for action in host_actions] == ["q1", "q3"]
+
+    host_actions, _ = store.query({"mitigation_host": "10.0.0.2"})
+    assert [action["intent_id"] for action in host_actions] == ["q3", "q5"]
+
+    # Moving an action to another host removes it from the old host's index
+    store.update("q1", mitigation_host="10.0.0.3")
+    host_actions, _ = store.query({"mitigation_host": "10.0.0.3"})
+    assert [action["intent_id"] for action in host_actions] == ["q1", "q5"]
+    host_actions, _ = store.query({"mitigation_host": "10.0.0.1", "status": "queued"})
+    assert [action["intent_id"] for action in host_actions] == ["q3"]
+
+def test_query_time_range_includes_late_actions():
+    store = build_store()
+    # Cached after newer actions, e.g. read back from MongoDB on a cache miss
+    store.add("late", {"intent_id": "late", "status": "queued", "created_at": 1004.5})
+
+    actions, _ = store.query(since=1004, until=1005)
+    assert [action["intent_id"] for action in actions] == ["q4", "q5", "late"]
+    actions, _ = store.query({"status": "queued"}, since=1004, until=1004.5)
+    assert [action["intent_id"] for action in actions] == ["q4", "late"]
+    actions, _ = store.query(since=2000)
+    assert actions == []
+
+def test_query_compacts_deleted_actions():
+    store = build_store()
+    first_page, cursor = store.query(limit=3)
+    for number in range(7):
+        store.delete(f"q{number}")
+
+    # Tombstones never outnumber the live actions, and cursors stay valid
+    assert store.get_stats()["tombstones"] <= store.get_stats()["cached_actions"]
+    rest, cursor = store.query(cursor=cursor)
+    assert [action["intent_id"] for action in rest] == ["q7", "q8", "q9"]
+    assert cursor is None
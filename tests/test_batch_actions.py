@@ -0,0 +1,74 @@
+import requests
+from pprint import pprint
+
+def test_login_and_post_actions_batch():
+    base_url = "http://127.0.0.1:8000"
+    
+    ###################### LOGIN REQUESTS ######################
+    headers = {
+        'accept': 'application/json',
+        'Content-Type': 'application/x-www-form-urlencoded'
+    }
+
+    data = {
+        'grant_type': '',
+        'username': 'user1',
+        'password': 'user1',
+        'scope': '',
+        'client_id': '',
+        'client_secret': ''
+    }
+    #POST LOGIN REQUEST
+    response = requests.post(f"{base_url}/login", headers=headers, data=data)
+
+    # Assert that the response status code is 200 (OK)
+    assert response.status_code == 200
+
+    access_token = ''
+    if 'access_token' in response.json():
+        access_token = response.json()['access_token']
+
+    ###################### POST A BATCH OF ACTIONS ######################
+    headers_for_batch_post = {
+        'accept': 'application/json',
+        'Content-Type': 'application/json',
+        'Authorization': f'Bearer {access_token}'
+    }
+
+    batch = [
+        {
+            "command": "add",
+            "intent_type": "mitigation",
+            "threat": "ddos",
+            "mitigation_host": "19.190.13.181",
+            "action": {"name": "block_ip_addresses", "fields": {"blocked_ips": ["193.2.19.10"]}},
+            "intent_id": "batchB1"
+        },
+        {
+            "command": "add",
+            "intent_type": "mitigation",
+            "threat": "ddos",
+            "mitigation_host": "19.190.13.181",
+            "action": {"name": "block_ip_addresses", "fields": {"blocked_ips": ["193.2.19.10"]}},
+            "intent_id": "batchB2"
+        },
+        {
+            "command": "add",
+            "action": {"name": "unknown_action_name"},
+            "intent_id": "batchB3"
+        }
+    ]
+    #POST BATCH REQUEST
+    response_for_batch = requests.post(f"{base_url}/actions/batch", headers=headers_for_batch_post, json=batch)
+    pprint(response_for_batch.json())
+
+    # Assert that the batch was accepted and that every item has its own result
+    assert response_for_batch.status_code == 202
+    results = response_for_batch.json()['results']
+    assert [result['intent_id'] for result in results] == ["batchB1", "batchB2", "batchB3"]
+
+    # The two identical block actions share a single render, the unknown action is rejected with 404
+    assert results[0]['status_code'] == 202
+    assert results[1]['status_code'] == 202
+    assert results[2]['status_code'] == 404
+    assert response_for_batch.json()['distinct_renders'] == 1
@@ -0,0 +1,74 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from config_loader import ConfigError, ConfigWatcher, get_config_loader
+
+@pytest.fixture
+def loader(tmp_path):
+    loader = get_config_loader()
+    config_dir = loader.config_dir
+    for filename in os.listdir(config_dir):
+        if filename.endswith(".json"):
+            shutil.copy(config_dir / filename, tmp_path / filename)
+    loader.config_dir = tmp_path
+    loader.reload_configs()
+    yield loader
+    loader.config_dir = config_dir
+    loader.reload_configs()
+
+def test_failed_reload_keeps_the_previous_snapshot(loader):
+    snapshot = loader.get_snapshot()
+    (loader.config_dir / "mitigation_ansible_map.json").write_text('{"action_name_to_playbook": {', encoding="utf-8")
+
+    with pytest.raises(ConfigError):
+        loader.reload_configs()
+
+    assert loader.get_snapshot() is snapshot
+    assert loader.get_playbook_path("dns_rate_limit") == snapshot.mitigation_ansible_map["DNS_RATE_LIMIT"]
+    assert loader.get_stats()["last_error"]
+
+def test_watcher_swaps_in_a_new_snapshot_when_a_file_changes(loader):
+    version = loader.version
+    watcher = ConfigWatcher(loader, interval=0)
+    assert not watcher.check()
+
+    path = loader.config_dir / "mitigation_ansible_map.json"
+    config = json.loads(path.read_text(encoding="utf-8"))
+    config["action_name_to_playbook"]["DNS_RATE_LIMIT_V2"] = "dns_rate_limiting.yaml"
+    path.write_text(json.dumps(config), encoding="utf-8")
+    os.utime(path, (0, 0))
+
+    assert watcher.check()
+    assert loader.version == version + 1
+    assert loader.get_playbook_path("dns_rate_limit_v2") == "dns_rate_limiting.yaml"
+    # The new snapshot is immutable
+    with pytest.raises(TypeError):
+        loader.get_snapshot().mitigation_ansible_map["DNS_RATE_LIMIT"] = "other.yaml"
+
+def test_mappings_to_missing_playbooks_are_reported(loader):
+    path = loader.config_dir / "mitigation_ansible_map.json"
+    config = json.loads(path.read_text(encoding="utf-8"))
+    config["action_name_to_playbook"]["MISSING_PLAYBOOK"] = "ansible_playbooks/does_not_exist.yaml"
+    path.write_text(json.dumps(config), encoding="utf-8")
+
+    status = loader.reload_configs()
+
+    broken = {entry["playbook"]: entry for entry in loader.get_broken_mappings()}
+    assert broken["does_not_exist.yaml"]["actions"] == ["MISSING_PLAYBOOK"]
+    assert "does_not_exist.yaml" not in status["template_cache"]["compiled_templates"]
+    assert "dns_rate_limiting.yaml" in loader.get_snapshot().templates
+
+def test_live_variable_map_is_frozen(loader):
+    variable_map = loader.get_snapshot().variable_map
+    compiled = loader.get_playbook_resolver("dns_rate_limiting.yaml")
+
+    assert variable_map.frozen
+    assert loader.get_playbook_resolver("dns_rate_limiting.yaml") is compiled
+    # Compiling another playbook against the live map leaves the snapshot unchanged
+    variable_map.compile("not_mapped.yaml", ["undeclared_variable"])
+    assert "not_mapped.yaml" not in variable_map.get_unmapped_variables()
+    with pytest.raises(TypeError):
+        variable_map._playbooks["not_mapped.yaml"] = compiled
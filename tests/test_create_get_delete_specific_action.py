@@ -49,8 +49,8 @@ def test_login_and_get_all_actions():
     # POST REQUEST FOR NEW ACTION
     response_for_new_action = requests.post(f"{base_url}/actions", headers=headers_for_action_post, json=data)
     
-    # Assert that the response status code is 200 OR 201(OK)
-    assert response_for_new_action.status_code in [200,201]
+    # Assert that the response status code is 200, 201 OR 202 (accepted and queued for ePEM)
+    assert response_for_new_action.status_code in [200,201,202]
     print(f"Response fom new action creation {response_for_new_action.json()}")
 
     ###################### GET THE ACTION BASED ON ID ######################
@@ -98,8 +98,8 @@ def test_login_and_get_all_actions():
     #POST DELETE REQUEST WITH ACTION ID
     response_for_new_action = requests.post(f"{base_url}/actions", headers=headers_for_action_post, json=delete_data)
     
-    # Assert that the response status code is 200 OR 201(OK)
-    assert response_for_new_action.status_code in [200,201]
+    # Assert that the response status code is 200, 201 OR 202 (accepted and queued for ePEM)
+    assert response_for_new_action.status_code in [200,201,202]
     print(f"Response fom new action creation {response_for_new_action.json()}")
 
     #CHECK THE ACTION WAS CORRECTLY DELETED
@@ -0,0 +1,59 @@
+import asyncio
+
+from doc_registration import DocRegistrar, DocRegistrationError
+
+class FlakyEpem:
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise DocRegistrationError("Connection error when trying to configure ePEM")
+        return '{"ok": true}'
+
+async def wait_until(condition, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.005)
+
+def test_registration_is_retried_with_backoff_until_it_succeeds():
+    async def scenario():
+        epem = FlakyEpem(failures=3)
+        registrar = DocRegistrar(base_delay=0.001, max_delay=0.01, register=epem)
+        await registrar.start()
+        await wait_until(lambda: registrar.registered)
+        await registrar.stop()
+        return epem, registrar
+
+    epem, registrar = asyncio.run(scenario())
+    assert epem.calls == 4
+    assert registrar.get_stats()["failures"] == 3
+    assert registrar.get_stats()["last_error"] is None
+
+def test_backoff_is_jittered_and_bounded():
+    registrar = DocRegistrar(base_delay=1, max_delay=8, register=lambda: "")
+    delays = [registrar.backoff(retry) for retry in range(10) for _ in range(20)]
+    assert all(0 <= delay <= 8 for delay in delays)
+    assert len(set(delays)) > 1
+
+def test_rejected_rtr_requests_trigger_a_new_registration():
+    async def scenario():
+        epem = FlakyEpem(failures=0)
+        registrar = DocRegistrar(base_delay=0.001, register=epem)
+        await registrar.start()
+        await wait_until(lambda: registrar.registered)
+
+        registrar.on_dispatch_result("sent_to_epem", "Successfully sent to ePEM")
+        assert registrar.registered
+        registrar.on_dispatch_result("epem_rejected", "ePEM rejected request (400 Bad Request)")
+        await wait_until(lambda: registrar.registrations == 2)
+        await registrar.stop()
+        return epem, registrar
+
+    epem, registrar = asyncio.run(scenario())
+    assert epem.calls == 2
+    assert registrar.reregistrations == 1
+    assert registrar.last_trigger.startswith("ePEM answered epem_rejected")
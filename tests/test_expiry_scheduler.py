@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+from expiry_scheduler import ExpiryScheduler
+
+async def never_called(intent_id):
+    raise AssertionError(f"{intent_id} should not expire")
+
+def test_due_actions_are_popped_earliest_first():
+    scheduler = ExpiryScheduler(on_expire=never_called)
+    scheduler.schedule("late", 300.0)
+    scheduler.schedule("early", 100.0)
+    scheduler.schedule("middle", 200.0)
+
+    assert scheduler.next_expiry() == 100.0
+    assert scheduler.pop_due(now=250.0) == ["early", "middle"]
+    assert scheduler.pop_due(now=250.0) == []
+    assert scheduler.get_stats()["pending"] == 1
+
+def test_rescheduled_and_cancelled_actions_skip_stale_entries():
+    scheduler = ExpiryScheduler(on_expire=never_called)
+    scheduler.schedule("moved", 100.0)
+    scheduler.schedule("moved", 400.0)
+    scheduler.schedule("cancelled", 150.0)
+
+    assert scheduler.cancel("cancelled")
+    assert not scheduler.cancel("cancelled")
+    assert scheduler.next_expiry() == 400.0
+    assert scheduler.pop_due(now=300.0) == []
+    assert scheduler.pop_due(now=400.0) == ["moved"]
+
+def test_restore_only_tracks_scheduled_actions():
+    scheduler = ExpiryScheduler(on_expire=never_called)
+    restored = scheduler.restore([
+        {"intent_id": "a", "expiry_status": "scheduled", "expires_at": 100.0},
+        {"intent_id": "b", "expiry_status": "rolled_back", "expires_at": 50.0},
+        {"intent_id": "c", "status": "sent_to_epem"},
+    ])
+
+    assert restored == 1
+    assert scheduler.pop_due(now=1000.0) == ["a"]
+
+def test_expired_actions_are_handed_to_the_callback():
+    expired = []
+
+    async def on_expire(intent_id):
+        expired.append(intent_id)
+
+    async def scenario():
+        scheduler = ExpiryScheduler(on_expire=on_expire)
+        await scheduler.start()
+        scheduler.schedule("later", time.time() + 60)
+        # An earlier expiry wakes the sleeping task
+        scheduler.schedule("soon", time.time() + 0.05)
+        deadline = time.time() + 2
+        while not expired and time.time() < deadline:
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert expired == ["soon"]
+    assert scheduler.get_stats()["pending"] == 1
+    assert scheduler.get_stats()["expired"] == 1
+
+def test_failed_expiries_are_retried_with_backoff():
+    attempts = []
+
+    async def on_expire(intent_id):
+        attempts.append(time.time())
+        if len(attempts) < 3:
+            raise RuntimeError("dispatch queue is full")
+
+    async def scenario():
+        scheduler = ExpiryScheduler(on_expire=on_expire, retry_delay=0.05, max_retry_delay=1)
+        await scheduler.start()
+        scheduler.schedule("flaky", time.time())
+        deadline = time.time() + 2
+        while len(attempts) < 3 and time.time() < deadline:
+            await asyncio.sleep(0.01)
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = asyncio.run(scenario())
+    assert len(attempts) == 3
+    # The second retry waits twice as long as the first
+    assert attempts[1] - attempts[0] >= 0.05
+    assert attempts[2] - attempts[1] >= 0.1
+    assert scheduler.get_stats()["retried"] == 2
+    assert scheduler.get_stats()["pending"] == 0
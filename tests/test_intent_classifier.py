@@ -0,0 +1,55 @@
+import json
+from pathlib import Path
+
+from intent_classifier import IntentClassifier
+from config_loader import get_intent_classifier
+from mitigation_action_class import mitigation_action_model
+from mitigation_regex_control import classify_free_text_actions, playbook_creator
+
+def test_free_text_actions_are_classified():
+    classifier = get_intent_classifier()
+
+    result = classifier.classify("Set the number of request to the dns server to a 5/s for port 55, protocol udp")
+    assert (result.action_type, result.playbook) == ("DNS_RATE_LIMIT", "dns_rate_limiting.yaml")
+    assert "<rate>" in result.matched_terms
+    assert 0 < result.confidence <= 1
+
+    result = classifier.classify("Hand over the DNS service to the backup server")
+    assert (result.action_type, result.playbook) == ("DNS_HANDOVER", "dns_server_handover.yaml")
+
+    result = classifier.classify("Restart the web application")
+    assert result.action_type == "UNKNOWN_ACTION_TYPE" and result.playbook is None
+
+def test_ties_go_to_the_class_listed_first():
+    classifier = IntentClassifier({
+        "intent_classes": [
+            {"action_type": "FIRST", "playbook": "first.yaml", "keywords": {"dns": 1.0}},
+            {"action_type": "SECOND", "playbook": "second.yaml", "keywords": {"dns": 1.0}, "phrases": {"shut down": 2.0}},
+        ]
+    })
+    assert classifier.classify("dns").action_type == "FIRST"
+    assert classifier.classify("dns").confidence == 0.5
+    assert classifier.classify("Shut down dns").action_type == "SECOND"
+
+def load_corpus():
+    corpus_path = Path(__file__).parent.parent / "benchmarks" / "intent_corpus.jsonl"
+    with open(corpus_path, 'r', encoding='utf-8') as f:
+        return [json.loads(line)["action"] for line in f if line.strip()]
+
+def test_batch_classification_matches_single_path():
+    classifier = get_intent_classifier()
+    texts = load_corpus()
+    # Repeated texts are scored once and must still come back in order
+    texts = texts + texts[:5]
+
+    for text, batch_result in zip(texts, classifier.classify_batch(texts)):
+        single_result = classifier.classify(text)
+        assert batch_result.to_dict() == single_result.to_dict(), text
+
+def test_batch_variables_match_playbook_creator():
+    texts = load_corpus()
+    for text, (action_type, playbook, variables) in zip(texts, classify_free_text_actions(texts)):
+        creator = playbook_creator(mitigation_action_model(intent_id="regression", action=text))
+        assert (action_type, playbook) == (creator.action_type, creator.chosen_playbook), text
+        if variables:
+            assert variables == creator.resolve_playbook_variables(), text
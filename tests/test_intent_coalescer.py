@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from action_store import ActionStore
+from intent_coalescer import IntentCoalescer, merge_action_fields, mergeable_fields, parse_rate
+from mitigation_action_class import mitigation_action_model
+from mitigation_regex_control import playbook_creator
+
+
+class FakeDispatcher:
+    queue_size = 10
+
+    def __init__(self):
+        self.jobs = []
+
+    def has_capacity(self):
+        return True
+
+    def submit(self, intent_id, playbook, coalesced_intent_ids=()):
+        self.jobs.append((intent_id, playbook, list(coalesced_intent_ids)))
+        return len(self.jobs)
+
+
+def test_ip_lists_are_united_and_the_longest_duration_kept():
+    merged = merge_action_fields([
+        {"blocked_ips": ["10.0.0.1"], "duration": "5m"},
+        {"blocked_ips": ["10.0.0.2", "10.0.0.1"], "duration": 120},
+        {"blocked_ips": "10.0.0.3", "duration": None},
+    ])
+    assert merged == {"blocked_ips": ["10.0.0.1", "10.0.0.2", "10.0.0.3"], "duration": "5m"}
+
+
+@pytest.mark.parametrize("rates, strictest", [
+    (["20/s", "5/s"], "5/s"),
+    (["10r/s", "5r/s"], "5r/s"),
+    ([5, "10/s"], 5),
+    (["100 per minute", "2/s"], "100 per minute"),
+    (["30", 4.5, "600/min"], 4.5),
+])
+def test_the_strictest_rate_is_kept_whatever_its_format(rates, strictest):
+    assert merge_action_fields([{"rate": rate} for rate in rates]) == {"rate": strictest}
+
+
+def test_rates_that_do_not_parse_are_not_merged():
+    assert parse_rate("5/fortnight") is None
+    assert not mergeable_fields({"rate": "fast"})
+    assert mergeable_fields({"rate": "5/s", "duration": "60s"})
+    with pytest.raises(ValueError):
+        merge_action_fields([{"rate": "5/s"}, {"rate": "fast"}])
+
+
+def block_ip_action(intent_id, ip, **fields):
+    return mitigation_action_model(
+        intent_id=intent_id,
+        action={"name": "block_ip_addresses", "fields": dict(fields, blocked_ips=[ip])},
+        mitigation_host="172.16.2.1",
+    )
+
+
+def test_flushed_group_is_dispatched_once_for_every_intent():
+    store = ActionStore(collection=None)
+    store.mongo_available = False
+    dispatcher = FakeDispatcher()
+    coalescer = IntentCoalescer(dispatcher, store, window=60, actions="BLOCK_IP_ADDRESSES")
+    actions = [block_ip_action("c1", "10.0.0.1"), block_ip_action("c2", "10.0.0.2"),
+               block_ip_action("c3", "10.0.0.3", rate="fast")]
+    for action in actions:
+        store.add(action.intent_id, {"intent_id": action.intent_id, "status": "queued"})
+
+    async def scenario():
+        # A member whose rate cannot be compared is not held for coalescing
+        held = [coalescer.submit(playbook_creator(action)) for action in actions]
+        await coalescer.flush_all()
+        return held
+
+    assert asyncio.run(scenario()) == [True, True, False]
+
+    [(primary_id, merged, member_ids)] = dispatcher.jobs
+    assert (primary_id, member_ids) == ("c1", ["c2"])
+    assert merged.mitigation_action.action["fields"]["blocked_ips"] == ["10.0.0.1", "10.0.0.2"]
+    assert store.get("c1")["coalesced_intent_ids"] == ["c2"]
+    assert store.get("c2")["coalesced_into"] == "c1"
+    assert store.get("c2")["ansible_command"] == merged.rendered_playbook
+    assert coalescer.get_stats()["intents_merged"] == 1
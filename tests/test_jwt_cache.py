@@ -0,0 +1,44 @@
+import pytest
+
+import jwttoken
+from jwttoken import create_access_token, rotate_secret_key, verified_tokens, verify_token
+
+class InvalidCredentials(Exception):
+    pass
+
+@pytest.fixture(autouse=True)
+def signing_key():
+    secret_key, algorithm = jwttoken.SECRET_KEY, jwttoken.ALGORITHM
+    rotate_secret_key("test-secret", "HS256")
+    yield
+    rotate_secret_key(secret_key, algorithm)
+
+def test_verified_token_is_decoded_once():
+    token = create_access_token({"sub": "ibi"})
+    misses = verified_tokens.misses
+
+    first = verify_token(token, InvalidCredentials())
+    second = verify_token(token, InvalidCredentials())
+
+    assert first.username == second.username == "ibi"
+    assert verified_tokens.misses == misses + 1
+    assert verified_tokens.hits >= 1
+
+def test_secret_rotation_invalidates_cached_tokens():
+    token = create_access_token({"sub": "ibi"})
+    verify_token(token, InvalidCredentials())
+
+    rotate_secret_key("rotated-secret")
+
+    with pytest.raises(InvalidCredentials):
+        verify_token(token, InvalidCredentials())
+
+def test_expired_entries_are_not_served():
+    token = create_access_token({"sub": "ibi"})
+    token_hash = verified_tokens.token_hash(token)
+    verify_token(token, InvalidCredentials())
+
+    token_data, _ = verified_tokens._entries[token_hash]
+    verified_tokens._entries[token_hash] = (token_data, 0)
+
+    assert verified_tokens.get(token_hash) is None
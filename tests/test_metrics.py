@@ -0,0 +1,36 @@
+from prometheus_client import CollectorRegistry, generate_latest
+
+from metrics import StatsCollector, VALIDATION_SECONDS
+from mitigation_action_class import INTERNAL_CONTEXT, mitigation_action_model
+
+def test_stats_are_exposed_at_scrape_time():
+    store = {"cached_actions": 3, "pending_writes": 1}
+    registry = CollectorRegistry()
+    registry.register(StatsCollector(
+        store=lambda: store,
+        dispatcher=lambda: {"queue_depth": 2, "in_flight": 1},
+        expiry=lambda: {"pending": 4},
+        caches={"renders": lambda: {"hits": 3, "misses": 1, "hit_ratio": 0.75}},
+    ))
+    store["cached_actions"] = 5
+
+    assert registry.get_sample_value("rtr_store_actions") == 5
+    assert registry.get_sample_value("rtr_expiry_pending") == 4
+    assert registry.get_sample_value("rtr_cache_hits_total", {"cache": "renders"}) == 3
+    assert registry.get_sample_value("rtr_cache_hit_ratio", {"cache": "renders"}) == 0.75
+    assert b"rtr_dispatch_queue_depth 2.0" in generate_latest(registry)
+
+def validations():
+    return sum(sample.value for metric in VALIDATION_SECONDS.collect() for sample in metric.samples
+               if sample.name.endswith("_count"))
+
+def test_action_validation_is_timed():
+    before = validations()
+    mitigation_action_model(intent_id="metrics", action={"name": "block_ip_addresses", "fields": {}})
+    assert validations() == before + 1
+
+def test_internal_actions_are_not_timed():
+    before = validations()
+    mitigation_action_model.model_validate({"intent_id": "metrics", "action": "block ip 10.0.0.1"},
+                                           context=INTERNAL_CONTEXT)
+    assert validations() == before
@@ -0,0 +1,32 @@
+import asyncio
+
+from hashing import LoginCapacityExceeded, PasswordHasher
+
+def test_passwords_are_hashed_and_verified_in_the_process_pool():
+    async def scenario():
+        hasher = PasswordHasher(workers=1)
+        await hasher.start()
+        try:
+            hashed = await hasher.hash("s3cret")
+            return hashed, await hasher.verify(hashed, "s3cret"), await hasher.verify(hashed, "wrong")
+        finally:
+            await hasher.stop()
+
+    hashed, right, wrong = asyncio.run(scenario())
+    assert hashed.startswith("$2b$")
+    assert right and not wrong
+
+def test_logins_beyond_the_concurrency_limit_are_rejected():
+    async def scenario():
+        hasher = PasswordHasher(workers=1, concurrency=1)
+        await hasher.start()
+        try:
+            return await asyncio.gather(hasher.hash("a"), hasher.hash("b"), return_exceptions=True), hasher
+        finally:
+            await hasher.stop()
+
+    results, hasher = asyncio.run(scenario())
+    assert sum(isinstance(result, LoginCapacityExceeded) for result in results) == 1
+    assert hasher.get_stats()["rejected"] == 1
+    # The slot of the admitted login is released
+    assert hasher._semaphore._value == 1
@@ -0,0 +1,72 @@
+import io
+import json
+import logging
+
+import pytest
+
+from structured_logging import (IntentContextFilter, JsonFormatter, ROOT_LOGGER, get_log_level, get_logger,
+                                intent_context, set_log_level)
+
+
+def capture(name):
+    """Attach a JSON handler writing synchronously to a buffer"""
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(IntentContextFilter())
+    logger = get_logger(name)
+    logger.addHandler(handler)
+    return logger, handler, stream
+
+
+def lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+@pytest.fixture(autouse=True)
+def restore_levels():
+    root = logging.getLogger(ROOT_LOGGER)
+    level = root.level
+    yield
+    root.setLevel(level)
+    get_logger("test").setLevel(logging.NOTSET)
+
+
+def test_records_are_json_with_the_intent_of_the_context():
+    logger, handler, stream = capture("test")
+    set_log_level("INFO")
+    try:
+        with intent_context("30001"):
+            logger.info("Posted %s", "intent", extra={"status_code": 200})
+        logger.info("Outside any intent")
+    finally:
+        logger.removeHandler(handler)
+
+    first, second = lines(stream)
+    assert first["message"] == "Posted intent"
+    assert first["intent_id"] == "30001"
+    assert first["level"] == "INFO"
+    assert first["logger"] == "rtr.test"
+    assert first["status_code"] == 200
+    assert second["intent_id"] is None
+
+
+def test_debug_records_are_dropped_until_the_level_is_lowered():
+    logger, handler, stream = capture("test")
+    set_log_level("INFO")
+    try:
+        logger.debug("playbook body")
+        assert stream.getvalue() == ""
+        assert set_log_level("debug", "test") == "DEBUG"
+        logger.debug("playbook body")
+    finally:
+        logger.removeHandler(handler)
+
+    assert [line["message"] for line in lines(stream)] == ["playbook body"]
+    assert get_log_level() == "INFO"
+    assert get_log_level("test") == "DEBUG"
+
+
+def test_unknown_levels_are_rejected():
+    with pytest.raises(ValueError):
+        set_log_level("VERBOSE")
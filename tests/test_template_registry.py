@@ -0,0 +1,70 @@
+import time
+
+import pytest
+from jinja2 import TemplateNotFound
+
+from config_loader import get_config_loader
+from template_registry import RenderCache, get_template_registry
+
+def test_renders_use_the_templates_of_the_live_snapshot():
+    snapshot = get_config_loader().get_snapshot()
+    registry = get_template_registry()
+
+    first = registry.get("dns_rate_limiting.yaml")
+    second = registry.get("dns_rate_limiting.yaml")
+
+    # Lookups return the template compiled with the snapshot
+    assert first is second is snapshot.templates["dns_rate_limiting.yaml"]
+
+    # The variable manifest lists each placeholder once, in order of appearance
+    assert first.variables == ["mitigation_host", "protocol", "port", "requests_per_sec"]
+
+def test_playbooks_are_never_compiled_on_the_request_path():
+    snapshot = get_config_loader().get_snapshot()
+    registry = get_template_registry()
+    registry.install({"dns_rate_limiting.yaml": snapshot.templates["dns_rate_limiting.yaml"]})
+    try:
+        # A playbook missing from the installed templates is not read from disk
+        with pytest.raises(TemplateNotFound):
+            registry.render("block_pod_address.yaml", {})
+        assert registry.get_stats()["cached_templates"] == ["dns_rate_limiting.yaml"]
+    finally:
+        registry.install(snapshot.templates)
+
+def test_identical_renders_are_served_from_the_render_cache():
+    get_config_loader()
+    registry = get_template_registry()
+    registry.clear()
+    variables = {"mitigation_host": "10.0.0.53", "protocol": "udp", "port": "53", "requests_per_sec": "5/second"}
+
+    first = registry.render("dns_rate_limiting.yaml", variables)
+    hits = registry.renders.hits
+    # Same variables in another order: same canonical key
+    second = registry.render("dns_rate_limiting.yaml", dict(reversed(list(variables.items()))))
+
+    assert second == first
+    assert registry.renders.hits == hits + 1
+    assert registry.render("dns_rate_limiting.yaml", dict(variables, port="5353")) != first
+    assert registry.get_stats()["render_cache"]["memory_bytes"] > 0
+
+    registry.clear()
+    assert registry.renders.get_stats()["entries"] == 0
+
+def test_render_cache_evicts_least_recently_used_and_expired_entries():
+    cache = RenderCache(max_entries=2, ttl=0)
+    template = object()
+    cache.put(("a.yaml", "1"), template, "a")
+    cache.put(("b.yaml", "1"), template, "b")
+    assert cache.get(("a.yaml", "1"), template) == "a"
+    cache.put(("c.yaml", "1"), template, "c")
+
+    assert cache.get(("b.yaml", "1"), template) is None
+    assert cache.evictions == 1
+    # A render is never reused with another compiled template
+    assert cache.get(("a.yaml", "1"), object()) is None
+
+    expiring = RenderCache(max_entries=2, ttl=0.01)
+    expiring.put(("a.yaml", "1"), template, "a")
+    time.sleep(0.02)
+    assert expiring.get(("a.yaml", "1"), template) is None
+    assert expiring.expirations == 1
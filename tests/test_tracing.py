@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from tracing import FileSpanExporter, SpanContext, Tracer, current_traceparent, to_otlp, with_traceparent
+
+TRACEPARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+def test_traceparent_round_trip():
+    context = SpanContext.from_traceparent(TRACEPARENT)
+    assert context.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert context.span_id == "00f067aa0ba902b7"
+    assert context.sampled
+    assert context.traceparent == TRACEPARENT
+
+
+@pytest.mark.parametrize("value", [None, "", "garbage", "01-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01",
+                                   "00-00000000000000000000000000000000-00f067aa0ba902b7-01"])
+def test_malformed_traceparents_are_ignored(value):
+    assert SpanContext.from_traceparent(value) is None
+
+
+def test_nested_spans_join_the_remote_trace():
+    tracer = Tracer()
+    with tracer.span("POST /actions", parent=SpanContext.from_traceparent(TRACEPARENT)) as request:
+        with tracer.span("classification", intent_id="30001") as classification:
+            assert current_traceparent() == classification.traceparent
+    assert current_traceparent() is None
+
+    assert request.context.trace_id == classification.context.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert request.parent_id == "00f067aa0ba902b7"
+    assert classification.parent_id == request.context.span_id
+    assert classification.attributes == {"intent_id": "30001"}
+
+
+def test_failed_spans_record_the_error():
+    tracer = Tracer()
+    with pytest.raises(ValueError):
+        with tracer.span("render") as span:
+            raise ValueError("missing variable")
+    assert span.error == "ValueError: missing variable"
+    assert span.end_time is not None
+
+
+def test_callback_url_carries_the_current_traceparent():
+    url = "http://rtr:8000/update_action_status?token=abc"
+    assert with_traceparent(url) == url
+    with Tracer().span("POST /actions") as span:
+        joined = with_traceparent(url)
+    assert joined == f"{url}&traceparent={span.traceparent}"
+    # An older traceparent is replaced, not duplicated
+    assert with_traceparent(joined, TRACEPARENT).count("traceparent=") == 1
+
+
+def test_finished_spans_are_exported_in_the_background(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(FileSpanExporter(str(path)), flush_interval=0.01)
+    with tracer.span("dispatch", intent_id="30001"):
+        with tracer.span("epem_post"):
+            pass
+    tracer.shutdown()
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["epem_post", "dispatch"]
+    assert spans[0]["parent_span_id"] == spans[1]["span_id"]
+    assert spans[1]["attributes"] == {"intent_id": "30001"}
+    assert tracer.get_stats()["exported"] == 2
+
+
+def test_otlp_encoding():
+    tracer = Tracer()
+    with tracer.span("epem_post", intent_id="30001", **{"http.status_code": 500}) as span:
+        span.set_error("ePEM answered 500")
+    encoded = to_otlp([span], "rtr")["resourceSpans"][0]
+    otlp_span = encoded["scopeSpans"][0]["spans"][0]
+    assert encoded["resource"]["attributes"][0]["value"] == {"stringValue": "rtr"}
+    assert otlp_span["traceId"] == span.context.trace_id
+    assert otlp_span["parentSpanId"] == ""
+    assert {"key": "http.status_code", "value": {"intValue": "500"}} in otlp_span["attributes"]
+    assert otlp_span["status"] == {"code": 2, "message": "ePEM answered 500"}
@@ -0,0 +1,72 @@
+from mitigation_action_class import mitigation_action_model
+from variable_resolver import VariableMap, to_stored_values
+
+TABLE = {
+    "variables": {
+        "ipv4_and_subnet": {
+            "sources": [{"field": "ip_range"}, {"field": "blocked_ips"}, {"entity": "ipv4_and_subnet"}],
+            "type": "str",
+            "set": True,
+            "default": "0.0.0.0/32"
+        },
+        "blocked_ips": {"sources": [{"field": "blocked_ips"}], "type": "list", "set": True, "default": []},
+        "limit": {"sources": [{"field": "limit"}], "type": "str", "format": "{}r/s", "default": "1r/s"},
+        "item": {"ansible": True}
+    }
+}
+
+def blocking_action(fields):
+    return mitigation_action_model(
+        intent_id="resolver",
+        action={"name": "block_ip_addresses", "fields": fields},
+    )
+
+def test_first_non_empty_source_wins():
+    resolver = VariableMap(TABLE).compile("block.yaml", ["ipv4_and_subnet", "blocked_ips"])
+    variables = resolver.resolve(blocking_action({"blocked_ips": ["10.0.0.1", "10.0.0.2"]}))
+    assert variables["ipv4_and_subnet"] == "10.0.0.1,10.0.0.2"
+    assert str(variables["blocked_ips"]) == "{{ ['10.0.0.1', '10.0.0.2'] }}"
+
+def test_defaults_format_and_ansible_variables():
+    resolver = VariableMap(TABLE).compile("limit.yaml", ["limit", "item", "blocked_ips | join(',')"])
+    assert resolver.resolve(blocking_action({"limit": 5}))["limit"] == "5r/s"
+    variables = resolver.resolve(None)
+    assert variables["limit"] == "1r/s"
+    assert variables["blocked_ips"] == []
+    assert str(variables["item"]) == "{{item}}"
+    assert str(variables["item"].stdout) == "{{item.stdout}}"
+
+def test_unmapped_variables_are_reported():
+    variable_map = VariableMap(TABLE)
+    resolver = variable_map.compile("custom.yaml", ["limit", "custom_timeout"])
+    assert resolver.resolve(None)["custom_timeout"] == "UNKNOWN_VALUE"
+    assert variable_map.get_unmapped_variables() == {"custom.yaml": ["custom_timeout"]}
+
+def test_stored_values_are_restored_with_their_types():
+    resolver = VariableMap(TABLE).compile("block.yaml", ["blocked_ips", "limit", "item"])
+    stored = to_stored_values(resolver.resolve(blocking_action({"blocked_ips": ["10.0.0.1"], "limit": 5})))
+    assert stored == {"blocked_ips": ["10.0.0.1"], "limit": "5r/s"}
+    restored = resolver.restore(stored)
+    assert str(restored["blocked_ips"]) == "{{ ['10.0.0.1'] }}"
+    assert str(restored["item"]) == "{{item}}"
+
+def test_set_changes_are_incremental():
+    resolver = VariableMap(TABLE).compile("block.yaml", ["ipv4_and_subnet", "blocked_ips"])
+    old = resolver.resolve(blocking_action({"blocked_ips": ["10.0.0.1", "10.0.0.2"]}))
+    new = resolver.resolve(blocking_action({"blocked_ips": ["10.0.0.2", "10.0.0.3"]}))
+    delta = resolver.diff(resolver.restore(to_stored_values(old)), new)
+    assert delta.incremental
+    assert delta.changed == ("ipv4_and_subnet", "blocked_ips")
+    assert (delta.added, delta.removed) == (("10.0.0.3",), ("10.0.0.1",))
+    added = resolver.with_items(new, delta.changed, delta.added)
+    assert added["ipv4_and_subnet"] == "10.0.0.3"
+    assert added["blocked_ips"] == ["10.0.0.3"]
+
+def test_reordered_sets_are_unchanged_and_scalar_changes_are_not_incremental():
+    resolver = VariableMap(TABLE).compile("block.yaml", ["blocked_ips", "limit"])
+    old = resolver.resolve(blocking_action({"blocked_ips": ["10.0.0.1", "10.0.0.2"], "limit": 5}))
+    reordered = resolver.resolve(blocking_action({"blocked_ips": ["10.0.0.2", "10.0.0.1"], "limit": 5}))
+    assert resolver.diff(old, reordered).changed == ()
+    delta = resolver.diff(old, resolver.resolve(blocking_action({"blocked_ips": ["10.0.0.3"], "limit": 10})))
+    assert delta.changed == ("blocked_ips", "limit")
+    assert not delta.incremental
@@ -0,0 +1,387 @@
+"""
+Lightweight tracing for RTR
+Spans follow the W3C Trace Context model: an intent's trace starts when it
+is received, or joins the traceparent sent by the caller, and is carried to
+ePEM in the traceparent header and back in the callback_url, so the status
+callback lands in the same trace. Finished spans are queued and exported by
+a background thread, as JSON lines to a file or as OTLP/JSON to a collector,
+so request handlers and dispatch workers never wait on the exporter.
+"""
+import contextvars
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from structured_logging import get_logger
+
+logger = get_logger("tracing")
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+
+class SpanContext:
+    """
+    Identifies a span, possibly one of another service, as carried by a traceparent
+    """
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool = True):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    @property
+    def traceparent(self) -> str:
+        """The W3C traceparent value, e.g. 00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @classmethod
+    def from_traceparent(cls, value: Optional[str]) -> Optional["SpanContext"]:
+        """
+        Parse a traceparent header or query value
+
+        Returns:
+            Optional[SpanContext]: None if the value is missing or malformed
+        """
+        if not value:
+            return None
+        match = _TRACEPARENT.match(value.strip().lower())
+        if match is None:
+            return None
+        trace_id, span_id, flags = match.groups()
+        if trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+            return None
+        return cls(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+class Span:
+    """
+    A timed operation of an intent, e.g. its classification or the ePEM POST
+    """
+    __slots__ = ("name", "context", "parent_id", "attributes", "start_time", "end_time", "error", "_started")
+
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, object]] = None):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+        self.error: Optional[str] = None
+        self._started = time.perf_counter()
+
+    @property
+    def traceparent(self) -> str:
+        return self.context.traceparent
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_error(self, message: str):
+        """Mark the span as failed"""
+        self.error = message
+
+    def finish(self):
+        # Wall clock for the timestamps, monotonic clock for the duration
+        self.end_time = self.start_time + (time.perf_counter() - self._started)
+
+    @property
+    def duration_ms(self) -> float:
+        end_time = self.end_time if self.end_time is not None else time.time()
+        return round((end_time - self.start_time) * 1000, 3)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": self.duration_ms,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+def _otlp_value(value) -> Dict[str, object]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, str):
+        return {"stringValue": value}
+    return {"stringValue": json.dumps(value, default=str)}
+
+
+def to_otlp(spans: List[Span], service_name: str) -> Dict[str, object]:
+    """Encode spans as an OTLP/JSON ExportTraceServiceRequest"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": "rtr"},
+                "spans": [{
+                    "traceId": span.context.trace_id,
+                    "spanId": span.context.span_id,
+                    "parentSpanId": span.parent_id or "",
+                    "name": span.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(int(span.start_time * 1e9)),
+                    "endTimeUnixNano": str(int(span.end_time * 1e9)),
+                    "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                    "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+                } for span in spans],
+            }],
+        }]
+    }
+
+
+class FileSpanExporter:
+    """Append finished spans to a file, one JSON object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+class OtlpSpanExporter:
+    """Post finished spans to an OTLP/HTTP collector using the JSON encoding"""
+
+    def __init__(self, endpoint: str, service_name: str = "rtr", timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def export(self, spans: List[Span]):
+        response = self.session.post(self.endpoint, json=to_otlp(spans, self.service_name), timeout=self.timeout)
+        response.raise_for_status()
+
+
+# The span the current request, task or dispatch job runs in
+current_span_var: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    Creates spans and hands the finished ones to a bounded queue drained by an exporter thread.
+    Without an exporter spans are still created, so trace context is propagated, but not kept.
+    """
+
+    def __init__(self, exporter=None, queue_size: Optional[int] = None, batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        """
+        Args:
+            exporter: Object with an export(spans) method; None to only propagate trace context
+            queue_size: Maximum finished spans waiting for export (TRACE_QUEUE_SIZE, default 10000)
+            batch_size: Maximum spans per export (TRACE_BATCH_SIZE, default 256)
+            flush_interval: Seconds between exports of a partial batch (TRACE_FLUSH_INTERVAL, default 1)
+        """
+        self.exporter = exporter
+        self.queue_size = queue_size or int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+        self.batch_size = batch_size or int(os.getenv("TRACE_BATCH_SIZE", "256"))
+        self.flush_interval = flush_interval or float(os.getenv("TRACE_FLUSH_INTERVAL", "1"))
+        self._queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self.started = 0
+        self.exported = 0
+        self.dropped = 0
+        self.export_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(self, name: str, parent: Union[Span, SpanContext, None] = None, **attributes) -> Span:
+        """
+        Start a span, the child of parent or of the current span; a new trace if there is neither
+
+        Args:
+            name: Operation name, e.g. "classification"
+            parent: A local span, or the SpanContext of a remote caller
+            **attributes: Span attributes such as intent_id
+        """
+        if parent is None:
+            parent = current_span_var.get()
+        parent_context = parent.context if isinstance(parent, Span) else parent
+        if parent_context is None:
+            context = SpanContext(secrets.token_hex(16), secrets.token_hex(8))
+            parent_id = None
+        else:
+            context = SpanContext(parent_context.trace_id, secrets.token_hex(8), parent_context.sampled)
+            parent_id = parent_context.span_id
+        self.started += 1
+        return Span(name, context, parent_id, attributes)
+
+    def end_span(self, span: Span):
+        """Finish a span and queue it for export, dropping it if the queue is full"""
+        span.finish()
+        if self.exporter is None or not span.context.sampled:
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    @contextmanager
+    def span(self, name: str, parent: Union[Span, SpanContext, None] = None, **attributes):
+        """Run the block in a new span, made current so nested spans and outgoing requests join it"""
+        span = self.start_span(name, parent, **attributes)
+        token = current_span_var.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            current_span_var.reset(token)
+            self.end_span(span)
+
+    def _ensure_worker(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch: List[Optional[Span]] = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is None
+            spans = [span for span in batch if span is not None]
+            if spans:
+                try:
+                    self.exporter.export(spans)
+                    self.exported += len(spans)
+                except Exception as e:
+                    self.export_errors += 1
+                    self.dropped += len(spans)
+                    logger.warning("Could not export %d spans: %s", len(spans), e)
+            if stopping:
+                return
+
+    def shutdown(self, timeout: float = 5.0):
+        """Export the queued spans and stop the exporter thread; it restarts with the next span"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+
+    def get_stats(self) -> Dict[str, object]:
+        """Get span and export counters for monitoring"""
+        return {
+            "exporter": type(self.exporter).__name__ if self.exporter else None,
+            "started": self.started,
+            "queued": self._queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "export_errors": self.export_errors,
+        }
+
+
+def create_exporter():
+    """
+    Build the exporter selected by TRACE_EXPORTER: file (TRACE_FILE, default traces.jsonl),
+    otlp (OTLP_TRACES_ENDPOINT, default http://localhost:4318/v1/traces) or none (default)
+    """
+    kind = os.getenv("TRACE_EXPORTER", "none").lower()
+    if kind == "file":
+        return FileSpanExporter(os.getenv("TRACE_FILE", "traces.jsonl"))
+    if kind == "otlp":
+        return OtlpSpanExporter(os.getenv("OTLP_TRACES_ENDPOINT", "http://localhost:4318/v1/traces"),
+                                os.getenv("TRACE_SERVICE_NAME", "rtr"))
+    if kind != "none":
+        logger.warning("Unknown TRACE_EXPORTER '%s', spans will not be exported", kind)
+    return None
+
+
+_tracer_instance: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """
+    Get the global Tracer, exporting as configured by TRACE_EXPORTER
+
+    Returns:
+        Tracer: The singleton tracer instance
+    """
+    global _tracer_instance
+    if _tracer_instance is None:
+        with _tracer_lock:
+            if _tracer_instance is None:
+                _tracer_instance = Tracer(create_exporter())
+    return _tracer_instance
+
+
+def current_traceparent() -> Optional[str]:
+    """The traceparent of the current span, or None outside any span"""
+    span = current_span_var.get()
+    return span.traceparent if span is not None else None
+
+
+def set_span_attributes(**attributes):
+    """Add attributes to the current span, if any"""
+    span = current_span_var.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+def inject_traceparent(headers: Dict[str, str]) -> Dict[str, str]:
+    """Add the traceparent of the current span to outgoing request headers"""
+    traceparent = current_traceparent()
+    if traceparent:
+        headers["traceparent"] = traceparent
+    return headers
+
+
+def with_traceparent(url: str, traceparent: Optional[str] = None) -> str:
+    """
+    Add a traceparent query parameter to a URL, replacing any existing one
+
+    Args:
+        url: e.g. the callback_url given to ePEM
+        traceparent: Defaults to the one of the current span; the URL is returned unchanged without one
+    """
+    traceparent = traceparent or current_traceparent()
+    if not traceparent:
+        return url
+    parts = urlsplit(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != "traceparent"]
+    query.append(("traceparent", traceparent))
+    return urlunsplit(parts._replace(query=urlencode(query)))
@@ -0,0 +1,364 @@
+"""
+Declarative playbook variable resolution for RTR
+Each template variable is described in RTR_configurations/playbook_variables.json
+by an ordered list of value sources, a type and a default. The table is
+compiled once into per-playbook resolvers, so rendering a playbook only runs
+the resolvers of its own variables.
+"""
+import re
+from types import MappingProxyType
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Name of the variable an expression such as "domains | join(', ')" or "reset_result.status" reads
+VARIABLE_NAME_PATTERN = re.compile(r'[A-Za-z_]\w*')
+
+# Numbers (or digit strings) are the only values a 'format' is applied to
+NUMERIC_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+
+
+class AnsibleList(list):
+    """
+    A list value that renders as an Ansible list expression, e.g. {{ ['10.0.0.1'] }},
+    so loops in the playbook receive a real list; Jinja filters still see a plain list
+    """
+
+    def __str__(self):
+        return "{{ %r }}" % [str(item) for item in self]
+
+
+class AnsibleVariable:
+    """
+    A variable resolved by Ansible at run time (e.g. a loop 'item'), rendered back unchanged
+    """
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __getattr__(self, attribute: str) -> "AnsibleVariable":
+        return AnsibleVariable(f"{self.name}.{attribute}")
+
+    def __str__(self):
+        return "{{" + self.name + "}}"
+
+
+def _is_empty(value) -> bool:
+    return value is None or value == "" or (isinstance(value, (list, tuple)) and not value)
+
+
+def _read_attr(mitigation_action, path: List[str]):
+    value = mitigation_action
+    for part in path:
+        if value is None:
+            return None
+        value = value.get(part) if isinstance(value, dict) else getattr(value, part, None)
+    return value
+
+
+def _compile_source(source: dict) -> Tuple[str, object]:
+    """Validate one value source, returning its (kind, key)"""
+    if "attr" in source:
+        return "attr", source["attr"].split(".")
+    if "field" in source:
+        return "field", source["field"]
+    if "entity" in source:
+        return "entity", source["entity"]
+    raise ValueError(f"Unknown variable source {source}; expected 'attr', 'field' or 'entity'")
+
+
+def _items(value) -> List[str]:
+    """The items of a set-valued variable, given as a list or a comma-separated string"""
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+def to_stored_values(values: Dict[str, object]) -> Dict[str, object]:
+    """
+    Get a JSON-safe copy of resolved variable values, to store with an action;
+    variables resolved by Ansible at run time are left out
+    """
+    return {name: (list(value) if isinstance(value, AnsibleList) else value)
+            for name, value in values.items() if not isinstance(value, AnsibleVariable)}
+
+
+def _coerce(value, value_type: Optional[str], value_format: Optional[str]):
+    """Convert a resolved value to the declared type"""
+    if value_format and (isinstance(value, (int, float)) or NUMERIC_PATTERN.fullmatch(str(value))):
+        value = value_format.format(value)
+    if value_type == "str":
+        if isinstance(value, (list, tuple)):
+            return ",".join(str(item) for item in value)
+        return str(value)
+    if value_type == "int":
+        return int(value)
+    if value_type == "list":
+        if isinstance(value, str):
+            value = [item.strip() for item in value.split(",") if item.strip()]
+        elif not isinstance(value, (list, tuple)):
+            value = [value]
+        return AnsibleList(value)
+    return value
+
+
+class VariableResolver:
+    """
+    Resolves one template variable: the first non-empty source wins, then the default
+    """
+    __slots__ = ("name", "structured_sources", "text_sources", "value_type", "value_format", "default", "ansible",
+                 "is_set")
+
+    def __init__(self, name: str, spec: dict):
+        """
+        Args:
+            name: The variable name
+            spec: Its entry in playbook_variables.json (sources, type, format, default, ansible, set)
+
+        Raises:
+            ValueError: If a source or the type is invalid
+        """
+        self.name = name
+        self.ansible = bool(spec.get("ansible", False))
+        # The value is a set of items (e.g. IP addresses) the playbook enforces independently of each other
+        self.is_set = bool(spec.get("set", False))
+        sources = [_compile_source(source) for source in spec.get("sources", [])]
+        # Action fields only exist for structured actions, entities only for free-text ones
+        self.structured_sources = [source for source in sources if source[0] != "entity"]
+        self.text_sources = [source for source in sources if source[0] != "field"]
+        self.value_type = spec.get("type")
+        if self.value_type not in (None, "str", "int", "list"):
+            raise ValueError(f"Unknown type '{self.value_type}' for variable '{name}'")
+        self.value_format = spec.get("format")
+        self.default = spec.get("default", "UNKNOWN_VALUE")
+
+    def resolve(self, mitigation_action, fields: Optional[dict], get_entities: Callable):
+        """
+        Args:
+            mitigation_action: The mitigation action, or None
+            fields: The fields of a structured action, or None for a free-text action
+            get_entities: Returns the ActionEntities of a free-text action, or None
+        """
+        if self.ansible:
+            return AnsibleVariable(self.name)
+        for kind, key in (self.structured_sources if fields is not None else self.text_sources):
+            if kind == "field":
+                value = fields.get(key)
+            elif kind == "attr":
+                value = _read_attr(mitigation_action, key)
+            else:
+                entities = get_entities()
+                value = getattr(entities, key, None) if entities is not None else None
+            if not _is_empty(value):
+                try:
+                    return _coerce(value, self.value_type, self.value_format)
+                except (TypeError, ValueError):
+                    continue
+        return _coerce(self.default, self.value_type, None) if self.value_type == "list" else self.default
+
+
+    def restore(self, value):
+        """Convert a stored value back to the resolved type"""
+        if self.value_type == "list" and not isinstance(value, AnsibleList):
+            return _coerce(value, "list", None)
+        return value
+
+    def with_items(self, items: List[str]):
+        """Get the value holding only the given items of a set-valued variable"""
+        return AnsibleList(items) if self.value_type == "list" else ",".join(items)
+
+
+class VariableDelta:
+    """
+    The difference between two resolutions of the same playbook.
+    The change is incremental when only set-valued variables changed, all by the same added and
+    removed items: applying the added items and undoing the removed ones is then enough.
+    """
+    __slots__ = ("changed", "added", "removed", "incremental")
+
+    def __init__(self, changed: Tuple[str, ...], added: Tuple[str, ...], removed: Tuple[str, ...],
+                 incremental: bool):
+        self.changed = changed
+        self.added = added
+        self.removed = removed
+        self.incremental = incremental
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "changed": list(self.changed),
+            "added": list(self.added),
+            "removed": list(self.removed),
+            "incremental": self.incremental,
+        }
+
+
+class PlaybookResolver:
+    """
+    The resolvers of the variables of one playbook, compiled once
+    """
+    __slots__ = ("playbook", "template_variables", "resolvers", "unmapped")
+
+    def __init__(self, playbook: str, template_variables: Tuple[str, ...], resolvers: List[VariableResolver],
+                 unmapped: List[str]):
+        self.playbook = playbook
+        self.template_variables = template_variables
+        self.resolvers = resolvers
+        self.unmapped = unmapped
+
+    def resolve(self, mitigation_action, get_entities: Callable = lambda: None) -> Dict[str, object]:
+        """
+        Resolve the value of every variable of the playbook
+
+        Args:
+            mitigation_action: The mitigation action (None resolves every variable from its default)
+            get_entities: Returns the ActionEntities of a free-text action, or None; only called if needed
+
+        Returns:
+            Dict[str, object]: Variable name -> value; unmapped variables are set to UNKNOWN_VALUE
+        """
+        action = getattr(mitigation_action, 'action', None)
+        fields = (action.get('fields') or {}) if isinstance(action, dict) else None
+        entities = []
+
+        def cached_entities():
+            if not entities:
+                entities.append(get_entities())
+            return entities[0]
+
+        values = {resolver.name: resolver.resolve(mitigation_action, fields, cached_entities)
+                  for resolver in self.resolvers}
+        for name in self.unmapped:
+            values[name] = "UNKNOWN_VALUE"
+        return values
+
+    def restore(self, stored_values: Dict[str, object]) -> Dict[str, object]:
+        """
+        Rebuild the values of every variable of the playbook from values stored with an action
+
+        Args:
+            stored_values: Values saved with to_stored_values, possibly resolved for another playbook
+
+        Returns:
+            Dict[str, object]: Variable name -> value; variables missing from stored_values get their default
+        """
+        values = {}
+        for resolver in self.resolvers:
+            if resolver.name in stored_values and not resolver.ansible:
+                values[resolver.name] = resolver.restore(stored_values[resolver.name])
+            else:
+                values[resolver.name] = resolver.resolve(None, None, lambda: None)
+        for name in self.unmapped:
+            values[name] = stored_values.get(name, "UNKNOWN_VALUE")
+        return values
+
+    def diff(self, old_values: Dict[str, object], new_values: Dict[str, object]) -> VariableDelta:
+        """
+        Compare two resolutions of the playbook; the items of set-valued variables are compared as sets
+
+        Args:
+            old_values: The values the playbook was enforced with
+            new_values: The values it should be enforced with
+
+        Returns:
+            VariableDelta: The changed variables and, for an incremental change, the added and removed items
+        """
+        changed, changes = [], set()
+        for resolver in self.resolvers:
+            if resolver.ansible:
+                continue
+            old_value, new_value = old_values.get(resolver.name), new_values.get(resolver.name)
+            if resolver.is_set:
+                old_items, new_items = _items(old_value), _items(new_value)
+                old_set, new_set = set(old_items), set(new_items)
+                if old_set == new_set:
+                    continue
+                changes.add((tuple(item for item in new_items if item not in old_set),
+                             tuple(item for item in old_items if item not in new_set)))
+            elif old_value == new_value:
+                continue
+            else:
+                changes.add(None)
+            changed.append(resolver.name)
+
+        incremental = len(changes) == 1 and None not in changes
+        added, removed = next(iter(changes)) if incremental else ((), ())
+        return VariableDelta(tuple(changed), added, removed, incremental)
+
+    def with_items(self, values: Dict[str, object], names: Tuple[str, ...], items: Tuple[str, ...]) -> Dict[str, object]:
+        """
+        Get a copy of the values where the given set-valued variables hold only the given items
+
+        Args:
+            values: Resolved values of the playbook
+            names: The set-valued variables to restrict
+            items: The items they should hold
+
+        Returns:
+            Dict[str, object]: The restricted values
+        """
+        values = dict(values)
+        for resolver in self.resolvers:
+            if resolver.name in names:
+                values[resolver.name] = resolver.with_items(list(items))
+        return values
+
+
+class VariableMap:
+    """
+    The compiled variable table of playbook_variables.json, with one PlaybookResolver per playbook
+    """
+
+    def __init__(self, config: dict):
+        """
+        Args:
+            config: The playbook variables configuration
+
+        Raises:
+            ValueError: If a variable entry is invalid
+        """
+        self.resolvers: Dict[str, VariableResolver] = {
+            name: VariableResolver(name, spec) for name, spec in config.get("variables", {}).items()
+        }
+        self._playbooks: Dict[str, PlaybookResolver] = {}
+        self.frozen = False
+
+    def freeze(self):
+        """Stop caching newly compiled playbooks, once the map belongs to a live configuration snapshot"""
+        self._playbooks = MappingProxyType(self._playbooks)
+        self.frozen = True
+
+    def compile(self, playbook: str, template_variables: List[str]) -> PlaybookResolver:
+        """
+        Get the resolver of a playbook, compiling it if its variables changed.
+        A frozen map returns a newly compiled resolver without keeping it
+
+        Args:
+            playbook: The playbook file name
+            template_variables: The variable expressions of its template
+
+        Returns:
+            PlaybookResolver: The compiled resolver
+        """
+        template_variables = tuple(template_variables)
+        compiled = self._playbooks.get(playbook)
+        if compiled is not None and compiled.template_variables == template_variables:
+            return compiled
+
+        resolvers, unmapped, seen = [], [], set()
+        for expression in template_variables:
+            match = VARIABLE_NAME_PATTERN.match(expression)
+            name = match.group() if match else expression
+            if name in seen:
+                continue
+            seen.add(name)
+            if name in self.resolvers:
+                resolvers.append(self.resolvers[name])
+            else:
+                unmapped.append(name)
+        compiled = PlaybookResolver(playbook, template_variables, resolvers, unmapped)
+        if not self.frozen:
+            self._playbooks[playbook] = compiled
+        return compiled
+
+    def get_unmapped_variables(self) -> Dict[str, List[str]]:
+        """Get the variables of each compiled playbook that have no entry in the table"""
+        return {playbook: list(compiled.unmapped) for playbook, compiled in self._playbooks.items() if compiled.unmapped}